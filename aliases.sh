@@ -1,2 +1,3 @@
 alias sdj='docker compose exec server /bin/bash'
-alias ldj='docker compose logs --tail=500 server'
\ No newline at end of file
+alias ldj='docker compose logs --tail=500 server'
+alias rdj='docker compose kill -s HUP server-prod'
@@ -0,0 +1,181 @@
+"""
+Offline benchmark of the coverage planners.
+
+Every planner flies a SimulatedAirplane over the same seeded worlds from the
+server's map generator, and the results are written as JSON so runs can be
+compared over time:
+
+    python benchmark.py --sizes 50 100 --seeds 1 2 3 --output results.json
+"""
+import argparse
+import contextlib
+import importlib.util
+import io
+import json
+import os
+import platform
+import random
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+import numpy as np
+
+import bfs
+import new_alg
+import roomba
+import simple_alg
+from simulator import SimulatedAirplane
+
+COVERAGE_THRESHOLD = simple_alg.COVERAGE_THRESHOLD
+
+DEFAULT_MAP_GENERATOR = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "capstone2-server", "api", "map_generator.py"
+)
+
+
+def load_map_generator(path=DEFAULT_MAP_GENERATOR):
+    """
+    Loads the server's map generator from its source file, so benchmark
+    worlds are generated exactly like the server's.
+    """
+    spec = importlib.util.spec_from_file_location("map_generator", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class FlightComplete(Exception):
+    pass
+
+
+class BenchmarkAirplane(SimulatedAirplane):
+    """
+    Simulated airplane that records when the coverage threshold was first
+    reached and ends the flight there, or once `max_actions` were sent.
+    """
+
+    def __init__(self, grid, x, y, rotation="UP", max_actions=None):
+        super().__init__(grid, x, y, rotation, name="benchmark")
+        self.max_actions = max_actions
+        self.actions = 0
+        self.steps_to_threshold = 0 if self.coverage >= COVERAGE_THRESHOLD else None
+
+    def step(self, code):
+        if self.steps_to_threshold is not None or (self.max_actions is not None and self.actions >= self.max_actions):
+            raise FlightComplete
+        self.actions += 1
+        error = super().step(code)
+        if self.coverage >= COVERAGE_THRESHOLD:
+            self.steps_to_threshold = self.actions
+        return error
+
+
+def fly_simple_alg(airplane, grid, max_actions):
+    simple_alg.simulate_flight(airplane, grid.astype(int), (airplane.pos_y, airplane.pos_x), airplane.rotation,
+                               max_steps=max_actions)
+
+
+def fly_new_alg(airplane, grid, max_actions):
+    path = new_alg.compute_path(grid.astype(int), (airplane.pos_y, airplane.pos_x), airplane.rotation)
+    airplane.execute(path.translate(new_alg.SERVER_ACTIONS))
+
+
+def fly_bfs(airplane, grid, max_actions):
+    bfs.explore_airplane(airplane, delay=0)
+
+
+def fly_roomba(airplane, grid, max_actions):
+    roomba.fly(airplane, max_actions=max_actions, rng=random.Random(0))
+
+
+PLANNERS = {
+    "simple_alg": fly_simple_alg,
+    "new_alg": fly_new_alg,
+    "bfs": fly_bfs,
+    "roomba": fly_roomba,
+}
+
+
+def fly(planner, grid, start, max_actions):
+    row, col = start
+    airplane = BenchmarkAirplane(grid, col, row, max_actions=max_actions)
+    # Planners log every step, keep the benchmark output readable
+    with contextlib.redirect_stdout(io.StringIO()):
+        try:
+            PLANNERS[planner](airplane, grid, max_actions)
+        except FlightComplete:
+            pass
+    return airplane
+
+
+def run_planner(planner, grid, start, max_actions):
+    """
+    Flies one planner over one world. The flight is repeated under
+    tracemalloc for the peak memory so that tracing does not skew the time.
+    """
+    started = time.perf_counter()
+    airplane = fly(planner, grid, start, max_actions)
+    wall_time = time.perf_counter() - started
+
+    tracemalloc.start()
+    try:
+        fly(planner, grid, start, max_actions)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "wall_time_s": round(wall_time, 4),
+        "peak_memory_mb": round(peak / (1024 * 1024), 3),
+        "steps_to_threshold": airplane.steps_to_threshold,
+        "actions": airplane.actions,
+        "moves": airplane.moves,
+        "turns": airplane.turns,
+        "failed_actions": airplane.failed,
+        "coverage": round(airplane.coverage, 4),
+    }
+
+
+def run(sizes, seeds, planners, max_actions, map_generator_path=DEFAULT_MAP_GENERATOR):
+    map_generator = load_map_generator(map_generator_path)
+    results = []
+    for size in sizes:
+        for seed in seeds:
+            grid, start = map_generator.generate_world(size, size, seed=seed)
+            for planner in planners:
+                result = {"planner": planner, "size": size, "seed": seed,
+                          "traversable_cells": int(np.count_nonzero(grid))}
+                result.update(run_planner(planner, grid, start, max_actions))
+                results.append(result)
+                print(f"{planner:>10} {size:>5}x{size:<5} seed {seed:<4} "
+                      f"{result['wall_time_s']:>8.3f}s {result['peak_memory_mb']:>8.2f}MB "
+                      f"coverage {result['coverage']:.1%} steps to {COVERAGE_THRESHOLD:.0%}: "
+                      f"{result['steps_to_threshold']} turns {result['turns']}")
+    return {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "coverage_threshold": COVERAGE_THRESHOLD,
+        "max_actions": max_actions,
+        "results": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the coverage planners on seeded worlds")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[50, 100], help="world widths (worlds are square)")
+    parser.add_argument("--seeds", type=int, nargs="+", default=[1, 2, 3])
+    parser.add_argument("--planners", nargs="+", choices=sorted(PLANNERS), default=sorted(PLANNERS))
+    parser.add_argument("--max-actions", type=int, default=20000, help="actions allowed per flight")
+    parser.add_argument("--map-generator", default=DEFAULT_MAP_GENERATOR, help="path to the server's map_generator.py")
+    parser.add_argument("--output", default="benchmark_results.json")
+    args = parser.parse_args()
+
+    report = run(args.sizes, args.seeds, args.planners, args.max_actions, args.map_generator)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {len(report['results'])} results to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
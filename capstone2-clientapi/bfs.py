@@ -4,16 +4,17 @@ import sys
 import os
 import time
 
-def explore_airplane(airplane):
+def explore_airplane(airplane, delay=0.5):
     grid = airplane.get_grid()
     rows, cols = len(grid), len(grid[0])
+    status = airplane.get_status()
 
     # Map directions to dx, dy
     directions = [(-1, 0), (0, 1), (1, 0), (0, -1)]  # UP, RIGHT, DOWN, LEFT
 
     visited = set()
     direction = 0  # Start facing UP
-    pos = [0, 0]  # Assume airplane starts at (0, 0)
+    pos = [status["pos_y"], status["pos_x"]]  # (row, col) of the starting cell
 
     # BFS queue: (x, y, direction, airplane state copy, path so far)
     queue = deque()
@@ -38,30 +39,36 @@ def explore_airplane(airplane):
 
             if "error" in move_result:
                 continue
-            time.sleep(0.5)
+            if delay:
+                time.sleep(delay)
 
             # Calculate new position
             dx, dy = directions[dir]
             nx, ny = x + dx, y + dy
 
-            if (nx, ny) not in visited and 0 <= nx < rows and 0 <= ny < cols and grid[nx][ny] == 0:
+            if (nx, ny) not in visited and 0 <= nx < rows and 0 <= ny < cols and grid[nx][ny] == [255, 255, 255]:
                 visited.add((nx, ny))
                 queue.append(((nx, ny), dir))
 
     return visited
 
 
-SKIP_SSL = os.environ.get("SKIP_SSL", "false")
-SKIP_SSL = SKIP_SSL.lower() == "true"
+def main():
+    SKIP_SSL = os.environ.get("SKIP_SSL", "false")
+    SKIP_SSL = SKIP_SSL.lower() == "true"
 
-if len(sys.argv) != 4:
-    print("Usage: python capstone2.py <host> <n> <token>")
-    sys.exit(1)
+    if len(sys.argv) != 4:
+        print("Usage: python capstone2.py <host> <n> <token>")
+        sys.exit(1)
 
-host = sys.argv[1]
-token = sys.argv[3]
-name = sys.argv[2]
+    host = sys.argv[1]
+    token = sys.argv[3]
+    name = sys.argv[2]
 
-with Airplane(host, token, name, skip_ssl=SKIP_SSL) as airplane:
-    visited_cells = explore_airplane(airplane)
-    print(f"Visited cells: {visited_cells}")
\ No newline at end of file
+    with Airplane(host, token, name, skip_ssl=SKIP_SSL) as airplane:
+        visited_cells = explore_airplane(airplane)
+        print(f"Visited cells: {visited_cells}")
+
+
+if __name__ == "__main__":
+    main()
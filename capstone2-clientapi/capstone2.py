@@ -1,18 +1,78 @@
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import logging
 import jwt
 import json
+import hashlib
+import os
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger()
 
+# Worlds downloaded by get_grid are kept here and revalidated with their ETag
+DEFAULT_CACHE_DIR = os.environ.get("CAPSTONE2_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "capstone2"))
+
+def unpack_coverage(bits, width, height):
+    """
+    Rows of booleans (coverage[y][x]) from a raw coverage bitmap.
+    """
+    return [
+        [bool(bits[(y * width + x) >> 3] & (0x80 >> ((y * width + x) & 7))) for x in range(width)]
+        for y in range(height)
+    ]
+
+
+def _grid_cache_path(cache_dir, host, world):
+    host = hashlib.sha256(host.encode()).hexdigest()[:16]
+    return os.path.join(cache_dir, f"{host}-world-{world}.json")
+
+
+def load_cached_grid(cache_dir, host, world):
+    """
+    The cached {"etag", "basemap"} of a world, or None. A None `cache_dir`
+    disables the cache.
+    """
+    if cache_dir is None:
+        return None
+    try:
+        with open(_grid_cache_path(cache_dir, host, world)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def save_cached_grid(cache_dir, host, world, etag, basemap):
+    if cache_dir is None or etag is None:
+        return
+    path = _grid_cache_path(cache_dir, host, world)
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        # Write then rename so concurrent airplanes never read a partial file
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"etag": etag, "basemap": basemap}, f)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        logger.warning(f"Failed to cache grid: {str(e)}")
+
 class Airplane:
-    def __init__(self, host, token, name, skip_ssl=False):
+    def __init__(self, host, token, name, skip_ssl=False, pool_size=10, retries=3, backoff_factor=0.5,
+                 cache_dir=DEFAULT_CACHE_DIR):
         self.host = host
         self.name = name
         self.token = token
         self.skip_ssl = skip_ssl
+        self.pool_size = pool_size
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        # None disables the world cache
+        self.cache_dir = cache_dir
+        self.session = None
+        # Last coverage bitmap fetched and its ETag, see get_coverage
+        self._coverage = None
+        self._coverage_etag = None
         # decode jwt without verifying and get world
         decoded = jwt.decode(token, options={"verify_signature": False})
         self.world = decoded.get("world")
@@ -20,13 +80,32 @@ class Airplane:
             raise ValueError("Invalid token. Missing 'world' claim")
         self.id = None
 
+    def _open_session(self):
+        """
+        Create a keep-alive session shared by every request of this airplane.
+        Failed connections are retried with exponential backoff, and 502/503/504
+        responses are retried for idempotent requests only, so a move is never
+        sent twice.
+        """
+        session = requests.Session()
+        session.headers["Authorization"] = f"Bearer {self.token}"
+        session.verify = not self.skip_ssl
+        retry = Retry(
+            total=self.retries,
+            backoff_factor=self.backoff_factor,
+            status_forcelist=(502, 503, 504),
+        )
+        adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size, max_retries=retry)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+
     def __enter__(self):
+        self.session = self._open_session()
         try:
-            response = requests.post(
+            response = self.session.post(
                 f"{self.host}/services/api/airplanes/",
-                headers={"Authorization": f"Bearer {self.token}"},
-                json={"name": self.name, "world": self.world},
-                verify=not self.skip_ssl
+                json={"name": self.name, "world": self.world}
             )
             response.raise_for_status()
             result = response.json()
@@ -46,14 +125,22 @@ class Airplane:
                     error_msg += f" - Response text: {e.response.text}"
             
             logger.error(error_msg)
+            self.session.close()
             raise RuntimeError(error_msg) from e
 
-    def get_scanned_cell(self):
+    def get_scanned_cell(self, since_id=None):
+        """
+        Cells scanned by this airplane, oldest first. Pass the id of the last
+        cell already seen as `since_id` to fetch only newer cells. Ids follow
+        insertion, not commit, order: this is exact while the airplane's
+        actions are sent one at a time, but with concurrent actions a cell
+        can appear behind the cursor, so fetch without `since_id` now and
+        then to catch up.
+        """
         try:
-            response = requests.get(
-                f"{self.host}/services/api/scanned-cell/?airplane={self.id}",
-                headers={"Authorization": f"Bearer {self.token}"},
-                verify=not self.skip_ssl
+            response = self.session.get(
+                f"{self.host}/services/api/scanned-cell/",
+                params={"airplane": self.id, "since_id": since_id}
             )
             response.raise_for_status()
             result = response.json()['results']
@@ -62,15 +149,48 @@ class Airplane:
         except Exception as e:
             logger.error(f"Failed to get scanned cells: {str(e)}")
     
+    def get_coverage(self):
+        """
+        Cells scanned so far by every airplane in the world, as rows of
+        booleans (coverage[y][x]). Fetched as a packed bitmap, and not
+        downloaded again while no new cell has been scanned.
+        """
+        try:
+            headers = {"If-None-Match": self._coverage_etag} if self._coverage_etag else {}
+            response = self.session.get(
+                f"{self.host}/services/api/worlds/{self.world}/coverage-bitmap/",
+                params={"encoding": "raw"},
+                headers=headers
+            )
+            if response.status_code == 304:
+                return self._coverage
+            response.raise_for_status()
+
+            self._coverage = unpack_coverage(response.content, int(response.headers["X-Width"]),
+                                             int(response.headers["X-Height"]))
+            self._coverage_etag = response.headers.get("ETag")
+            return self._coverage
+        except Exception as e:
+            logger.error(f"Failed to get coverage: {str(e)}")
+            return {"error": str(e)}
+
     def get_grid(self):
+        """
+        The world's map. It is cached on disk in `cache_dir` and only
+        downloaded again when the server reports that the world changed.
+        """
+        cached = load_cached_grid(self.cache_dir, self.host, self.world)
         try:
-            response = requests.get(
-                f"{self.host}/services/api/worlds/{self.world}",
-                headers={"Authorization": f"Bearer {self.token}"},
-                verify=not self.skip_ssl
+            response = self.session.get(
+                f"{self.host}/services/api/worlds/{self.world}/",
+                headers={"If-None-Match": cached["etag"]} if cached else {}
             )
+            if response.status_code == 304 and cached:
+                return cached["basemap"]
             response.raise_for_status()
-            return response.json()["basemap"]
+            basemap = response.json()["basemap"]
+            save_cached_grid(self.cache_dir, self.host, self.world, response.headers.get("ETag"), basemap)
+            return basemap
         except Exception as e:
             logger.error(f"Failed to get grid: {str(e)}")
             return {"error": str(e)}
@@ -79,22 +199,21 @@ class Airplane:
     def __exit__(self, exc_type, exc_value, traceback):
         if self.id is not None:
             try:
-                requests.delete(
-                    f"{self.host}/services/api/airplanes/{self.id}/",
-                    headers={"Authorization": f"Bearer {self.token}"},
-                    verify=not self.skip_ssl
+                self.session.delete(
+                    f"{self.host}/services/api/airplanes/{self.id}/"
                 )
                 logger.info(f"Deleted airplane: {self.name}")
             except Exception as e:
                 logger.error(f"Error deleting airplane: {str(e)}")
+        if self.session is not None:
+            self.session.close()
+            self.session = None
 
     def move(self):
         # send requests to action endpoint
         try:
-            response = requests.post(
-                f"{self.host}/services/api/airplanes/{self.id}/move/",
-                headers={"Authorization": f"Bearer {self.token}"},
-                verify=not self.skip_ssl
+            response = self.session.post(
+                f"{self.host}/services/api/airplanes/{self.id}/move/"
             )
             
             # Check if request was successful
@@ -122,10 +241,8 @@ class Airplane:
 
     def rotate_left(self):
         try:
-            response = requests.post(
-                f"{self.host}/services/api/airplanes/{self.id}/rotate_left/",
-                headers={"Authorization": f"Bearer {self.token}"},
-                verify=not self.skip_ssl
+            response = self.session.post(
+                f"{self.host}/services/api/airplanes/{self.id}/rotate_left/"
             )
             
             response.raise_for_status()
@@ -150,10 +267,8 @@ class Airplane:
     
     def rotate_right(self):
         try:
-            response = requests.post(
-                f"{self.host}/services/api/airplanes/{self.id}/rotate_right/",
-                headers={"Authorization": f"Bearer {self.token}"},
-                verify=not self.skip_ssl
+            response = self.session.post(
+                f"{self.host}/services/api/airplanes/{self.id}/rotate_right/"
             )
             
             response.raise_for_status()
@@ -175,13 +290,44 @@ class Airplane:
             logger.error(f"Rotate right failed with exception: {str(e)}")
             print(f"Rotate right failed with exception: {str(e)}")
             return {"error": str(e)}
+
+    def execute(self, actions):
+        """
+        Apply a sequence of actions in a single request. `actions` is a string
+        of codes ("F" move, "L" rotate_left, "R" rotate_right) or a list of
+        codes or action names. Returns the final airplane state and the outcome
+        of every step.
+        """
+        try:
+            response = self.session.post(
+                f"{self.host}/services/api/airplanes/{self.id}/execute/",
+                json={"actions": actions}
+            )
+
+            response.raise_for_status()
+            result = response.json()
+            logger.info(f"Execute successful: {result['applied']} applied, {result['failed']} failed")
+            return result
+        except requests.exceptions.HTTPError as e:
+            error_msg = f"Execute failed with status {e.response.status_code}"
+            try:
+                error_data = e.response.json()
+                error_msg += f": {json.dumps(error_data)}"
+            except:
+                error_msg += f": {e.response.text}"
+
+            logger.error(error_msg)
+            print(error_msg)
+            return {"error": error_msg}
+        except Exception as e:
+            logger.error(f"Execute failed with exception: {str(e)}")
+            print(f"Execute failed with exception: {str(e)}")
+            return {"error": str(e)}
             
     def get_status(self):
         try:
-            response = requests.get(
-                f"{self.host}/services/api/airplanes/{self.id}/",
-                headers={"Authorization": f"Bearer {self.token}"},
-                verify=not self.skip_ssl
+            response = self.session.get(
+                f"{self.host}/services/api/airplanes/{self.id}/"
             )
             
             response.raise_for_status()
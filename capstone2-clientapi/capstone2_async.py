@@ -0,0 +1,280 @@
+import asyncio
+import httpx
+import logging
+import jwt
+import json
+import random
+
+from capstone2 import DEFAULT_CACHE_DIR, load_cached_grid, save_cached_grid, unpack_coverage
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger()
+
+
+def create_client(skip_ssl=False, max_connections=100, timeout=30.0):
+    """
+    Create an HTTP client that can be shared by many AsyncAirplanes, so a
+    whole fleet flies over one connection pool.
+    """
+    return httpx.AsyncClient(
+        verify=not skip_ssl,
+        timeout=timeout,
+        limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+    )
+
+
+class AsyncAirplane:
+    """
+    Asynchronous counterpart of capstone2.Airplane. Pass a client from
+    `create_client` to share its connection pool, otherwise the airplane opens
+    its own client for the lifetime of the `async with` block.
+    """
+
+    def __init__(self, host, token, name, skip_ssl=False, client=None, cache_dir=DEFAULT_CACHE_DIR):
+        self.host = host
+        self.name = name
+        self.token = token
+        self.skip_ssl = skip_ssl
+        self.client = client
+        # None disables the world cache
+        self.cache_dir = cache_dir
+        # Last coverage bitmap fetched and its ETag, see get_coverage
+        self._coverage = None
+        self._coverage_etag = None
+        self._owns_client = client is None
+        self.headers = {"Authorization": f"Bearer {token}"}
+        # Response of the latest action, for callers that inspect headers or timing
+        self.last_response = None
+        # decode jwt without verifying and get world
+        decoded = jwt.decode(token, options={"verify_signature": False})
+        self.world = decoded.get("world")
+        if not self.world:
+            raise ValueError("Invalid token. Missing 'world' claim")
+        self.id = None
+
+    async def __aenter__(self):
+        if self._owns_client:
+            self.client = create_client(skip_ssl=self.skip_ssl)
+        try:
+            response = await self.client.post(
+                f"{self.host}/services/api/airplanes/",
+                headers=self.headers,
+                json={"name": self.name, "world": self.world}
+            )
+            response.raise_for_status()
+            result = response.json()
+            self.id = result.get("id")
+            if not self.id:
+                raise ValueError("Failed to get airplane ID from response")
+            logger.info(f"Created airplane: {self.name}")
+            return self
+        except Exception as e:
+            error_msg = f"Error creating airplane: {str(e)}"
+            if isinstance(e, httpx.HTTPStatusError):
+                try:
+                    error_msg += f" - Response: {e.response.json()}"
+                except ValueError:
+                    error_msg += f" - Response text: {e.response.text}"
+
+            logger.error(error_msg)
+            if self._owns_client:
+                await self.client.aclose()
+            raise RuntimeError(error_msg) from e
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        if self.id is not None:
+            try:
+                await self.client.delete(
+                    f"{self.host}/services/api/airplanes/{self.id}/",
+                    headers=self.headers
+                )
+                logger.info(f"Deleted airplane: {self.name}")
+            except Exception as e:
+                logger.error(f"Error deleting airplane: {str(e)}")
+        if self._owns_client and self.client is not None:
+            await self.client.aclose()
+            self.client = None
+
+    async def _action(self, label, action, json_body=None):
+        self.last_response = None
+        try:
+            response = await self.client.post(
+                f"{self.host}/services/api/airplanes/{self.id}/{action}/",
+                headers=self.headers,
+                json=json_body
+            )
+            self.last_response = response
+
+            response.raise_for_status()
+            result = response.json()
+            logger.debug(f"{label} successful: {result}")
+            return result
+        except httpx.HTTPStatusError as e:
+            error_msg = f"{label} failed with status {e.response.status_code}"
+            try:
+                error_data = e.response.json()
+                error_msg += f": {json.dumps(error_data)}"
+            except ValueError:
+                error_msg += f": {e.response.text}"
+
+            logger.error(error_msg)
+            return {"error": error_msg}
+        except Exception as e:
+            logger.error(f"{label} failed with exception: {str(e)}")
+            return {"error": str(e)}
+
+    async def move(self):
+        return await self._action("Move", "move")
+
+    async def rotate_left(self):
+        return await self._action("Rotate left", "rotate_left")
+
+    async def rotate_right(self):
+        return await self._action("Rotate right", "rotate_right")
+
+    async def execute(self, actions):
+        """
+        Apply a sequence of actions in a single request, see
+        capstone2.Airplane.execute.
+        """
+        return await self._action("Execute", "execute", {"actions": actions})
+
+    async def get_scanned_cell(self, since_id=None):
+        params = {"airplane": self.id}
+        if since_id is not None:
+            params["since_id"] = since_id
+        try:
+            response = await self.client.get(
+                f"{self.host}/services/api/scanned-cell/",
+                params=params,
+                headers=self.headers
+            )
+            response.raise_for_status()
+            return response.json()['results']
+        except Exception as e:
+            logger.error(f"Failed to get scanned cells: {str(e)}")
+            return {"error": str(e)}
+
+    async def get_coverage(self):
+        """
+        Cells scanned so far in the world, see capstone2.Airplane.get_coverage.
+        """
+        try:
+            headers = dict(self.headers)
+            if self._coverage_etag:
+                headers["If-None-Match"] = self._coverage_etag
+            response = await self.client.get(
+                f"{self.host}/services/api/worlds/{self.world}/coverage-bitmap/",
+                params={"encoding": "raw"},
+                headers=headers
+            )
+            if response.status_code == 304:
+                return self._coverage
+            response.raise_for_status()
+
+            self._coverage = unpack_coverage(response.content, int(response.headers["X-Width"]),
+                                             int(response.headers["X-Height"]))
+            self._coverage_etag = response.headers.get("ETag")
+            return self._coverage
+        except Exception as e:
+            logger.error(f"Failed to get coverage: {str(e)}")
+            return {"error": str(e)}
+
+    async def get_grid(self):
+        """
+        The world's map, cached on disk like capstone2.Airplane.get_grid.
+        """
+        cached = load_cached_grid(self.cache_dir, self.host, self.world)
+        try:
+            headers = dict(self.headers)
+            if cached:
+                headers["If-None-Match"] = cached["etag"]
+            response = await self.client.get(
+                f"{self.host}/services/api/worlds/{self.world}/",
+                headers=headers
+            )
+            if response.status_code == 304 and cached:
+                return cached["basemap"]
+            response.raise_for_status()
+            basemap = response.json()["basemap"]
+            save_cached_grid(self.cache_dir, self.host, self.world, response.headers.get("ETag"), basemap)
+            return basemap
+        except Exception as e:
+            logger.error(f"Failed to get grid: {str(e)}")
+            return {"error": str(e)}
+
+    async def get_status(self):
+        try:
+            response = await self.client.get(
+                f"{self.host}/services/api/airplanes/{self.id}/",
+                headers=self.headers
+            )
+            response.raise_for_status()
+            return response.json()
+        except Exception as e:
+            logger.error(f"Failed to get status: {str(e)}")
+            return {"error": str(e)}
+
+
+async def run_fleet(host, tokens, pilot, names=None, skip_ssl=False, max_connections=100):
+    """
+    Fly one airplane per token concurrently in the current event loop.
+
+    `pilot` is an async callable receiving an entered AsyncAirplane; its return
+    value (or the exception it raised) is returned in token order. Every
+    airplane shares a single connection pool.
+    """
+    names = names or [f"fleet-{i}" for i in range(len(tokens))]
+
+    async with create_client(skip_ssl=skip_ssl, max_connections=max_connections) as client:
+        async def fly(token, name):
+            async with AsyncAirplane(host, token, name, client=client) as airplane:
+                return await pilot(airplane)
+
+        return await asyncio.gather(
+            *(fly(token, name) for token, name in zip(tokens, names)),
+            return_exceptions=True,
+        )
+
+
+def random_walk(steps):
+    """
+    Pilot that flies a random sequence of moves and rotations.
+    """
+    async def pilot(airplane):
+        moves = 0
+        for _ in range(steps):
+            action = random.choice((airplane.move, airplane.move, airplane.rotate_left, airplane.rotate_right))
+            result = await action()
+            if "error" not in result:
+                moves += 1
+        return moves
+    return pilot
+
+
+if __name__ == "__main__":
+    import sys
+    import os
+    import time
+
+    SKIP_SSL = os.environ.get("SKIP_SSL", "false")
+    SKIP_SSL = SKIP_SSL.lower() == "true"
+
+    if len(sys.argv) not in (4, 5):
+        print("Usage: python capstone2_async.py <host> <token> <planes> [steps]")
+        sys.exit(1)
+
+    host = sys.argv[1]
+    token = sys.argv[2]
+    planes = int(sys.argv[3])
+    steps = int(sys.argv[4]) if len(sys.argv) == 5 else 100
+
+    start = time.perf_counter()
+    results = asyncio.run(run_fleet(host, [token] * planes, random_walk(steps), skip_ssl=SKIP_SSL))
+    elapsed = time.perf_counter() - start
+
+    failures = [r for r in results if isinstance(r, Exception)]
+    for error in failures:
+        print(f"Airplane failed: {error}")
+    actions = sum(r for r in results if not isinstance(r, Exception))
+    print(f"{planes - len(failures)}/{planes} airplanes flew {actions} successful actions in {elapsed:.2f}s")
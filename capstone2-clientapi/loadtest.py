@@ -0,0 +1,138 @@
+"""
+Load test for the airplane action endpoints.
+
+Ramps the number of concurrent airplanes in one world and records, per stage
+and per endpoint, latency percentiles, throughput and the number of database
+queries each request ran. Start the server with QUERY_COUNT_HEADERS=true to get
+query counts (DB_ENGINE=sqlite runs it without Postgres), then:
+
+    python loadtest.py <host> <world token> --ramp 1 5 10 20 --actions 200
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+from capstone2_async import AsyncAirplane, create_client
+
+ENDPOINTS = ("move", "rotate_left", "rotate_right")
+
+
+async def fly(client, host, token, name, actions, rng, samples):
+    """
+    Flies one airplane for `actions` random actions and appends one sample per
+    request: (endpoint, path length, latency in seconds, query count, ok).
+    """
+    async with AsyncAirplane(host, token, name, client=client) as airplane:
+        for path_length in range(1, actions + 1):
+            endpoint = rng.choice(("move", "move", "rotate_left", "rotate_right"))
+            started = time.perf_counter()
+            await getattr(airplane, endpoint)()
+            latency = time.perf_counter() - started
+
+            response = airplane.last_response
+            queries = None
+            if response is not None and "X-Query-Count" in response.headers:
+                queries = int(response.headers["X-Query-Count"])
+            # A refused move (obstacle, map edge) is a normal answer, transport
+            # and server errors are not
+            ok = response is not None and response.status_code < 500
+            samples.append((endpoint, path_length, latency, queries, ok))
+
+
+def summarize(samples, elapsed):
+    latencies = np.array([sample[2] for sample in samples]) * 1000
+    queries = [sample[3] for sample in samples if sample[3] is not None]
+    return {
+        "requests": len(samples),
+        "errors": sum(1 for sample in samples if not sample[4]),
+        "requests_per_s": round(len(samples) / elapsed, 2) if elapsed else None,
+        "p50_ms": round(float(np.percentile(latencies, 50)), 2),
+        "p95_ms": round(float(np.percentile(latencies, 95)), 2),
+        "p99_ms": round(float(np.percentile(latencies, 99)), 2),
+        "max_ms": round(float(latencies.max()), 2),
+        "queries_mean": round(float(np.mean(queries)), 2) if queries else None,
+        "queries_max": max(queries) if queries else None,
+    }
+
+
+async def run_stage(host, token, planes, actions, bucket, seed, skip_ssl):
+    samples = []
+    rng = random.Random(seed)
+    async with create_client(skip_ssl=skip_ssl, max_connections=planes) as client:
+        started = time.perf_counter()
+        results = await asyncio.gather(
+            *(fly(client, host, token, f"load-{planes}-{i}", actions, random.Random(rng.random()), samples)
+              for i in range(planes)),
+            return_exceptions=True,
+        )
+        elapsed = time.perf_counter() - started
+
+    failures = [str(result) for result in results if isinstance(result, Exception)]
+    stage = {"planes": planes, "duration_s": round(elapsed, 3), "failed_airplanes": failures}
+    if not samples:
+        return stage
+    stage["all"] = summarize(samples, elapsed)
+    stage["endpoints"] = {
+        endpoint: summarize([s for s in samples if s[0] == endpoint], elapsed)
+        for endpoint in ENDPOINTS if any(s[0] == endpoint for s in samples)
+    }
+    # Latency as the airplane's path grows
+    stage["path_length"] = {
+        f"{start + 1}-{start + bucket}": summarize([s for s in samples if start < s[1] <= start + bucket], elapsed)
+        for start in range(0, actions, bucket)
+    }
+    return stage
+
+
+def print_stage(stage):
+    print(f"{stage['planes']} airplanes, {stage['duration_s']}s"
+          + (f", {len(stage['failed_airplanes'])} failed to fly" if stage["failed_airplanes"] else ""))
+    for name, summary in [("all", stage.get("all"))] + list(stage.get("endpoints", {}).items()):
+        if summary is None:
+            continue
+        print(f"  {name:<13} {summary['requests']:>6} req {summary['requests_per_s']:>8} req/s "
+              f"p50 {summary['p50_ms']:>7}ms p95 {summary['p95_ms']:>7}ms p99 {summary['p99_ms']:>7}ms "
+              f"queries {summary['queries_mean']} errors {summary['errors']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the airplane action endpoints")
+    parser.add_argument("host")
+    parser.add_argument("token", help="world token, every airplane flies in its world")
+    parser.add_argument("--ramp", type=int, nargs="+", default=[1, 5, 10, 20], help="concurrent airplanes per stage")
+    parser.add_argument("--actions", type=int, default=200, help="actions sent by each airplane")
+    parser.add_argument("--bucket", type=int, default=50, help="path length bucket size in the report")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="loadtest_report.json")
+    args = parser.parse_args()
+
+    # Failed requests are counted in the report, do not log every response body
+    logging.getLogger().setLevel(logging.CRITICAL)
+    skip_ssl = os.environ.get("SKIP_SSL", "false").lower() == "true"
+
+    stages = []
+    for planes in args.ramp:
+        stage = asyncio.run(run_stage(args.host, args.token, planes, args.actions, args.bucket, args.seed, skip_ssl))
+        print_stage(stage)
+        stages.append(stage)
+
+    report = {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "host": args.host,
+        "actions_per_airplane": args.actions,
+        "stages": stages,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote report to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,15 +2,12 @@ import numpy as np
 import sys
 import requests
 from capstone2 import Airplane
+from simulator import sensor_footprint
 import time
 import random
-import copy
+import heapq
 np.set_printoptions(threshold=sys.maxsize)
 
-# Grid dimensions
-GRID_WIDTH = 100
-GRID_HEIGHT = 100
-
 # Coverage threshold (80% of free cells)
 COVERAGE_THRESHOLD = 0.8
 
@@ -20,6 +17,13 @@ ORIENTATIONS = ["UP", "RIGHT", "DOWN", "LEFT"]
 # Movement actions: forward (F), left-turn (L), right-turn (R)
 ACTIONS = ["F", "L", "R"]
 
+# Turns in a path follow ORIENTATIONS (R is clockwise) while the server's
+# rotate_left endpoint turns clockwise, so L and R swap when sent to execute
+SERVER_ACTIONS = str.maketrans("LR", "RL")
+
+# Number of actions sent per execute request (server limit is 2000)
+EXECUTE_BATCH_SIZE = 2000
+
 # Map orientations to movement delta for a forward move:
 MOVE_DELTA = {
     "UP": (-1, 0),  # North: decrease row
@@ -28,39 +32,14 @@ MOVE_DELTA = {
     "LEFT": (0, -1)   # West: decrease column
 }
 
-class gridState:
-    visited = 0
-    cost = 0
-    path = ""
-    pos = 0, 0
-    orientation = "UP"
-
 def get_sensor_footprint(position, orientation):
     """
     Given the aircraft's position (row, col) and orientation, compute the sensor footprint.
-    The sensor covers a 2x3 rectangle ahead of the aircraft.
-    We assume the sensor rectangle is placed immediately in front of the aircraft.
+    The sensor covers a 2x3 rectangle ahead of the aircraft, exactly as the server
+    records it (see simulator.sensor_footprint, which works in (x, y)).
     """
     row, col = position
-    footprint = []
-    # Relative coordinates for a 2x3 rectangle with the aircraft at the bottom center when facing North.
-    # We'll define it for the North orientation and then rotate for other directions.
-    # For North: rectangle is two rows high, three columns wide, in front of the aircraft.
-    rel_coords = [(0, -1), (0, 0), (0, 1),
-                  (-1, -1), (-1, 0), (-1, 1)]
-    
-    # Rotate relative coordinates based on orientation
-    def rotate(coord, orientation):
-        r, c = coord
-        # 90 degrees clockwise rotation
-        for _ in range(ORIENTATIONS.index(orientation)):
-            r, c = c, -r
-        return (r, c)
-    
-    for rel in rel_coords:
-        dr, dc = rotate(rel, orientation)
-        footprint.append((row + dr, col + dc))
-    return footprint
+    return [(y, x) for x, y in sensor_footprint(col, row, orientation)]
 
 def is_valid(position, grid):
     """
@@ -122,10 +101,61 @@ def compute_coverage(visited, grid):
     Compute the fraction of free grid cells that have been covered.
     visited is a boolean grid the same size as grid.
     """
-    free_cells = np.sum(grid == 0)
+    free_cells = np.sum(grid == 1)
     covered_cells = np.sum(visited)
     return covered_cells / free_cells if free_cells > 0 else 0
 
+class PlanNode:
+    """
+    One state in the search tree. Instead of a copy of the visited grid, each
+    node only keeps the cells its own action newly covered; the visited grid of
+    any node is its ancestors' new cells combined.
+    """
+    __slots__ = ("row", "col", "heading", "cost", "covered", "depth", "action", "parent", "new_cells")
+
+    def __init__(self, row, col, heading, cost, covered, depth, action, parent, new_cells):
+        self.row = row
+        self.col = col
+        self.heading = heading
+        self.cost = cost
+        self.covered = covered
+        self.depth = depth
+        self.action = action
+        self.parent = parent
+        self.new_cells = new_cells
+
+    def path(self):
+        actions = []
+        node = self
+        while node.parent is not None:
+            actions.append(node.action)
+            node = node.parent
+        return "".join(reversed(actions))
+
+def switch_visited(visited, current, target):
+    """
+    Update the shared visited buffer from the state of `current` to the state
+    of `target` by undoing and replaying new cells up to their common ancestor.
+    Consecutive expansions are usually parent and child, so this is cheap.
+    """
+    replay = []
+    while current.depth > target.depth:
+        for cell in current.new_cells:
+            visited[cell] = 0
+        current = current.parent
+    while target.depth > current.depth:
+        replay.append(target)
+        target = target.parent
+    while current is not target:
+        for cell in current.new_cells:
+            visited[cell] = 0
+        current = current.parent
+        replay.append(target)
+        target = target.parent
+    for node in reversed(replay):
+        for cell in node.new_cells:
+            visited[cell] = 1
+
 def compute_path(grid, position, orientation, max_steps=6000):
     """
     Calculate the cost for each next position to travel to for the next step. This will be through a semi-Dijkstra related formula 
@@ -133,98 +163,57 @@ def compute_path(grid, position, orientation, max_steps=6000):
     Turning cost = 1  DONE
     All newly scanned blocks will lower cost by 4. i.e. if 4 of the 6 grid tiles are already explored, cost = -2; DONE
 
-    After validating the next steps, keep track of all moves in a list sorted based on priority. If move is invalidm remove from queue. Otherwise, lowest cost goes next
-    
+    States are kept in a heap ordered by cost, ties going to the state created
+    first. The lowest cost state is expanded until it reaches COVERAGE_THRESHOLD
+    or max_steps expansions were made, and its path is returned.
     """
-
-    vector = []
-    cur = gridState()
-    cur.visited = np.zeros_like(grid, dtype=bool)
-
-    #Each state has an array for airplane Pos, visited tiles, and total cost of the algorithm so far
-    posChange = "F"
-    cur.cost = 0
-    cur.path = ""
-    cur.pos = position
-
-    vector.insert(0, cur)
+    height, width = grid.shape
+    free = (np.asarray(grid) == 1).ravel().tolist()
+    target = COVERAGE_THRESHOLD * sum(free)
+
+    # Footprint offsets of every heading, as flat index deltas with the
+    # (row, col) offsets kept for the bounds check
+    offsets = [get_sensor_footprint((0, 0), heading) for heading in ORIENTATIONS]
+
+    def scan(visited, row, col, heading):
+        cells = []
+        for dr, dc in offsets[heading]:
+            r, c = row + dr, col + dc
+            if 0 <= r < height and 0 <= c < width:
+                cell = r * width + c
+                if free[cell] and not visited[cell]:
+                    cells.append(cell)
+        return tuple(cells)
+
+    visited = bytearray(height * width)
+    root = PlanNode(position[0], position[1], ORIENTATIONS.index(orientation), 0, 0, 0, None, None, ())
+    current = root
+    frontier = [(root.cost, 0, root)]
+    order = 1
     steps = 0
-    #fix: add an initializer moment to make at least one test attempt so vector isn't empty
-    while compute_coverage(cur.visited, grid) < COVERAGE_THRESHOLD:
-        print(compute_coverage(cur.visited, grid))
-        print("COST IS: ",cur.cost)
-        print("STEPS IS: ", steps)
-        if steps == max_steps:
-            return vector[0].path
-
-        temp = vector[0]
-        vector.pop(0)
-        #print_cur(cur)
-        #print("COVERAGE IS: ",compute_coverage(cur.visited, grid))
-        list = [0, 1, 2]
-        for i in list:
-            cur = copy.deepcopy(temp)
-            if i == 0:
-                posChange = "F"
-                dr, dc = MOVE_DELTA[ORIENTATIONS[(ORIENTATIONS.index(cur.orientation)) %4]]
-                posCheck = (cur.pos[0] + dr, cur.pos[1] + dc)
-                compute_step(cur, grid, vector, posChange, posCheck, cur.orientation)
-            elif i == 1:
-                posChange = "R"
-                posCheck = cur.pos
-                cur.orientation = ORIENTATIONS[(ORIENTATIONS.index(cur.orientation) + 1) % 4]
-                compute_step(cur, grid, vector, posChange, cur.pos, cur.orientation)
-            elif i == 2:
-                posChange = "L"
-                posCheck = cur.pos
-                cur.orientation = ORIENTATIONS[(ORIENTATIONS.index(cur.orientation) - 1) % 4]
-                compute_step(cur, grid ,vector, posChange, cur.pos, cur.orientation)
-                steps+=1
-    return vector[0].path
-
-    #initialize array
-    #compute_path()
-    #test each available path from the current node. Delete invalid ones, otherwise insert in list based on cost
-
-
-
-def compute_step(cur, grid, vector, posChange, posCheck, orientation):
-    """
-    Accepts a current possible state and checks for validity. If valid, calculates cost value. Otherwise, return 0 and move to next check
-
-    """
-    if is_valid(posCheck, grid):
-        #Run a loop for every 'path' point in posChange
-        if posChange == "F":
-            cur.pos = posCheck
-
-        cur.cost+=1
-        cur.path = cur.path + posChange
-        #calculate foortprint 
-        footprint = get_sensor_footprint(cur.pos, cur.orientation)
-        for (r, c) in footprint:
-            if 0 <= r < grid.shape[0] and 0 <= c < grid.shape[1]:
-                if grid[r, c] == 1 and cur.visited[r, c] == False:
-                    cur.cost= cur.cost - 1
-                    cur.visited[r, c] = True
-        #check scanned area for grid positions passable, then cover them in the scanner. Keep track of how many positions were scanned for cost
-
-        check = 0
-
-        for i in range(len(vector)):
-            if(check == 0):
-                if cur.cost < vector[i].cost:
-                    vector.insert(i, cur)
-                    check = 1
-                    return 1
-        #cur is too big, so add it to end of queue
-        if(check == 0):
-            vector.append(cur)
-        return 1
-    else:
-        print("Not valid!")
-        return 0
-
+    while frontier:
+        _, _, node = heapq.heappop(frontier)
+        switch_visited(visited, current, node)
+        current = node
+        if node.covered >= target or steps == max_steps:
+            return node.path()
+        steps += 1
+
+        dr, dc = MOVE_DELTA[ORIENTATIONS[node.heading]]
+        children = (
+            ("F", node.row + dr, node.col + dc, node.heading),
+            ("R", node.row, node.col, (node.heading + 1) % 4),
+            ("L", node.row, node.col, (node.heading - 1) % 4),
+        )
+        for action, row, col, heading in children:
+            if not (0 <= row < height and 0 <= col < width and free[row * width + col]):
+                continue
+            new_cells = scan(visited, row, col, heading)
+            child = PlanNode(row, col, heading, node.cost + 1 - len(new_cells), node.covered + len(new_cells),
+                             node.depth + 1, action, node, new_cells)
+            heapq.heappush(frontier, (child.cost, order, child))
+            order += 1
+    return current.path()
 
 
 
@@ -248,9 +237,9 @@ def main():
     with Airplane(host, token, name, skip_ssl=SKIP_SSL) as airplane:
         grid = airplane.get_grid()
 
-        # map 255,255,255 to 1
-        for i in range(GRID_HEIGHT):
-            for j in range(GRID_WIDTH):
+        # map 255,255,255 to 1, dimensions come from the world
+        for i in range(len(grid)):
+            for j in range(len(grid[i])):
                 if grid[i][j] == [255,255,255]:
                     grid[i][j] = 1
                 else:
@@ -279,8 +268,15 @@ def main():
         print("orientation is: ", next_orientation)
         #print("Path is: ", path)
 
-        for action in path:
-            next_position, next_orientation = apply_action(airplane, next_position, next_orientation, action, grid)
+        # Submit the plan in batches instead of one request per action
+        commands = path.translate(SERVER_ACTIONS)
+        for start in range(0, len(commands), EXECUTE_BATCH_SIZE):
+            result = airplane.execute(commands[start:start + EXECUTE_BATCH_SIZE])
+            if "error" in result:
+                break
+            final = result["airplane"]
+            print("Batch applied", result["applied"], "failed", result["failed"],
+                  "now at", (final["pos_y"], final["pos_x"]), final["rotation"])
         check = 0
         print("Out of Loop!")
         while(check == 0):
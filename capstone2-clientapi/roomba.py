@@ -4,21 +4,6 @@ import os
 import time
 import random
 
-SKIP_SSL = os.environ.get("SKIP_SSL", "false")
-SKIP_SSL = SKIP_SSL.lower() == "true"
-
-if len(sys.argv) != 4:
-    print("Usage: python capstone2.py <host> <n> <token>")
-    sys.exit(1)
-
-host = sys.argv[1]
-token = sys.argv[3]
-name = sys.argv[2]
-
-visited = set()
-
-temp = 0
-
 # scan up vector is cells above the current cell, left, right, top left, top right
 scan_up_vector = [
     (-1, 0),  # up
@@ -53,25 +38,61 @@ scan_down_vector = [
 ]
 
 
-with Airplane(host, token, name, skip_ssl=SKIP_SSL) as airplane:
-    while True:
-
-        while result := airplane.move():
-            if "error" in result:
-                break
-            
-            num = random.randint(0, 3)
-            if num == 0:
-                airplane.move()
-            if num == 1:
-                airplane.rotate_left()
-            if num == 2:
-                airplane.rotate_left()
-
-            
-        
-        for i in range(1, random.randint(1, 4)):
-            airplane.rotate_left()
-        
-        
-    
+class _BudgetSpent(Exception):
+    pass
+
+
+def fly(airplane, max_actions=None, rng=random):
+    """
+    Move forward until blocked, wandering randomly on the way, then turn a
+    random number of times and repeat. Flies forever unless `max_actions`
+    limits the number of requests sent.
+    """
+    actions = 0
+
+    def act(action):
+        nonlocal actions
+        if max_actions is not None and actions >= max_actions:
+            raise _BudgetSpent
+        actions += 1
+        return action()
+
+    try:
+        while True:
+
+            while result := act(airplane.move):
+                if "error" in result:
+                    break
+
+                num = rng.randint(0, 3)
+                if num == 0:
+                    act(airplane.move)
+                if num == 1:
+                    act(airplane.rotate_left)
+                if num == 2:
+                    act(airplane.rotate_left)
+
+            for i in range(1, rng.randint(1, 4)):
+                act(airplane.rotate_left)
+    except _BudgetSpent:
+        return actions
+
+
+def main():
+    SKIP_SSL = os.environ.get("SKIP_SSL", "false")
+    SKIP_SSL = SKIP_SSL.lower() == "true"
+
+    if len(sys.argv) != 4:
+        print("Usage: python capstone2.py <host> <n> <token>")
+        sys.exit(1)
+
+    host = sys.argv[1]
+    token = sys.argv[3]
+    name = sys.argv[2]
+
+    with Airplane(host, token, name, skip_ssl=SKIP_SSL) as airplane:
+        fly(airplane)
+
+
+if __name__ == "__main__":
+    main()
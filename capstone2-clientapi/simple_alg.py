@@ -1,13 +1,10 @@
 import numpy as np
 import requests
 from capstone2 import Airplane
+from simulator import sensor_footprint
 import time
 import random
 
-# Grid dimensions
-GRID_WIDTH = 100
-GRID_HEIGHT = 100
-
 # Coverage threshold (80% of free cells)
 COVERAGE_THRESHOLD = 0.8
 
@@ -29,29 +26,11 @@ MOVE_DELTA = {
 def get_sensor_footprint(position, orientation):
     """
     Given the aircraft's position (row, col) and orientation, compute the sensor footprint.
-    The sensor covers a 2x3 rectangle ahead of the aircraft.
-    We assume the sensor rectangle is placed immediately in front of the aircraft.
+    The sensor covers a 2x3 rectangle ahead of the aircraft, exactly as the server
+    records it (see simulator.sensor_footprint, which works in (x, y)).
     """
     row, col = position
-    footprint = []
-    # Relative coordinates for a 2x3 rectangle with the aircraft at the bottom center when facing North.
-    # We'll define it for the North orientation and then rotate for other directions.
-    # For North: rectangle is two rows high, three columns wide, in front of the aircraft.
-    rel_coords = [(-1, -1), (-1, 0), (-1, 1),
-                  (-2, -1), (-2, 0), (-2, 1)]
-    
-    # Rotate relative coordinates based on orientation
-    def rotate(coord, orientation):
-        r, c = coord
-        # 90 degrees clockwise rotation
-        for _ in range(ORIENTATIONS.index(orientation)):
-            r, c = c, -r
-        return (r, c)
-    
-    for rel in rel_coords:
-        dr, dc = rotate(rel, orientation)
-        footprint.append((row + dr, col + dc))
-    return footprint
+    return [(y, x) for x, y in sensor_footprint(col, row, orientation)]
 
 def is_valid(position, grid):
     """
@@ -84,6 +63,8 @@ def apply_action(airplane: Airplane, position, orientation, action, grid):
         # Turn left and then move forward
         def dothis():
             result = airplane.rotate_left()
+            if "error" in result:
+                return position, orientation
             new_orientation = result["rotation"]
             result = airplane.move()
             try:
@@ -99,6 +80,8 @@ def apply_action(airplane: Airplane, position, orientation, action, grid):
         # Turn right and then move forward
         def dothis():
             result = airplane.rotate_right()
+            if "error" in result:
+                return position, orientation
             new_orientation = result["rotation"]
             result = airplane.move()
             try:
@@ -106,7 +89,8 @@ def apply_action(airplane: Airplane, position, orientation, action, grid):
                 return new_position, new_orientation
             except:
                 return position, new_orientation
-        new_orientation = ORIENTATIONS[(ORIENTATIONS.index(orientation) + 1) % 4]
+        # The server's rotate_right turns counter-clockwise
+        new_orientation = ORIENTATIONS[(ORIENTATIONS.index(orientation) - 1) % 4]
         dr, dc = MOVE_DELTA[new_orientation]
         new_position = (position[0] + dr, position[1] + dc)
     
@@ -125,7 +109,7 @@ def compute_coverage(visited, grid):
     Compute the fraction of free grid cells that have been covered.
     visited is a boolean grid the same size as grid.
     """
-    free_cells = np.sum(grid == 0)
+    free_cells = np.sum(grid == 1)
     covered_cells = np.sum(visited)
     return covered_cells / free_cells if free_cells > 0 else 0
 
@@ -147,7 +131,7 @@ def simulate_flight(airplane: Airplane, grid, start_position, start_orientation,
     # Initially mark sensor footprint as covered.
     for cell in get_sensor_footprint(current_position, current_orientation):
         r, c = cell
-        if 0 <= r < grid.shape[0] and 0 <= c < grid.shape[1]:
+        if 0 <= r < grid.shape[0] and 0 <= c < grid.shape[1] and grid[r, c] == 1:
             visited[r, c] = True
 
     steps = 0
@@ -167,7 +151,7 @@ def simulate_flight(airplane: Airplane, grid, start_position, start_orientation,
             new_cells = 0
             for (r, c) in footprint:
                 if 0 <= r < grid.shape[0] and 0 <= c < grid.shape[1]:
-                    if grid[r, c] == 0 and not visited[r, c]:
+                    if grid[r, c] == 1 and not visited[r, c]:
                         new_cells += 1
             if new_cells > best_new_cells:
                 best_new_cells = new_cells
@@ -178,7 +162,11 @@ def simulate_flight(airplane: Airplane, grid, start_position, start_orientation,
         if best_action is None:
             best_next_state = apply_action(airplane, current_position, current_orientation, "F", grid)
             if best_next_state[0] is None:
-                current_orientation = "UP"
+                # Boxed in on all three sides: turn in place and try again
+                result = airplane.rotate_left()
+                if "error" not in result:
+                    current_orientation = result["rotation"]
+                steps += 1
                 continue
 
         # Update current state
@@ -190,7 +178,7 @@ def simulate_flight(airplane: Airplane, grid, start_position, start_orientation,
         # Update visited cells with new sensor footprint.
         for cell in get_sensor_footprint(current_position, current_orientation):
             r, c = cell
-            if 0 <= r < grid.shape[0] and 0 <= c < grid.shape[1]:
+            if 0 <= r < grid.shape[0] and 0 <= c < grid.shape[1] and grid[r, c] == 1:
                 visited[r, c] = True
         
         steps += 1
@@ -220,9 +208,9 @@ def main():
     with Airplane(host, token, name, skip_ssl=SKIP_SSL) as airplane:
         grid = airplane.get_grid()
 
-        # map 255,255,255 to 1
-        for i in range(GRID_HEIGHT):
-            for j in range(GRID_WIDTH):
+        # map 255,255,255 to 1, dimensions come from the world
+        for i in range(len(grid)):
+            for j in range(len(grid[i])):
                 if grid[i][j] == [255,255,255]:
                     grid[i][j] = 1
                 else:
@@ -236,9 +224,9 @@ def main():
 
         # Set starting position and orientation (choose a free cell)
         start_position = start_y, start_x
-        if grid[start_position] == 1:
+        if grid[start_position] == 0:
             # If starting cell is an obstacle, choose an alternative free cell.
-            start_position = (GRID_HEIGHT - 1, 1)
+            start_position = (grid.shape[0] - 1, 1)
         start_orientation = rotation
 
         # Run the simulation
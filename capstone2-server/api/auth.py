@@ -1,16 +1,137 @@
 from rest_framework.authentication import BaseAuthentication
 from rest_framework.exceptions import AuthenticationFailed
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
 from accounts.models import User
+from . import metrics
 from jwt.exceptions import ExpiredSignatureError, InvalidTokenError
+from collections import OrderedDict
+import hashlib
 import os
 import jwt
 import logging
 import datetime
+import threading
+import time
+import uuid
 
 logger = logging.getLogger(__name__)
 
 JWT_SECRET = os.environ["JWT_SECRET"]
 
+
+class TokenCache:
+    """
+    Bounded cache of verified tokens and their users, so repeated requests
+    with the same token skip the signature check and the user lookup. An
+    entry lives for `ttl` seconds and never past the token's `exp`.
+
+    Entries are kept in process memory, or in the Django cache named by
+    `backend` so that every worker shares them. Saving or deleting a user
+    drops the user's entries: in this process for the in-process cache,
+    everywhere for a shared one.
+    """
+
+    def __init__(self, max_size=1024, ttl=60, backend=None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.backend = backend
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return self.ttl > 0 and self.max_size > 0
+
+    @staticmethod
+    def _key(token):
+        # Keep digests rather than the tokens themselves
+        return "auth-token:" + hashlib.sha256(token.encode()).hexdigest()
+
+    @staticmethod
+    def _version_key(user_id):
+        return f"auth-user-version:{user_id}"
+
+    def get(self, token):
+        """
+        Returns the cached user for a token, or None.
+        """
+        if not self.enabled:
+            return None
+        key = self._key(token)
+        if self.backend is not None:
+            cache = caches[self.backend]
+            entry = cache.get(key)
+            if entry is None:
+                return None
+            user, version = entry
+            return user if cache.get(self._version_key(user.pk)) == version else None
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            user, expires_at = entry
+            if expires_at <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return user
+
+    def set(self, token, user, exp=None):
+        if not self.enabled:
+            return
+        now = time.time()
+        expires_at = now + self.ttl if exp is None else min(now + self.ttl, exp)
+        if expires_at <= now:
+            return
+        key = self._key(token)
+        if self.backend is not None:
+            cache = caches[self.backend]
+            version = cache.get(self._version_key(user.pk))
+            cache.set(key, (user, version), expires_at - now)
+            return
+
+        with self._lock:
+            self._entries[key] = (user, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate_user(self, user_id):
+        if self.backend is not None:
+            # Entries store the version current when they were cached; a new
+            # version outlives every entry created before it
+            caches[self.backend].set(self._version_key(user_id), uuid.uuid4().hex, self.ttl)
+            return
+        with self._lock:
+            for key in [key for key, (user, _) in self._entries.items() if user.pk == user_id]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+token_cache = TokenCache(
+    max_size=getattr(settings, "AUTH_TOKEN_CACHE_SIZE", 1024),
+    ttl=getattr(settings, "AUTH_TOKEN_CACHE_TTL", 60),
+    backend=getattr(settings, "AUTH_TOKEN_CACHE_BACKEND", None),
+)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_cached_tokens(sender, instance, **kwargs):
+    # Deactivated, deleted or edited users must not be served from the cache
+    token_cache.invalidate_user(instance.pk)
+
+
 class CustomOAuthAuthentication(BaseAuthentication):
     def authenticate(self, request):
         # Extract the token from the Authorization header
@@ -37,12 +158,17 @@ class CustomOAuthAuthentication(BaseAuthentication):
     def validate_token(self, token):
         # Replace this with your logic to validate the token
         # For example, you might query your database or call an external service
+        user = token_cache.get(token)
+        if user is not None:
+            metrics.CACHE_LOOKUPS.labels("token", "hit").inc()
+            return user
+        metrics.CACHE_LOOKUPS.labels("token", "miss").inc()
+
         try:
             
-            token = jwt.decode(token, JWT_SECRET, algorithms=["HS256"], options={"verify_aud":False})
+            payload = jwt.decode(token, JWT_SECRET, algorithms=["HS256"], options={"verify_aud":False})
             # Example: Find the user associated with the token
-            user = User.objects.get(id=token["sub"])  # Replace `oauth_token` with your field
-            return user
+            user = User.objects.get(id=payload["sub"])  # Replace `oauth_token` with your field
         
         except ExpiredSignatureError:
             raise AuthenticationFailed('Token has expired.')
@@ -51,6 +177,11 @@ class CustomOAuthAuthentication(BaseAuthentication):
         except User.DoesNotExist:
             raise AuthenticationFailed('User not found.')
 
+        if not user.is_active:
+            raise AuthenticationFailed('User is inactive.')
+        token_cache.set(token, user, payload.get("exp"))
+        return user
+
 
 def generate_token_from_user(user):
     # Generate a JWT token from the user
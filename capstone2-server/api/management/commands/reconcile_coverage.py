@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from api.models import World, CoverageStatistics
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute coverage statistics from scratch. The counters are maintained "
+        "incrementally by airplane actions and can drift when airplanes or their "
+        "scanned cells are deleted; run this periodically (e.g. from cron) or on demand."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("world_ids", nargs="*", type=int, help="Worlds to reconcile (default: all)")
+
+    def handle(self, *args, **options):
+        worlds = World.objects.defer("occupancy")
+        if options["world_ids"]:
+            worlds = worlds.filter(id__in=options["world_ids"])
+
+        for world in worlds.iterator():
+            stats, _ = CoverageStatistics.objects.get_or_create(world=world)
+            before = (stats.total_cells, stats.scanned_cells, stats.path_length)
+            stats.reconcile()
+            after = (stats.total_cells, stats.scanned_cells, stats.path_length)
+            if before != after:
+                self.stdout.write(f"World {world.id}: (total, scanned, path) {before} -> {after}")
+        self.stdout.write(self.style.SUCCESS("Coverage statistics reconciled"))
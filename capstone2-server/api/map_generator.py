@@ -1,61 +1,129 @@
 import pathlib
 import random
-import json
 import numpy as np
-from noise import snoise2
 
 # This script generates a 2D grid world of clear spaces and obstacles. The world
 # is represented by a 2D array of zeroes and ones. Zeroes are clear free space
 # and ones are an obstacle. The grid data is written to a CSV file and a supporting
 # configuration data file is generated describing the grid world.
 #
-# Note: To run this file locally you'll need to install numpy, matplotlib, and noise
-# `pip install matplotlib`
+# Noise is computed with a vectorized 2D simplex noise implementation, so whole
+# grids are generated with a handful of NumPy operations per octave.
+#
+# Note: To run this file locally you'll need to install numpy
 # `pip install numpy`
-# `pip install noise`
 
+# Skewing factors for 2D simplex noise
+_F2 = 0.5 * (np.sqrt(3.0) - 1.0)
+_G2 = (3.0 - np.sqrt(3.0)) / 6.0
+
+# Gradient directions (x and y components of the 12 classic simplex gradients)
+_GRAD2 = np.array([
+    (1, 1), (-1, 1), (1, -1), (-1, -1),
+    (1, 0), (-1, 0), (1, 0), (-1, 0),
+    (0, 1), (0, -1), (0, 1), (0, -1),
+], dtype=float)
+
+
+def permutation_table(seed=None) -> np.ndarray:
+    """
+    Returns a seeded permutation of 0..255 repeated twice, used to hash
+    lattice points to gradients.
+    """
+    perm = np.random.default_rng(seed).permutation(256)
+    return np.concatenate([perm, perm])
+
+
+def simplex_noise(x: np.ndarray, y: np.ndarray, perm: np.ndarray) -> np.ndarray:
+    """
+    Vectorized 2D simplex noise. Returns values roughly in [-1, 1] with the
+    shape of the broadcast coordinate arrays.
+    """
+    grad_index = perm % 12
+    grad_x, grad_y = _GRAD2[:, 0], _GRAD2[:, 1]
+
+    # Skew the input space to find the containing simplex cell
+    s = (x + y) * _F2
+    i = np.floor(x + s)
+    j = np.floor(y + s)
+    t = (i + j) * _G2
+    x0 = x - (i - t)
+    y0 = y - (j - t)
+
+    # Offsets of the middle corner, depending on which triangle we are in
+    i1 = (x0 > y0).astype(np.int32)
+    j1 = 1 - i1
+
+    x1 = x0 - i1 + _G2
+    y1 = y0 - j1 + _G2
+    x2 = x0 - 1.0 + 2.0 * _G2
+    y2 = y0 - 1.0 + 2.0 * _G2
+
+    # Wrap to the permutation table before the integer cast, the lattice
+    # coordinates of high octaves exceed the int32 range
+    ii = np.mod(i, 256).astype(np.int32)
+    jj = np.mod(j, 256).astype(np.int32)
+    gradients = (
+        grad_index[ii + perm[jj]],
+        grad_index[ii + i1 + perm[jj + j1]],
+        grad_index[ii + 1 + perm[jj + 1]],
+    )
+
+    total = np.zeros(np.broadcast(x, y).shape)
+    for gi, dx, dy in zip(gradients, (x0, x1, x2), (y0, y1, y2)):
+        falloff = 0.5 - dx * dx - dy * dy
+        np.maximum(falloff, 0.0, out=falloff)
+        falloff *= falloff
+        falloff *= falloff
+        total += falloff * (grad_x[gi] * dx + grad_y[gi] * dy)
+    return 70.0 * total
+
+
+def fractal_noise(x, y, octaves, persistence, lacunarity, perm) -> np.ndarray:
+    """
+    Sums `octaves` layers of simplex noise (fractal Brownian motion),
+    normalized by the total amplitude.
+    """
+    total = np.zeros(np.broadcast(x, y).shape)
+    frequency = 1.0
+    amplitude = 1.0
+    max_amplitude = 0.0
+    for _ in range(octaves):
+        total += simplex_noise(x * frequency, y * frequency, perm) * amplitude
+        max_amplitude += amplitude
+        frequency *= lacunarity
+        amplitude *= persistence
+    return total / max_amplitude
 
-def generate_grid(width, height, scale, threshold, octaves, persistence, lacunarity) -> np.ndarray:
 
-    grid = np.zeros((height, width), dtype=int)
+def generate_grid(width, height, scale, threshold, octaves, persistence, lacunarity, seed=None) -> np.ndarray:
 
-    for y in range(height):
-        for x in range(width):
-            noise_value = snoise2(x / scale, y / scale, octaves, persistence, lacunarity)
-            normalized_value = (noise_value + 1) / 2
-            
-            if normalized_value > threshold:
-                grid[y, x] = 1  # Obstacle
-            else:
-                grid[y, x] = 0  # Clear space
+    perm = permutation_table(seed)
+    xs, ys = np.meshgrid(np.arange(width) / scale, np.arange(height) / scale)
+    normalized_value = (fractal_noise(xs, ys, octaves, persistence, lacunarity, perm) + 1) / 2
 
-    return grid
+    # 1 is an obstacle, 0 is clear space
+    return (normalized_value > threshold).astype(int)
 
-def find_start_coordinate(grid: np.ndarray):
+def find_start_coordinate(grid: np.ndarray, rng=None):
     """
     Find a random clear space to serve as the starting point for a search vehicle.
 
     Args:
         grid: A 2D grid of zeros and ones.
+        rng: NumPy random Generator used to pick the cell.
 
     Returns:
         A tuple of row and column indecies into the grid where the search vehicle
         should start.
     """
-    row_index = None
-    col_index = None
+    rng = rng or np.random.default_rng()
+    clear_cells = np.flatnonzero(grid == 0)
+    if clear_cells.size == 0:
+        raise ValueError("Grid has no clear space")
 
-    while True:
-        random_index = np.random.randint(0, grid.size)
-
-        # Convert the index to 2D coordinates
-        row_index = random_index // grid.shape[1]
-        col_index = random_index % grid.shape[1]
-
-        # Check if the coordinate is clear of obstacles
-        random_cell = grid[row_index, col_index]
-        if random_cell == 0:
-            break
+    # Convert a random clear index to 2D coordinates
+    row_index, col_index = divmod(int(rng.choice(clear_cells)), grid.shape[1])
     
     return row_index, col_index
 
@@ -87,7 +155,7 @@ def main():
     width = 100  # Width of the grid
     height = 100  # Height of the grid
 
-    #random.seed(42)
+    seed = random.randrange(2**32)
 
     scale = 50.0
     threshold = 0.4  # Threshold for determining if noise value becomes an obstacle
@@ -95,31 +163,59 @@ def main():
     persistence = random.uniform(0.25, 4.5)
     lacunarity = random.uniform(1, 5)
 
+    print(f'Seed: {seed}')
     print(f'Octaves: {octaves}')
     print(f'Persistence: {persistence}')
     print(f'Lacunarity: {lacunarity}')
 
-    grid = generate_grid(width, height, scale, threshold, octaves, persistence, lacunarity)
-    grid_list = [[[255, 255, 255] if cell == 1 else [0, 0, 0] for cell in row] for row in grid.tolist()]
-    
+    grid = generate_grid(width, height, scale, threshold, octaves, persistence, lacunarity, seed)
 
     np.savetxt('grid_world.csv', grid, delimiter=',', fmt='%d')
     write_problem_params(pathlib.Path(f'./grid_world_params.txt'), grid)
 
 
-def generate_map():
-    width = 100  # Width of the grid
-    height = 100  # Height of the grid
-    scale = 50.0
-    threshold = 0.4  # Threshold for determining if noise value becomes an obstacle
-    octaves = 2
-    persistence = random.uniform(0.25, 4.5)
-    lacunarity = random.uniform(1, 5)
-    grid = generate_grid(width, height, scale, threshold, octaves, persistence, lacunarity)
-    grid_list = [[[255, 255, 255] if cell == 1 else [0, 0, 0] for cell in row] for row in grid.tolist()]
-    pos = find_start_coordinate(grid)
+def resolve_params(seed=None, scale=None, threshold=None, octaves=None, persistence=None, lacunarity=None):
+    """
+    Fill in unspecified generation parameters. A random seed is chosen when
+    omitted, and persistence and lacunarity are drawn from the seed, so the
+    same seed always resolves to the same parameters.
+    """
+    if seed is None:
+        seed = random.randrange(2**32)
+    rng = random.Random(seed)
+    drawn_persistence = rng.uniform(0.25, 4.5)
+    drawn_lacunarity = rng.uniform(1, 5)
+    return {
+        "seed": seed,
+        "scale": 50.0 if scale is None else scale,
+        "threshold": 0.4 if threshold is None else threshold,  # Threshold for determining if noise value becomes an obstacle
+        "octaves": 2 if octaves is None else octaves,
+        "persistence": drawn_persistence if persistence is None else persistence,
+        "lacunarity": drawn_lacunarity if lacunarity is None else lacunarity,
+    }
+
+
+def generate_world(width=100, height=100, seed=None, **params):
+    """
+    Generate a world deterministically from `seed` and the noise parameters
+    accepted by `resolve_params`.
 
-    
-    with open("/app/api/output.json") as fp:
-        grid_list = json.load(fp)
+    Returns:
+        A boolean grid that is True for traversable cells, and a random
+        traversable (row, col) start coordinate.
+    """
+    params = resolve_params(seed, **params)
+    grid = generate_grid(width, height, params["scale"], params["threshold"], params["octaves"],
+                         params["persistence"], params["lacunarity"], seed=params["seed"])
+    pos = find_start_coordinate(grid, np.random.default_rng(params["seed"]))
+    return grid == 0, pos
+
+
+def generate_map(width=100, height=100, seed=None, **params):
+    """
+    Generate a world and return it as a nested RGB list (white is traversable)
+    together with the start coordinate.
+    """
+    grid, pos = generate_world(width, height, seed, **params)
+    grid_list = [[[255, 255, 255] if cell else [0, 0, 0] for cell in row] for row in grid.tolist()]
     return grid_list, pos
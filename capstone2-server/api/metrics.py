@@ -0,0 +1,71 @@
+import os
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+# Prometheus metrics, exposed at /services/metrics. Under gunicorn every worker
+# keeps its own values; set PROMETHEUS_MULTIPROC_DIR to an empty directory
+# shared by the workers so the endpoint reports their sum.
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 100)
+
+REQUEST_LATENCY = Histogram(
+    "capstone2_request_duration_seconds", "Request latency",
+    ["method", "endpoint", "status"], buckets=LATENCY_BUCKETS,
+)
+REQUEST_QUERIES = Histogram(
+    "capstone2_request_db_queries", "Database queries run by a request",
+    ["method", "endpoint"], buckets=QUERY_BUCKETS,
+)
+REQUEST_DB_TIME = Histogram(
+    "capstone2_request_db_duration_seconds", "Time a request spent in database queries",
+    ["method", "endpoint"], buckets=LATENCY_BUCKETS,
+)
+
+AIRPLANE_ACTIONS = Counter(
+    "capstone2_airplane_actions_total", "Airplane actions, by whether they were applied",
+    ["action", "result"],
+)
+AIRPLANE_ACTION_LATENCY = Histogram(
+    "capstone2_airplane_action_duration_seconds", "Airplane action latency by the airplane's flight length",
+    ["action", "path_length"], buckets=LATENCY_BUCKETS,
+)
+SCANNED_CELLS = Counter("capstone2_scanned_cells_total", "Newly scanned cells")
+
+CACHE_LOOKUPS = Counter("capstone2_cache_lookups_total", "In-process cache lookups", ["cache", "result"])
+
+
+def path_length_bucket(path_length):
+    """
+    Label for a flight length, by order of magnitude: "0-9", "10-99", ...
+    """
+    low, high = 0, 10
+    while path_length >= high and high < 10_000:
+        low, high = high, high * 10
+    return f"{low}-{high - 1}" if path_length < high else f"{high}+"
+
+
+def record_action(action, applied, duration, path_length):
+    AIRPLANE_ACTIONS.labels(action, "applied" if applied else "rejected").inc()
+    AIRPLANE_ACTION_LATENCY.labels(action, path_length_bucket(path_length)).observe(duration)
+
+
+def render():
+    """
+    Returns the Prometheus text exposition of every metric and its content
+    type.
+    """
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
@@ -0,0 +1,166 @@
+import cProfile
+import io
+import logging
+import os
+import pstats
+import random
+import tempfile
+import threading
+import time
+import uuid
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse
+from rest_framework.exceptions import AuthenticationFailed
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+
+@contextmanager
+def track_queries():
+    """
+    Counts the database queries run inside the block, on every connection,
+    and the time spent in them. Yields a dict with `count` and `time`.
+    """
+    stats = {"count": 0, "time": 0.0}
+
+    def count_query(execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            stats["count"] += 1
+            stats["time"] += time.perf_counter() - started
+
+    with ExitStack() as stack:
+        for alias in connections:
+            stack.enter_context(connections[alias].execute_wrapper(count_query))
+        yield stats
+
+
+class QueryCountMiddleware:
+    """
+    Reports the number of database queries a request ran, and the time spent
+    in them, in the X-Query-Count and X-Query-Time-Ms response headers. Used by
+    the load-test harness; enabled with the QUERY_COUNT_HEADERS setting.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = getattr(settings, "QUERY_COUNT_HEADERS", False)
+
+    def __call__(self, request):
+        if not self.enabled:
+            return self.get_response(request)
+
+        with track_queries() as stats:
+            response = self.get_response(request)
+
+        response["X-Query-Count"] = str(stats["count"])
+        response["X-Query-Time-Ms"] = f"{stats['time'] * 1000:.2f}"
+        return response
+
+
+class MetricsMiddleware:
+    """
+    Records each request's latency, query count and database time in the
+    Prometheus histograms of api.metrics, labelled with the URL name of the
+    endpoint (e.g. "airplane-move"). Enabled with the METRICS_ENABLED setting.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = getattr(settings, "METRICS_ENABLED", True)
+
+    def __call__(self, request):
+        if not self.enabled:
+            return self.get_response(request)
+
+        started = time.perf_counter()
+        with track_queries() as stats:
+            response = self.get_response(request)
+        duration = time.perf_counter() - started
+
+        match = request.resolver_match
+        endpoint = (match.view_name or match.route) if match else "unmatched"
+        metrics.REQUEST_LATENCY.labels(request.method, endpoint, response.status_code).observe(duration)
+        metrics.REQUEST_QUERIES.labels(request.method, endpoint).observe(stats["count"])
+        metrics.REQUEST_DB_TIME.labels(request.method, endpoint).observe(stats["time"])
+        return response
+
+
+class ProfilingMiddleware:
+    """
+    Runs views under cProfile and stores the report in PROFILE_DIR, named in
+    the X-Profile response header (open it with pstats or snakeviz).
+
+    Staff users profile a request on demand with an "X-Profile: 1" header or
+    a `?profile=1` query parameter; with the value "text" the response is
+    replaced by the report as text. Requests to PROFILE_SAMPLED_ENDPOINTS are
+    also profiled at random, a PROFILE_SAMPLE_RATE fraction of them, without
+    changing their response.
+
+    One request is profiled at a time per process, others run as usual.
+    """
+
+    TEXT_REPORT_LINES = 40
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.sample_rate = getattr(settings, "PROFILE_SAMPLE_RATE", 0.0)
+        self.sampled_endpoints = set(getattr(settings, "PROFILE_SAMPLED_ENDPOINTS", ()))
+        self.directory = getattr(settings, "PROFILE_DIR", None) or os.path.join(tempfile.gettempdir(), "capstone2-profiles")
+        self.lock = threading.Lock()
+
+    def __call__(self, request):
+        return self.get_response(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        mode = request.headers.get("X-Profile") or request.GET.get("profile")
+        if mode and not self._is_staff(request):
+            mode = None
+        endpoint = request.resolver_match.view_name
+        if not mode and not (endpoint in self.sampled_endpoints and random.random() < self.sample_rate):
+            return None
+        if not self.lock.acquire(blocking=False):
+            return None
+
+        def run_view():
+            response = view_func(request, *view_args, **view_kwargs)
+            # Include serializing the response in the profile
+            if hasattr(response, "render"):
+                response.render()
+            return response
+
+        try:
+            profiler = cProfile.Profile()
+            response = profiler.runcall(run_view)
+        finally:
+            self.lock.release()
+
+        name = f"{time.strftime('%Y%m%d-%H%M%S')}-{endpoint}-{uuid.uuid4().hex[:8]}.prof"
+        os.makedirs(self.directory, exist_ok=True)
+        profiler.dump_stats(os.path.join(self.directory, name))
+        logger.info(f"Profiled {request.method} {request.path} to {name}")
+
+        if mode == "text":
+            report = io.StringIO()
+            pstats.Stats(profiler, stream=report).sort_stats("cumulative").print_stats(self.TEXT_REPORT_LINES)
+            response = HttpResponse(report.getvalue(), content_type="text/plain",
+                                    headers={"X-Profile-Status": response.status_code})
+        response["X-Profile"] = name
+        return response
+
+    @staticmethod
+    def _is_staff(request):
+        from .auth import CustomOAuthAuthentication
+
+        try:
+            authenticated = CustomOAuthAuthentication().authenticate(request)
+        except AuthenticationFailed:
+            return False
+        return authenticated is not None and authenticated[0].is_staff
@@ -0,0 +1,89 @@
+import numpy as np
+from django.db import migrations, models
+
+# Frozen copies of the api.occupancy helpers as of this migration, so later
+# changes to that module don't change what the migration does.
+
+TRAVERSABLE_RGB = [255, 255, 255]
+OBSTACLE_RGB = [0, 0, 0]
+
+
+def is_traversable_value(cell):
+    if isinstance(cell, (list, tuple)):
+        return list(cell) == TRAVERSABLE_RGB
+    return cell == 255
+
+
+def basemap_to_grid(basemap):
+    height = len(basemap)
+    width = len(basemap[0]) if height > 0 else 0
+    grid = np.zeros((height, width), dtype=bool)
+    for y, row in enumerate(basemap):
+        for x, cell in enumerate(row):
+            grid[y, x] = is_traversable_value(cell)
+    return grid
+
+
+def grid_to_basemap(grid):
+    return [[TRAVERSABLE_RGB if cell else OBSTACLE_RGB for cell in row] for row in grid.tolist()]
+
+
+def pack_grid(grid):
+    return np.packbits(np.asarray(grid, dtype=bool), axis=None).tobytes()
+
+
+def unpack_grid(data, width, height):
+    bits = np.unpackbits(np.frombuffer(bytes(data), dtype=np.uint8), count=width * height)
+    return bits.reshape((height, width)).astype(bool)
+
+
+def pack_basemaps(apps, schema_editor):
+    World = apps.get_model("api", "World")
+    for world in World.objects.all().iterator():
+        grid = basemap_to_grid(world.basemap or [])
+        world.height, world.width = grid.shape
+        world.occupancy = pack_grid(grid)
+        world.save(update_fields=["occupancy", "width", "height"])
+
+
+def unpack_basemaps(apps, schema_editor):
+    World = apps.get_model("api", "World")
+    for world in World.objects.all().iterator():
+        world.basemap = grid_to_basemap(unpack_grid(world.occupancy, world.width, world.height))
+        world.save(update_fields=["basemap"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0005_airplane_flight_ended"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="world",
+            name="occupancy",
+            field=models.BinaryField(default=b""),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name="world",
+            name="width",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="world",
+            name="height",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name="world",
+            name="basemap",
+            field=models.JSONField(null=True),
+        ),
+        migrations.RunPython(pack_basemaps, unpack_basemaps),
+        migrations.RemoveField(
+            model_name="world",
+            name="basemap",
+        ),
+    ]
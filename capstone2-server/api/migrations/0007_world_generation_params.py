@@ -0,0 +1,41 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0006_world_occupancy"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="world",
+            name="seed",
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="world",
+            name="scale",
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="world",
+            name="threshold",
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="world",
+            name="octaves",
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="world",
+            name="persistence",
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="world",
+            name="lacunarity",
+            field=models.FloatField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-17 22:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_world_generation_params'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='scannedcell',
+            index=models.Index(fields=['world', 'id'], name='api_scanned_world_i_2bd03d_idx'),
+        ),
+    ]
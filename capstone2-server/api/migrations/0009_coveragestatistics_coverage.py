@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 22:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_scannedcell_world_id_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='coveragestatistics',
+            name='coverage_version',
+            field=models.IntegerField(default=0),
+        ),
+    ]
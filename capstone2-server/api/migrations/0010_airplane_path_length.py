@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-17 22:25
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_path_points(apps, schema_editor):
+    Airplane = apps.get_model('api', 'Airplane')
+    PathPoint = apps.get_model('api', 'PathPoint')
+    points = (
+        PathPoint.objects.filter(airplane=OuterRef('pk'))
+        .order_by().values('airplane').annotate(count=Count('id')).values('count')
+    )
+    Airplane.objects.update(path_length=Coalesce(Subquery(points), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_coveragestatistics_coverage'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='airplane',
+            name='path_length',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(count_path_points, migrations.RunPython.noop),
+    ]
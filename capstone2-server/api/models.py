@@ -1,17 +1,55 @@
-from django.db import models
+from django.db import models, connections
+from django.db.models import F, FloatField
+from django.db.models.functions import Cast, Coalesce, NullIf
+from django.utils import timezone
 from accounts.models import User
+from .occupancy import pack_grid, unpack_grid, basemap_to_grid, grid_to_basemap, mark_cells
+from .world_cache import coverage_cache, get_decoded_world
 import random
 
 # Create your models here.
 
 class World(models.Model):
     owner = models.ForeignKey(User, related_name='worlds', on_delete=models.CASCADE)
-    basemap = models.JSONField()
+    # Packed traversability bitset, see api.occupancy
+    occupancy = models.BinaryField()
+    width = models.IntegerField(default=0)
+    height = models.IntegerField(default=0)
     name = models.CharField(max_length=100)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     start_x = models.IntegerField()
     start_y = models.IntegerField()
+    # Map generation parameters, see api.map_generator (null for worlds created before they were recorded)
+    seed = models.BigIntegerField(null=True, blank=True)
+    scale = models.FloatField(null=True, blank=True)
+    threshold = models.FloatField(null=True, blank=True)
+    octaves = models.IntegerField(null=True, blank=True)
+    persistence = models.FloatField(null=True, blank=True)
+    lacunarity = models.FloatField(null=True, blank=True)
+
+    @property
+    def grid(self):
+        """
+        2D boolean array (height x width), True where the cell is traversable.
+        """
+        return unpack_grid(self.occupancy, self.width, self.height)
+
+    @grid.setter
+    def grid(self, grid):
+        self.height, self.width = grid.shape
+        self.occupancy = pack_grid(grid)
+
+    @property
+    def basemap(self):
+        """
+        Nested RGB list form of the map, built on demand for API output.
+        """
+        return grid_to_basemap(self.grid)
+
+    @basemap.setter
+    def basemap(self, basemap):
+        self.grid = basemap_to_grid(basemap)
 
     def __str__(self):
         return self.name
@@ -38,6 +76,8 @@ class Airplane(models.Model):
     ], default=Direction.UP)
     color = models.CharField(max_length=7, default=None, blank=True, null=True)  # RGB hex string like '#A1B2C3'
     flight_ended = models.BooleanField(default=False)
+    # Number of path points recorded, kept alongside the position so it costs no query
+    path_length = models.IntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -76,6 +116,69 @@ class PathPoint(models.Model):
         ]
 
 
+class ScannedCellQuerySet(models.QuerySet):
+    # Rows per INSERT statement, keeps the parameter count within backend limits
+    insert_batch_size = 1000
+
+    def coverage_bitmap(self, world, base=b'', after_id=None):
+        """
+        Packed bitset of the cells scanned in the world, and the highest
+        ScannedCell id it includes. Built from scratch, or by adding the cells
+        with ids above `after_id` to `base`, a bitmap that includes every cell
+        up to that id.
+        """
+        cells = self.filter(world=world)
+        if after_id is not None:
+            cells = cells.filter(id__gt=after_id)
+        last_id = after_id or 0
+
+        def positions():
+            nonlocal last_id
+            for cell_id, pos_x, pos_y in cells.values_list('id', 'pos_x', 'pos_y').iterator():
+                last_id = max(last_id, cell_id)
+                yield pos_x, pos_y
+
+        coverage = mark_cells(base, world.width, world.height, positions())
+        return coverage, last_id
+
+    def insert_new(self, world, airplane, cells):
+        """
+        Inserts the given (x, y) cells as scanned by the airplane, skipping
+        cells already scanned in the world, with one INSERT ... ON CONFLICT
+        DO NOTHING statement per batch. Returns the list of newly covered
+        (x, y) cells.
+        """
+        cells = list(dict.fromkeys(cells))
+        if not cells:
+            return []
+
+        connection = connections[self.db]
+        opts = self.model._meta
+        qn = connection.ops.quote_name
+        columns = [opts.get_field(name).column for name in ('world', 'airplane', 'pos_x', 'pos_y', 'timestamp')]
+        conflict = [opts.get_field(name).column for name in ('world', 'pos_x', 'pos_y')]
+        timestamp = connection.ops.adapt_datetimefield_value(timezone.now())
+
+        new_cells = []
+        with connection.cursor() as cursor:
+            for start in range(0, len(cells), self.insert_batch_size):
+                batch = cells[start:start + self.insert_batch_size]
+                sql = "INSERT INTO {} ({}) VALUES {} ON CONFLICT ({}) DO NOTHING RETURNING {}, {}".format(
+                    qn(opts.db_table),
+                    ", ".join(qn(column) for column in columns),
+                    ", ".join(["(%s, %s, %s, %s, %s)"] * len(batch)),
+                    ", ".join(qn(column) for column in conflict),
+                    qn(columns[2]),
+                    qn(columns[3]),
+                )
+                params = []
+                for pos_x, pos_y in batch:
+                    params.extend([world.pk, airplane.pk, pos_x, pos_y, timestamp])
+                cursor.execute(sql, params)
+                new_cells.extend(tuple(row) for row in cursor.fetchall())
+        return new_cells
+
+
 class ScannedCell(models.Model):
     """
     Model to track each cell that has been scanned by an airplane.
@@ -85,25 +188,68 @@ class ScannedCell(models.Model):
     pos_x = models.IntegerField()
     pos_y = models.IntegerField()
     timestamp = models.DateTimeField(auto_now_add=True)
+
+    objects = ScannedCellQuerySet.as_manager()
     
     class Meta:
         # Ensure we don't duplicate entries for the same cell in the same world
         unique_together = ('world', 'pos_x', 'pos_y')
         indexes = [
             models.Index(fields=['world', 'airplane']),
+            # Backs the since_id cursor: WHERE world = ? AND id > ? ORDER BY id
+            models.Index(fields=['world', 'id']),
         ]
 
 
+class CoverageStatisticsQuerySet(models.QuerySet):
+
+    def record_progress(self, world, new_cells=0, new_points=0, cells=()):
+        """
+        Atomically adds newly scanned cells and path points to the world's
+        statistics with a single UPDATE. Falls back to a full reconcile if the
+        world has no statistics row yet.
+
+        `cells` are the newly scanned (x, y) cells; when there are any the
+        coverage version is bumped, so cached coverage bitmaps are rebuilt
+        from the scanned cells when next read.
+        """
+        changes = {}
+        if cells:
+            changes['coverage_version'] = F('coverage_version') + 1
+
+        updated = self.filter(world=world).update(
+            **changes,
+            scanned_cells=F('scanned_cells') + new_cells,
+            path_length=F('path_length') + new_points,
+            coverage_percentage=Coalesce(
+                Cast(F('scanned_cells') + new_cells, FloatField()) * 100 / NullIf(F('total_cells'), 0),
+                0.0,
+                output_field=FloatField(),
+            ),
+            last_updated=timezone.now(),
+        )
+        if not updated:
+            stats, _ = self.get_or_create(world=world)
+            stats.reconcile()
+
+
 class CoverageStatistics(models.Model):
     """
     Model to store coverage statistics for each world.
+    Counters are maintained incrementally by the airplane actions, use
+    `reconcile` to recompute them from scratch.
     """
     world = models.OneToOneField(World, related_name='coverage_stats', on_delete=models.CASCADE)
     total_cells = models.IntegerField(default=0)  # Total number of traversable cells
     scanned_cells = models.IntegerField(default=0)  # Number of unique cells scanned
     coverage_percentage = models.FloatField(default=0.0)  # Percentage of coverage
     path_length = models.IntegerField(default=0)  # Total number of movements
+    # Incremented whenever cells are scanned, keys the cached coverage bitmap
+    # (api.world_cache.coverage_cache) and is used as its ETag
+    coverage_version = models.IntegerField(default=0)
     last_updated = models.DateTimeField(auto_now=True)
+
+    objects = CoverageStatisticsQuerySet.as_manager()
     
     def calculate_coverage(self):
         """
@@ -113,4 +259,19 @@ class CoverageStatistics(models.Model):
             self.coverage_percentage = (self.scanned_cells / self.total_cells) * 100
         else:
             self.coverage_percentage = 0
-        return self.coverage_percentage
\ No newline at end of file
+        return self.coverage_percentage
+
+    def reconcile(self):
+        """
+        Recompute all statistics from the world's map, scanned cells and path
+        points, and save them. Cached coverage bitmaps are rebuilt.
+        """
+        self.total_cells = get_decoded_world(self.world).traversable_count
+        self.scanned_cells = ScannedCell.objects.filter(world=self.world).count()
+        self.path_length = PathPoint.objects.filter(airplane__world=self.world).count()
+        self.coverage_version += 1
+        # Rebuilds the bitmap in full, dropping cells deleted since
+        coverage_cache.invalidate(self.world_id)
+        self.calculate_coverage()
+        self.save()
+        return self
\ No newline at end of file
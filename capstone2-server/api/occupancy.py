@@ -0,0 +1,91 @@
+import numpy as np
+
+# A world's basemap is stored as a packed bitset: one bit per cell, row-major,
+# 1 for traversable (white) and 0 for an obstacle (black). The nested RGB list
+# form is only built when a client asks for it.
+
+TRAVERSABLE_RGB = [255, 255, 255]
+OBSTACLE_RGB = [0, 0, 0]
+
+
+def is_traversable_value(cell) -> bool:
+    """
+    Returns whether a basemap cell value marks clear space. Accepts both the
+    RGB list representation and the single integer representation.
+    """
+    if isinstance(cell, (list, tuple)):
+        return list(cell) == TRAVERSABLE_RGB
+    return cell == 255
+
+
+def basemap_to_grid(basemap) -> np.ndarray:
+    """
+    Converts a nested list basemap into a 2D boolean traversability grid.
+    """
+    height = len(basemap)
+    width = len(basemap[0]) if height > 0 else 0
+    grid = np.zeros((height, width), dtype=bool)
+    for y, row in enumerate(basemap):
+        for x, cell in enumerate(row):
+            grid[y, x] = is_traversable_value(cell)
+    return grid
+
+
+def grid_to_basemap(grid: np.ndarray) -> list:
+    """
+    Converts a 2D boolean traversability grid into the nested RGB list form.
+    """
+    return [[TRAVERSABLE_RGB if cell else OBSTACLE_RGB for cell in row] for row in grid.tolist()]
+
+
+def pack_grid(grid: np.ndarray) -> bytes:
+    """
+    Packs a 2D boolean grid into a row-major bitset.
+    """
+    return np.packbits(np.asarray(grid, dtype=bool), axis=None).tobytes()
+
+
+def unpack_grid(data, width: int, height: int) -> np.ndarray:
+    """
+    Unpacks a row-major bitset produced by `pack_grid` into a 2D boolean grid.
+    """
+    bits = np.unpackbits(np.frombuffer(bytes(data), dtype=np.uint8), count=width * height)
+    return bits.reshape((height, width)).astype(bool)
+
+
+def packed_size(width: int, height: int) -> int:
+    """
+    Number of bytes in the bitset of a width x height grid.
+    """
+    return (width * height + 7) // 8
+
+
+def mark_cells(data, width: int, height: int, cells) -> bytes:
+    """
+    Sets the bits of the given (x, y) cells in a bitset produced by
+    `pack_grid`, without unpacking it. An empty or mis-sized bitset is treated
+    as all zeros.
+    """
+    bits = bytearray(data or b"")
+    if len(bits) != packed_size(width, height):
+        bits = bytearray(packed_size(width, height))
+    for x, y in cells:
+        index = y * width + x
+        bits[index >> 3] |= 0x80 >> (index & 7)
+    return bytes(bits)
+
+
+def run_lengths(data, width: int, height: int) -> list:
+    """
+    Run-length encodes a bitset in row-major order. Runs alternate between
+    0 and 1 bits starting with 0, so the first run may be empty.
+    """
+    bits = np.unpackbits(np.frombuffer(bytes(data), dtype=np.uint8), count=width * height)
+    if not bits.size:
+        return []
+    changes = np.flatnonzero(np.diff(bits)) + 1
+    bounds = np.concatenate(([0], changes, [bits.size]))
+    runs = np.diff(bounds).tolist()
+    if bits[0]:
+        runs.insert(0, 0)
+    return runs
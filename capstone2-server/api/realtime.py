@@ -0,0 +1,219 @@
+import asyncio
+import json
+import logging
+import re
+import threading
+from collections import defaultdict
+from http.cookies import SimpleCookie
+from urllib.parse import parse_qs
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connection, transaction
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.utils.encoders import JSONEncoder
+
+# Push channel for the world viewer. Actions publish per-world events once
+# their transaction commits and every websocket subscribed to the world at
+# /services/ws/worlds/<id>/ receives them:
+#
+#   {"type": "airplane", "airplane": {...}, "cells": [[x, y], ...]}
+#   {"type": "cells", "cells": [[x, y], ...]}   (continuation of a large scan)
+#   {"type": "airplane_deleted", "id": 3}
+#   {"type": "resync"}   (the subscriber fell behind and should refetch)
+#
+# With the "local" backend events only reach websockets served by the same
+# process; the "postgres" backend relays them through LISTEN/NOTIFY so any
+# worker can publish to any other.
+
+logger = logging.getLogger(__name__)
+
+NOTIFY_CHANNEL = "capstone2_world_events"
+# NOTIFY payloads are limited to 8000 bytes
+MAX_CELLS_PER_EVENT = 400
+SUBSCRIBER_QUEUE_SIZE = 1000
+
+WEBSOCKET_PATH = re.compile(r"^/services/ws/worlds/(?P<world_id>\d+)/$")
+
+
+class Hub:
+    """
+    Per-process registry of websocket subscribers. Delivery is thread-safe:
+    events published from a request thread are handed to each subscriber's
+    event loop.
+    """
+
+    def __init__(self):
+        self._subscribers = defaultdict(dict)
+        self._lock = threading.Lock()
+        self._listener = None
+
+    def subscribe(self, world_id):
+        queue = asyncio.Queue(SUBSCRIBER_QUEUE_SIZE)
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            self._subscribers[world_id][queue] = loop
+        if backend() == "postgres" and (self._listener is None or self._listener.done()):
+            self._listener = loop.create_task(self._listen())
+        return queue
+
+    def unsubscribe(self, world_id, queue):
+        with self._lock:
+            self._subscribers[world_id].pop(queue, None)
+            if not self._subscribers[world_id]:
+                del self._subscribers[world_id]
+
+    def subscriber_count(self, world_id):
+        with self._lock:
+            return len(self._subscribers.get(world_id, ()))
+
+    def deliver(self, world_id, message):
+        with self._lock:
+            subscribers = list(self._subscribers.get(world_id, {}).items())
+        for queue, loop in subscribers:
+            try:
+                loop.call_soon_threadsafe(_put, queue, message)
+            except RuntimeError:
+                # The subscriber's loop is closed, it is being torn down
+                self.unsubscribe(world_id, queue)
+
+    async def _listen(self):
+        import psycopg
+
+        db = settings.DATABASES["default"]
+        while True:
+            try:
+                async with await psycopg.AsyncConnection.connect(
+                    dbname=db["NAME"], user=db["USER"], password=db["PASSWORD"],
+                    host=db["HOST"], port=db["PORT"], autocommit=True,
+                ) as conn:
+                    await conn.execute(f"LISTEN {NOTIFY_CHANNEL}")
+                    async for notify in conn.notifies():
+                        world_id, _, message = notify.payload.partition(":")
+                        self.deliver(int(world_id), message)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Lost the world event listener connection, reconnecting")
+                await asyncio.sleep(1)
+
+
+def _put(queue, message):
+    if queue.full():
+        # Drop the backlog, the client reloads the world instead
+        while not queue.empty():
+            queue.get_nowait()
+        message = json.dumps({"type": "resync"})
+    queue.put_nowait(message)
+
+
+hub = Hub()
+
+
+def backend():
+    configured = getattr(settings, "REALTIME_BACKEND", None)
+    if configured:
+        return configured
+    return "postgres" if connection.vendor == "postgresql" else "local"
+
+
+def airplane_events(airplane_data, cells=()):
+    """
+    Builds the events announcing an airplane's new state and the cells it
+    newly scanned, splitting large scans over several events.
+    """
+    cells = [list(cell) for cell in cells]
+    events = [{"type": "airplane", "airplane": airplane_data, "cells": cells[:MAX_CELLS_PER_EVENT]}]
+    for start in range(MAX_CELLS_PER_EVENT, len(cells), MAX_CELLS_PER_EVENT):
+        events.append({"type": "cells", "cells": cells[start:start + MAX_CELLS_PER_EVENT]})
+    return events
+
+
+def publish(world_id, events):
+    messages = [json.dumps(event, cls=JSONEncoder) for event in events]
+    if backend() == "postgres":
+        with connection.cursor() as cursor:
+            for message in messages:
+                cursor.execute("SELECT pg_notify(%s, %s)", [NOTIFY_CHANNEL, f"{world_id}:{message}"])
+    else:
+        for message in messages:
+            hub.deliver(world_id, message)
+
+
+def publish_on_commit(world_id, events):
+    """
+    Publishes the events once the current transaction commits, so viewers
+    never see state that was rolled back.
+    """
+    transaction.on_commit(lambda: publish(world_id, events))
+
+
+def _token_from_scope(scope):
+    query = parse_qs(scope.get("query_string", b"").decode())
+    if query.get("token"):
+        return query["token"][0]
+    headers = {name.decode().lower(): value.decode() for name, value in scope.get("headers", [])}
+    authorization = headers.get("authorization", "")
+    if authorization.startswith("Bearer "):
+        return authorization.split(" ")[1]
+    cookie = SimpleCookie(headers.get("cookie", ""))
+    if "accessToken" in cookie:
+        return cookie["accessToken"].value
+    return None
+
+
+def _authenticate(token, world_id):
+    from .auth import CustomOAuthAuthentication
+    from .models import World
+
+    try:
+        try:
+            CustomOAuthAuthentication().validate_token(token)
+        except AuthenticationFailed:
+            return False
+        return World.objects.filter(id=world_id).exists()
+    finally:
+        # Websockets don't go through Django's request signals, so nothing
+        # else closes the connection these queries opened. Never close one
+        # inside a transaction (e.g. a test's)
+        if not connection.in_atomic_block:
+            connection.close()
+
+
+async def websocket_application(scope, receive, send):
+    """
+    ASGI application streaming a world's events to one websocket. The client
+    authenticates with the same token as the REST API, passed as `?token=`,
+    a Bearer Authorization header or the accessToken cookie.
+    """
+    match = WEBSOCKET_PATH.match(scope["path"])
+    message = await receive()
+    if message["type"] != "websocket.connect":
+        return
+
+    token = _token_from_scope(scope)
+    if match is None or not token:
+        await send({"type": "websocket.close", "code": 4404 if match is None else 4401})
+        return
+    world_id = int(match["world_id"])
+    if not await sync_to_async(_authenticate)(token, world_id):
+        await send({"type": "websocket.close", "code": 4401})
+        return
+
+    await send({"type": "websocket.accept"})
+    queue = hub.subscribe(world_id)
+
+    async def forward():
+        while True:
+            await send({"type": "websocket.send", "text": await queue.get()})
+
+    sender = asyncio.ensure_future(forward())
+    try:
+        while True:
+            message = await receive()
+            # Anything the client sends (e.g. keep-alive pings) is ignored
+            if message["type"] == "websocket.disconnect":
+                break
+    finally:
+        sender.cancel()
+        hub.unsubscribe(world_id, queue)
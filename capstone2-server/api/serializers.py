@@ -1,23 +1,75 @@
+from django.conf import settings
 from rest_framework import serializers
 from .models import World, Airplane, PathPoint, ScannedCell, CoverageStatistics
 
-class WorldSerializer(serializers.ModelSerializer):
-    owner = serializers.ReadOnlyField(source='owner.id')  # Ensuring the owner is read-only
+# World fields that control map generation
+GENERATION_PARAMS = ['seed', 'scale', 'threshold', 'octaves', 'persistence', 'lacunarity']
+GENERATION_FIELDS = ['width', 'height'] + GENERATION_PARAMS
+
+class DynamicFieldsMixin:
+    """
+    Lets a serializer be created with `fields`, the names of the fields to
+    keep.
+    """
+
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+class WorldSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+    owner = serializers.ReadOnlyField(source='owner_id')  # Ensuring the owner is read-only
     basemap = serializers.ReadOnlyField()
+    # Generation parameters, only used when the world is created
+    width = serializers.IntegerField(required=False, default=100, min_value=1, max_value=settings.MAX_WORLD_SIZE)
+    height = serializers.IntegerField(required=False, default=100, min_value=1, max_value=settings.MAX_WORLD_SIZE)
+    seed = serializers.IntegerField(required=False, allow_null=True, min_value=0, max_value=2**63 - 1)
+    scale = serializers.FloatField(required=False, allow_null=True, min_value=0.1)
+    threshold = serializers.FloatField(required=False, allow_null=True, min_value=0.0, max_value=1.0)
+    octaves = serializers.IntegerField(required=False, allow_null=True, min_value=1, max_value=8)
+    # Bounded by the ranges drawn when omitted: larger values overflow the
+    # noise lattice coordinates over 8 octaves
+    persistence = serializers.FloatField(required=False, allow_null=True, min_value=0.01, max_value=5.0)
+    lacunarity = serializers.FloatField(required=False, allow_null=True, min_value=0.01, max_value=5.0)
+
     class Meta:
         model = World
-        fields = ['id', 'owner', 'basemap', 'name', 'created_at', 'updated_at']
+        fields = ['id', 'owner', 'basemap', 'width', 'height', 'name', 'created_at', 'updated_at',
+                  'seed', 'scale', 'threshold', 'octaves', 'persistence', 'lacunarity']
         read_only_fields = ['id', 'created_at', 'updated_at']
 
+    def update(self, instance, validated_data):
+        # The map is generated once, changing its parameters afterwards would not regenerate it
+        for field in GENERATION_FIELDS:
+            validated_data.pop(field, None)
+        return super().update(instance, validated_data)
+
+class CoverageSummarySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = CoverageStatistics
+        fields = ['total_cells', 'scanned_cells', 'coverage_percentage', 'path_length']
+
+class WorldListSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+    """
+    World without its map, for listings.
+    """
+    owner = serializers.ReadOnlyField(source='owner_id')
+    coverage = CoverageSummarySerializer(source='coverage_stats', read_only=True)
+
+    class Meta:
+        model = World
+        fields = ['id', 'owner', 'name', 'width', 'height', 'created_at', 'updated_at', 'coverage']
+
 class AirplaneSerializer(serializers.ModelSerializer):
-    owner = serializers.ReadOnlyField(source='owner.id')
+    owner = serializers.ReadOnlyField(source='owner_id')
     world = serializers.PrimaryKeyRelatedField(queryset=World.objects.all()) 
     color = serializers.CharField(read_only=True)  # Ensure color is always included
     flight_ended = serializers.BooleanField(required=False)
     class Meta:
         model = Airplane
         fields = "__all__"
-        read_only_fields = ['id', 'created_at', 'updated_at', 'rotation', 'pos_x', 'pos_y', 'color']
+        read_only_fields = ['id', 'created_at', 'updated_at', 'rotation', 'pos_x', 'pos_y', 'color', 'path_length']
 
 class PathPointSerializer(serializers.ModelSerializer):
     class Meta:
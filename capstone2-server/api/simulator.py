@@ -0,0 +1,258 @@
+import numpy as np
+
+# Movement, traversability and sensor rules for airplanes, shared by the
+# server's actions and by offline planners. This module only depends on NumPy;
+# capstone2-clientapi/simulator.py is a verbatim copy and must be kept in sync.
+
+# Order used by rotate_left (index - 1) and rotate_right (index + 1)
+ROTATIONS = ["UP", "LEFT", "DOWN", "RIGHT"]
+
+# (dx, dy) applied by a forward move
+MOVE_DELTA = {
+    "UP": (0, -1),
+    "DOWN": (0, 1),
+    "LEFT": (-1, 0),
+    "RIGHT": (1, 0),
+}
+
+# Single character codes accepted by the execute action, named after the
+# endpoint each one replays
+ACTION_CODES = {
+    "F": "move",
+    "L": "rotate_left",
+    "R": "rotate_right",
+}
+ACTION_NAMES = {name: code for code, name in ACTION_CODES.items()}
+
+OUT_OF_BOUNDS_ERROR = "Cannot move outside map boundaries"
+NOT_TRAVERSABLE_ERROR = "Cannot move to non-traversable cell with value [0, 0, 0]"
+
+
+def rotate_left(rotation):
+    return ROTATIONS[(ROTATIONS.index(rotation) - 1) % 4]
+
+
+def rotate_right(rotation):
+    return ROTATIONS[(ROTATIONS.index(rotation) + 1) % 4]
+
+
+def forward(x, y, rotation):
+    """
+    Returns the position one cell ahead of (x, y) in the given rotation.
+    """
+    dx, dy = MOVE_DELTA[rotation]
+    return x + dx, y + dy
+
+
+def sensor_footprint(x, y, rotation):
+    """
+    Returns the (x, y) cells covered by the 2x3 sensor of an airplane at
+    (x, y). Cells may fall outside the map.
+    """
+    scan_cells = []
+
+    if rotation == "UP":
+        # Scanning area is above the aircraft
+        for i in range(-1, 1):  # 2 rows (up)
+            for j in range(-1, 2):  # 3 columns (left to right)
+                scan_cells.append((x + j, y - 1 - i))
+    elif rotation == "DOWN":
+        # Scanning area is below the aircraft
+        for i in range(-1, 1):  # 2 rows (down)
+            for j in range(-1, 2):  # 3 columns (left to right)
+                scan_cells.append((x + j, y + 1 + i))
+    elif rotation == "LEFT":
+        # Scanning area is to the left of the aircraft
+        for i in range(-1, 2):  # 3 rows (top to bottom)
+            for j in range(-1, 1):  # 2 columns (left)
+                scan_cells.append((x - 1 - j, y + i))
+    elif rotation == "RIGHT":
+        # Scanning area is to the right of the aircraft
+        for i in range(-1, 2):  # 3 rows (top to bottom)
+            for j in range(-1, 1):  # 2 columns (right)
+                scan_cells.append((x + 1 + j, y + i))
+
+    return scan_cells
+
+
+# (dx, dy) offsets of the sensor footprint for every rotation
+FOOTPRINT_OFFSETS = {rotation: sensor_footprint(0, 0, rotation) for rotation in ROTATIONS}
+
+
+def parse_actions(actions, limit=None):
+    """
+    Normalizes the input of the execute action into a list of codes. `actions`
+    is a string of codes or a list of codes or action names. Raises ValueError
+    with a message suitable for the client on invalid input.
+    """
+    if isinstance(actions, str):
+        actions = list(actions.replace(" ", ""))
+    if not isinstance(actions, list) or not actions:
+        raise ValueError("'actions' must be a non-empty string or list")
+    if limit is not None and len(actions) > limit:
+        raise ValueError(f"At most {limit} actions can be executed per request")
+
+    codes = []
+    for index, name in enumerate(actions):
+        code = None
+        if isinstance(name, str):
+            code = name if name in ACTION_CODES else ACTION_NAMES.get(name)
+        if code is None:
+            raise ValueError(f"Unknown action {name!r} at index {index}, expected one of "
+                             f"{sorted(ACTION_CODES)} or {sorted(ACTION_NAMES)}")
+        codes.append(code)
+    return codes
+
+
+def scan_gain(unscanned, rotation):
+    """
+    Returns, for every cell of the map, how many `unscanned` cells the sensor
+    would cover from that cell in the given rotation. `unscanned` is a 2D
+    boolean array indexed [y, x].
+    """
+    height, width = unscanned.shape
+    gain = np.zeros((height, width), dtype=np.int8)
+    for dx, dy in FOOTPRINT_OFFSETS[rotation]:
+        # gain[y, x] += unscanned[y + dy, x + dx] wherever both are in the map
+        gain[max(-dy, 0):height - max(dy, 0), max(-dx, 0):width - max(dx, 0)] += \
+            unscanned[max(dy, 0):height - max(-dy, 0), max(dx, 0):width - max(-dx, 0)]
+    return gain
+
+
+class SimulatedAirplane:
+    """
+    In-memory airplane that applies the server's rules and answers with the
+    same shapes as capstone2.Airplane, so planners can fly without a server.
+
+    `grid` is a 2D boolean array indexed [y, x], True for traversable cells.
+    Like the server, the start position is scanned on creation (unless
+    `scan_start` is False) and every applied action scans the footprint at
+    the resulting position.
+    """
+
+    def __init__(self, grid, x, y, rotation="UP", name="simulated", scan_start=True):
+        if rotation not in ROTATIONS:
+            raise ValueError(f"Unknown rotation {rotation!r}, expected one of {ROTATIONS}")
+        self.grid = np.asarray(grid, dtype=bool)
+        self.height, self.width = self.grid.shape
+        self.name = name
+        self.pos_x = x
+        self.pos_y = y
+        self.rotation = rotation
+        self.scanned = np.zeros(self.grid.shape, dtype=bool)
+        self.scanned_cells = []  # (x, y) cells in the order they were first covered
+        self.traversable_count = int(self.grid.sum())
+        self.moves = 0
+        self.turns = 0
+        self.failed = 0
+        if scan_start:
+            self._scan()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        pass
+
+    @property
+    def covered(self):
+        return len(self.scanned_cells)
+
+    @property
+    def coverage(self):
+        return self.covered / self.traversable_count if self.traversable_count else 0
+
+    def in_bounds(self, x, y):
+        return 0 <= x < self.width and 0 <= y < self.height
+
+    def is_traversable(self, x, y):
+        return self.in_bounds(x, y) and bool(self.grid[y, x])
+
+    def gain_map(self, rotation):
+        """
+        Returns the number of new cells the sensor would cover from every
+        position of the map in the given rotation.
+        """
+        return scan_gain(self.grid & ~self.scanned, rotation)
+
+    def _scan(self):
+        new_cells = []
+        for dx, dy in FOOTPRINT_OFFSETS[self.rotation]:
+            x, y = self.pos_x + dx, self.pos_y + dy
+            if self.is_traversable(x, y) and not self.scanned[y, x]:
+                self.scanned[y, x] = True
+                new_cells.append((x, y))
+        self.scanned_cells.extend(new_cells)
+        return new_cells
+
+    def step(self, code):
+        """
+        Applies one action code and returns the error message when the action
+        was rejected, in which case the airplane is left unchanged.
+        """
+        if code == "F":
+            x, y = forward(self.pos_x, self.pos_y, self.rotation)
+            if not self.in_bounds(x, y):
+                self.failed += 1
+                return OUT_OF_BOUNDS_ERROR
+            if not self.grid[y, x]:
+                self.failed += 1
+                return NOT_TRAVERSABLE_ERROR
+            self.pos_x, self.pos_y = x, y
+            self.moves += 1
+        elif code == "L":
+            self.rotation = rotate_left(self.rotation)
+            self.turns += 1
+        elif code == "R":
+            self.rotation = rotate_right(self.rotation)
+            self.turns += 1
+        else:
+            raise ValueError(f"Unknown action code {code!r}, expected one of {sorted(ACTION_CODES)}")
+        self._scan()
+        return None
+
+    def _respond(self, code):
+        error = self.step(code)
+        if error is not None:
+            return {"error": error}
+        return self.get_status()
+
+    def move(self):
+        return self._respond("F")
+
+    def rotate_left(self):
+        return self._respond("L")
+
+    def rotate_right(self):
+        return self._respond("R")
+
+    def execute(self, actions):
+        """
+        Applies a sequence of actions like the server's execute action and
+        returns the same response shape.
+        """
+        steps = []
+        applied = 0
+        for code in parse_actions(actions):
+            error = self.step(code)
+            if error is not None:
+                steps.append({"action": code, "ok": False, "error": error})
+                continue
+            applied += 1
+            steps.append({"action": code, "ok": True, "pos_x": self.pos_x, "pos_y": self.pos_y,
+                          "rotation": self.rotation})
+        return {
+            "airplane": self.get_status(),
+            "applied": applied,
+            "failed": len(steps) - applied,
+            "steps": steps,
+        }
+
+    def get_status(self):
+        return {"name": self.name, "pos_x": self.pos_x, "pos_y": self.pos_y, "rotation": self.rotation}
+
+    def get_grid(self):
+        return [[[255, 255, 255] if cell else [0, 0, 0] for cell in row] for row in self.grid.tolist()]
+
+    def get_scanned_cell(self):
+        return [{"pos_x": x, "pos_y": y} for x, y in self.scanned_cells]
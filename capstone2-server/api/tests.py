@@ -1,13 +1,170 @@
-from django.test import TestCase, LiveServerTestCase
+from django.test.utils import CaptureQueriesContext
+from django.db import connection
+from django.test import TestCase, LiveServerTestCase, override_settings
+from django.core.management import call_command
 import requests
 from accounts.models import User
-from api.models import World, Airplane
-from api.auth import generate_token_from_user
-from api.map_generator import generate_map
+from api.models import World, Airplane, ScannedCell, CoverageStatistics
+from api.auth import CustomOAuthAuthentication, TokenCache, generate_token_from_user, token_cache
+from api.map_generator import generate_map, generate_world
+from api.occupancy import basemap_to_grid, grid_to_basemap, pack_grid, unpack_grid
+from api.world_cache import WorldCache, coverage_cache, world_cache
+from api import metrics, realtime, simulator, tracing
+from api.middleware import track_queries
+from asgiref.sync import async_to_sync, sync_to_async
+from rest_framework.exceptions import AuthenticationFailed
+from prometheus_client import REGISTRY
+from pathlib import Path
+import os
+import numpy as np
+import asyncio
+import base64
+import json
+import random
+import io
+import tempfile
+import time
 import uuid
 # Create your tests here.
 
 
+class TestOccupancy(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            id=str(uuid.uuid4()),
+            username='testuser'
+        )
+        self.basemap = [
+            [[255, 255, 255], [0, 0, 0], [255, 255, 255]],
+            [[0, 0, 0], [255, 255, 255], [255, 255, 255]],
+        ]
+
+    def test_pack_roundtrip(self):
+        grid = basemap_to_grid(self.basemap)
+        self.assertEqual(grid.shape, (2, 3))
+        self.assertEqual(grid.tolist(), [[True, False, True], [False, True, True]])
+        packed = pack_grid(grid)
+        self.assertEqual(len(packed), 1)
+        self.assertTrue(np.array_equal(unpack_grid(packed, 3, 2), grid))
+        self.assertEqual(grid_to_basemap(grid), self.basemap)
+
+    def test_world_basemap_property(self):
+        world = World.objects.create(
+            name='testworld_occupancy',
+            owner=self.user,
+            basemap=self.basemap,
+            start_x=0,
+            start_y=0,
+        )
+        world = World.objects.get(id=world.id)
+        self.assertEqual((world.width, world.height), (3, 2))
+        self.assertEqual(world.basemap, self.basemap)
+        self.assertEqual(int(world.grid.sum()), 4)
+
+
+class TestMapGenerator(TestCase):
+
+    def test_generate_world_is_seeded(self):
+        grid, (row, col) = generate_world(300, 200, seed=42)
+        self.assertEqual(grid.shape, (200, 300))
+        self.assertEqual(grid.dtype, bool)
+        self.assertTrue(grid[row, col])
+        self.assertTrue(0 < grid.mean() < 1)
+
+        same, start = generate_world(300, 200, seed=42)
+        self.assertTrue(np.array_equal(grid, same))
+        self.assertEqual(start, (row, col))
+        self.assertFalse(np.array_equal(grid, generate_world(300, 200, seed=43)[0]))
+
+    def test_generate_map_rgb(self):
+        basemap, (row, col) = generate_map(20, 10, seed=1)
+        self.assertEqual((len(basemap), len(basemap[0])), (10, 20))
+        self.assertEqual(basemap[row][col], [255, 255, 255])
+
+
+class TestSimulator(TestCase):
+
+    def setUp(self):
+        self.grid, (row, col) = generate_world(40, 30, seed=7)
+        self.start = (col, row)
+
+    def test_client_copy_matches(self):
+        client_copy = Path(__file__).resolve().parents[2] / 'capstone2-clientapi' / 'simulator.py'
+        if not client_copy.exists():
+            self.skipTest("client sources are not available")
+        self.assertEqual(client_copy.read_text(), Path(simulator.__file__).read_text())
+
+    def test_rejected_move_leaves_airplane(self):
+        W, B = True, False
+        airplane = simulator.SimulatedAirplane(np.array([[W, B], [W, W]]), 0, 1)
+        self.assertEqual(airplane.covered, 3)
+        self.assertEqual(airplane.rotate_left()['rotation'], 'RIGHT')
+        self.assertEqual(airplane.move()['pos_x'], 1)
+        self.assertEqual(airplane.move(), {'error': simulator.OUT_OF_BOUNDS_ERROR})
+        airplane.rotate_right()
+        self.assertEqual(airplane.move(), {'error': simulator.NOT_TRAVERSABLE_ERROR})
+        self.assertEqual((airplane.pos_x, airplane.pos_y, airplane.rotation), (1, 1, 'UP'))
+        self.assertEqual(airplane.coverage, 1.0)
+
+    def test_scan_gain_matches_footprints(self):
+        airplane = simulator.SimulatedAirplane(self.grid, *self.start)
+        airplane.execute(''.join(random.Random(1).choice('FFFLR') for _ in range(300)))
+        for rotation in simulator.ROTATIONS:
+            gain = airplane.gain_map(rotation)
+            for y in range(0, airplane.height, 3):
+                for x in range(0, airplane.width, 3):
+                    expected = sum(
+                        1 for cell_x, cell_y in simulator.sensor_footprint(x, y, rotation)
+                        if airplane.is_traversable(cell_x, cell_y) and not airplane.scanned[cell_y, cell_x]
+                    )
+                    self.assertEqual(gain[y, x], expected, (x, y, rotation))
+
+
+class TestWorldCache(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            id=str(uuid.uuid4()),
+            username='testuser'
+        )
+
+    def create_world(self, name, size):
+        return World.objects.create(
+            name=name,
+            owner=self.user,
+            grid=np.ones((size, size), dtype=bool),
+            start_x=0,
+            start_y=0,
+        )
+
+    def test_hit_and_invalidation(self):
+        cache = WorldCache()
+        world = self.create_world('cached', 4)
+        decoded = cache.get(World.objects.defer('occupancy').get(id=world.id))
+        self.assertEqual((decoded.width, decoded.height, decoded.traversable_count), (4, 4, 16))
+        self.assertIs(cache.get(World.objects.defer('occupancy').get(id=world.id)), decoded)
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+        # Saving the world bumps updated_at, so the entry is decoded again
+        world.grid = np.zeros((4, 4), dtype=bool)
+        world.save()
+        self.assertEqual(cache.get(world).traversable_count, 0)
+        self.assertEqual(len(cache), 1)
+
+    def test_lru_eviction(self):
+        cache = WorldCache(max_bytes=2 * 16)
+        first, second, third = (self.create_world(f'w{i}', 4) for i in range(3))
+        cache.get(first)
+        cache.get(second)
+        cache.get(first)
+        cache.get(third)
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(cache.current_bytes, 32)
+        cache.get(first)
+        self.assertEqual(cache.hits, 2)
+
+
 class TestWorld(LiveServerTestCase):
 
     # setUp a test user
@@ -39,6 +196,40 @@ class TestWorld(LiveServerTestCase):
         self.assertEqual(response.status_code, 201)
         self.assertEqual(response.json()['name'], 'testworld')
 
+    def test_create_world_with_parameters(self):
+        url = self.live_server_url + '/services/api/worlds/'
+        headers = {
+            'Authorization': f'Bearer {self.token}'
+        }
+        data = {
+            'name': 'sized',
+            'width': 30,
+            'height': 20,
+            'seed': 7,
+            'threshold': 0.6,
+        }
+        response = requests.post(url, json=data, headers=headers)
+        self.assertEqual(response.status_code, 201, response.text)
+        body = response.json()
+        self.assertEqual((body['width'], body['height'], body['seed'], body['threshold']), (30, 20, 7, 0.6))
+        self.assertIsNotNone(body['persistence'])
+        # The map is fetched from the new world's URL
+        self.assertNotIn('basemap', body)
+        basemap = requests.get(response.headers['Location'], headers=headers).json()['basemap']
+        self.assertEqual((len(basemap), len(basemap[0])), (20, 30))
+
+        # The same seed and parameters reproduce the same map
+        again = requests.post(url, json=dict(data, name='sized_again'), headers=headers)
+        self.assertEqual(requests.get(again.headers['Location'], headers=headers).json()['basemap'], basemap)
+        self.assertEqual(again.json()['persistence'], body['persistence'])
+
+        response = requests.post(url, json={'name': 'huge', 'width': 10**6}, headers=headers)
+        self.assertEqual(response.status_code, 400)
+        for param in ('persistence', 'lacunarity'):
+            response = requests.post(url, json={'name': 'noisy', param: 1e6}, headers=headers)
+            self.assertEqual(response.status_code, 400)
+            self.assertIn(param, response.json())
+
 
     def tearDown(self):
         self.user.delete()
@@ -245,7 +436,7 @@ class TestMultiUserAirplane(LiveServerTestCase):
         self.world = World.objects.create(
             name='testworld',
             owner=self.user1,
-            basemap=generate_map(),
+            basemap=generate_map()[0],
             start_x=0,
             start_y=0,
         )
@@ -287,3 +478,790 @@ class TestMultiUserAirplane(LiveServerTestCase):
 
     def tearDown(self):
         return super().tearDown()
+
+
+class TestAirplaneExecute(LiveServerTestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            id=str(uuid.uuid4()),
+            username='testuser'
+        )
+        W, B = [255, 255, 255], [0, 0, 0]
+        self.world = World.objects.create(
+            name='testworld_execute',
+            owner=self.user,
+            basemap=[
+                [W, W, W],
+                [W, W, B],
+                [W, W, W],
+            ],
+            start_x=1,
+            start_y=1,
+        )
+        self.airplane = self.world.airplanes.create(
+            name='testairplane_execute',
+            owner=self.user,
+            pos_x=1,
+            pos_y=1,
+        )
+        self.url = f"{self.live_server_url}/services/api/airplanes/{self.airplane.id}/execute/"
+        self.headers = {'Authorization': f'Bearer {generate_token_from_user(self.user)}'}
+
+    def test_execute_sequence(self):
+        # UP to (1,0), rotate_left to RIGHT, move to (2,0), then out of bounds
+        response = requests.post(self.url, json={'actions': 'FLFF'}, headers=self.headers)
+        self.assertEqual(response.status_code, 200, response.text)
+        data = response.json()
+        self.assertEqual((data['applied'], data['failed']), (3, 1))
+        self.assertEqual([step['ok'] for step in data['steps']], [True, True, True, False])
+        self.assertIn("Cannot move outside map boundaries", data['steps'][3]['error'])
+        self.assertEqual((data['airplane']['pos_x'], data['airplane']['pos_y'], data['airplane']['rotation']), (2, 0, 'RIGHT'))
+
+        airplane = Airplane.objects.get(id=self.airplane.id)
+        self.assertEqual((airplane.pos_x, airplane.pos_y, airplane.rotation), (2, 0, 'RIGHT'))
+        self.assertEqual(airplane.path_points.count(), 3)
+        self.assertEqual(
+            set(ScannedCell.objects.filter(world=self.world).values_list('pos_x', 'pos_y')),
+            {(0, 0), (1, 0), (2, 0), (1, 1)},
+        )
+
+    def test_execute_matches_simulator(self):
+        grid, (row, col) = generate_world(30, 30, seed=5)
+        world = World.objects.create(name='testworld_parity', owner=self.user, grid=grid, start_x=col, start_y=row)
+        airplane = world.airplanes.create(name='testairplane_parity', owner=self.user, pos_x=col, pos_y=row)
+        actions = ''.join(random.Random(5).choice('FFFLR') for _ in range(500))
+
+        response = requests.post(f"{self.live_server_url}/services/api/airplanes/{airplane.id}/execute/",
+                                 json={'actions': actions}, headers=self.headers)
+        self.assertEqual(response.status_code, 200, response.text)
+
+        offline = simulator.SimulatedAirplane(grid, col, row, scan_start=False)
+        expected = offline.execute(actions)
+        self.assertEqual(response.json()['steps'], expected['steps'])
+        self.assertEqual(
+            set(ScannedCell.objects.filter(world=world).values_list('pos_x', 'pos_y')),
+            set(offline.scanned_cells),
+        )
+
+    def test_execute_rejects_unknown_action(self):
+        response = requests.post(self.url, json={'actions': ['move', 'jump']}, headers=self.headers)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Airplane.objects.get(id=self.airplane.id).path_points.count(), 0)
+
+
+class TestScannedCellInsert(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            id=str(uuid.uuid4()),
+            username='testuser'
+        )
+        self.world = World.objects.create(
+            name='testworld_insert',
+            owner=self.user,
+            grid=np.ones((3, 3), dtype=bool),
+            start_x=0,
+            start_y=0,
+        )
+        self.airplane = self.world.airplanes.create(name='first', owner=self.user, pos_x=0, pos_y=0)
+        self.other = self.world.airplanes.create(name='second', owner=self.user, pos_x=0, pos_y=0)
+
+    def test_insert_new_reports_only_new_cells(self):
+        with self.assertNumQueries(1):
+            new_cells = ScannedCell.objects.insert_new(self.world, self.airplane, [(0, 0), (1, 0), (0, 0)])
+        self.assertEqual(sorted(new_cells), [(0, 0), (1, 0)])
+
+        # Cells already scanned by any airplane in the world are skipped
+        new_cells = ScannedCell.objects.insert_new(self.world, self.other, [(1, 0), (2, 0)])
+        self.assertEqual(new_cells, [(2, 0)])
+        self.assertEqual(ScannedCell.objects.filter(world=self.world).count(), 3)
+        self.assertEqual(ScannedCell.objects.get(pos_x=1, pos_y=0).airplane, self.airplane)
+
+
+class TestCoverageStatistics(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            id=str(uuid.uuid4()),
+            username='testuser'
+        )
+        grid = np.ones((4, 4), dtype=bool)
+        grid[0, 0] = False
+        self.world = World.objects.create(
+            name='testworld_stats',
+            owner=self.user,
+            grid=grid,
+            start_x=1,
+            start_y=1,
+        )
+        self.stats = CoverageStatistics.objects.create(world=self.world, total_cells=15)
+        self.airplane = self.world.airplanes.create(name='stats', owner=self.user, pos_x=1, pos_y=1)
+
+    def test_record_progress_is_incremental(self):
+        with self.assertNumQueries(1):
+            CoverageStatistics.objects.record_progress(self.world, new_cells=3, new_points=1)
+        CoverageStatistics.objects.record_progress(self.world, new_cells=0, new_points=2)
+        self.stats.refresh_from_db()
+        self.assertEqual((self.stats.scanned_cells, self.stats.path_length), (3, 3))
+        self.assertAlmostEqual(self.stats.coverage_percentage, 20.0)
+
+    def test_reconcile(self):
+        ScannedCell.objects.insert_new(self.world, self.airplane, [(1, 1), (2, 1)])
+        self.airplane.path_points.create(pos_x=1, pos_y=1, rotation='UP')
+        CoverageStatistics.objects.filter(id=self.stats.id).update(total_cells=0, scanned_cells=99)
+
+        call_command('reconcile_coverage', self.world.id, stdout=io.StringIO())
+        self.stats.refresh_from_db()
+        self.assertEqual((self.stats.total_cells, self.stats.scanned_cells, self.stats.path_length), (15, 2, 1))
+        self.assertAlmostEqual(self.stats.coverage_percentage, 200 / 15)
+
+
+class TestQueryCountMiddleware(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            id=str(uuid.uuid4()),
+            username='testuser'
+        )
+        self.auth = {'HTTP_AUTHORIZATION': f'Bearer {generate_token_from_user(self.user)}'}
+
+    @override_settings(QUERY_COUNT_HEADERS=True)
+    def test_headers_report_queries(self):
+        response = self.client.get('/services/api/worlds/', **self.auth)
+        self.assertEqual(response.status_code, 200)
+        self.assertGreaterEqual(int(response['X-Query-Count']), 1)
+        self.assertGreaterEqual(float(response['X-Query-Time-Ms']), 0)
+
+    def test_disabled_by_default(self):
+        response = self.client.get('/services/api/worlds/', **self.auth)
+        self.assertNotIn('X-Query-Count', response)
+
+
+@override_settings(REALTIME_BACKEND='local')
+class TestRealtime(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            id=str(uuid.uuid4()),
+            username='testuser'
+        )
+        self.world = World.objects.create(
+            name='testworld_realtime',
+            owner=self.user,
+            grid=np.ones((3, 3), dtype=bool),
+            start_x=1,
+            start_y=1,
+        )
+        self.airplane = self.world.airplanes.create(name='realtime', owner=self.user, pos_x=1, pos_y=2)
+        self.token = generate_token_from_user(self.user)
+
+    def connect(self, scenario, token=None, world_id=None):
+        """
+        Runs `scenario(outbox)` against a websocket connected to the world's
+        event stream and returns every message the server sent.
+        """
+        scope = {
+            'type': 'websocket',
+            'path': f'/services/ws/worlds/{world_id or self.world.id}/',
+            'query_string': f'token={token or self.token}'.encode(),
+            'headers': [],
+        }
+
+        async def run():
+            inbox, outbox, sent = asyncio.Queue(), asyncio.Queue(), []
+
+            async def send(message):
+                sent.append(message)
+                await outbox.put(message)
+
+            await inbox.put({'type': 'websocket.connect'})
+            server = asyncio.ensure_future(realtime.websocket_application(scope, inbox.get, send))
+            first = await asyncio.wait_for(outbox.get(), 5)
+            if first['type'] == 'websocket.accept':
+                await scenario(outbox)
+                await inbox.put({'type': 'websocket.disconnect'})
+            await asyncio.wait_for(server, 5)
+            return sent
+
+        return async_to_sync(run)()
+
+    def post(self, action):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(f'/services/api/airplanes/{self.airplane.id}/{action}/',
+                                    HTTP_AUTHORIZATION=f'Bearer {self.token}')
+
+    def test_move_is_pushed_with_new_cells(self):
+        events = []
+
+        async def scenario(outbox):
+            response = await sync_to_async(self.post)('move')
+            self.assertEqual(response.status_code, 200)
+            events.append(json.loads((await asyncio.wait_for(outbox.get(), 5))['text']))
+
+        self.connect(scenario)
+        self.assertEqual(events[0]['type'], 'airplane')
+        self.assertEqual((events[0]['airplane']['id'], events[0]['airplane']['pos_y']), (self.airplane.id, 1))
+        self.assertEqual(
+            {tuple(cell) for cell in events[0]['cells']},
+            set(ScannedCell.objects.filter(world=self.world).values_list('pos_x', 'pos_y')),
+        )
+        self.assertEqual(realtime.hub.subscriber_count(self.world.id), 0)
+
+    def test_large_scans_are_split(self):
+        cells = [(i, 0) for i in range(realtime.MAX_CELLS_PER_EVENT + 1)]
+        events = realtime.airplane_events({'id': 1}, cells)
+        self.assertEqual([event['type'] for event in events], ['airplane', 'cells'])
+        self.assertEqual(sum(len(event['cells']) for event in events), len(cells))
+
+    def test_rejects_invalid_token(self):
+        sent = self.connect(None, token='invalid')
+        self.assertEqual(sent, [{'type': 'websocket.close', 'code': 4401}])
+
+
+class TestScannedCellCursor(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            id=str(uuid.uuid4()),
+            username='testuser'
+        )
+        self.world = World.objects.create(
+            name='testworld_cursor',
+            owner=self.user,
+            grid=np.ones((5, 5), dtype=bool),
+            start_x=0,
+            start_y=0,
+        )
+        self.airplane = self.world.airplanes.create(name='cursor', owner=self.user, pos_x=0, pos_y=0)
+        ScannedCell.objects.insert_new(self.world, self.airplane, [(x, 0) for x in range(5)])
+        self.auth = {'HTTP_AUTHORIZATION': f'Bearer {generate_token_from_user(self.user)}'}
+
+    def get(self, query):
+        response = self.client.get(f'/services/api/scanned-cell/?world={self.world.id}&{query}', **self.auth)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def test_pages_follow_the_cursor(self):
+        first = self.get('page_size=3')
+        self.assertEqual([cell['pos_x'] for cell in first['results']], [0, 1, 2])
+        self.assertEqual(first['since_id'], first['results'][-1]['id'])
+        self.assertIn(f"since_id={first['since_id']}", first['next'])
+
+        second = self.get(f"page_size=3&since_id={first['since_id']}")
+        self.assertEqual([cell['pos_x'] for cell in second['results']], [3, 4])
+        self.assertIsNone(second['next'])
+
+    def test_since_id_returns_only_new_cells(self):
+        since_id = self.get('')['since_id']
+        self.assertEqual(self.get(f'since_id={since_id}'), {'next': None, 'since_id': since_id, 'results': []})
+
+        ScannedCell.objects.insert_new(self.world, self.airplane, [(0, 1)])
+        delta = self.get(f'since_id={since_id}')
+        self.assertEqual([(cell['pos_x'], cell['pos_y']) for cell in delta['results']], [(0, 1)])
+        self.assertEqual(len(self.get('since=2000-01-01T00:00:00Z')['results']), 6)
+
+    def test_invalid_cursor(self):
+        response = self.client.get('/services/api/scanned-cell/?since_id=abc', **self.auth)
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get('/services/api/scanned-cell/?since=yesterday', **self.auth)
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get('/services/api/scanned-cell/?since=2024-13-01T00:00:00', **self.auth)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('since', response.json())
+
+
+class TestCoverageBitmap(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            id=str(uuid.uuid4()),
+            username='testuser'
+        )
+        self.world = World.objects.create(
+            name='testworld_bitmap',
+            owner=self.user,
+            grid=np.ones((2, 5), dtype=bool),
+            start_x=0,
+            start_y=0,
+        )
+        CoverageStatistics.objects.create(world=self.world, total_cells=10)
+        self.airplane = self.world.airplanes.create(name='bitmap', owner=self.user, pos_x=0, pos_y=0)
+        self.url = f'/services/api/worlds/{self.world.id}/coverage-bitmap/'
+        # World ids and versions repeat between tests
+        coverage_cache.clear()
+        self.auth = {'HTTP_AUTHORIZATION': f'Bearer {generate_token_from_user(self.user)}'}
+
+    def scan(self, cells):
+        new_cells = ScannedCell.objects.insert_new(self.world, self.airplane, cells)
+        CoverageStatistics.objects.record_progress(self.world, new_cells=len(new_cells), cells=new_cells)
+
+    def expected(self):
+        grid = np.zeros((2, 5), dtype=bool)
+        for x, y in ScannedCell.objects.filter(world=self.world).values_list('pos_x', 'pos_y'):
+            grid[y, x] = True
+        return grid
+
+    def test_bitmap_matches_scanned_cells(self):
+        self.scan([(1, 0), (4, 1)])
+        self.client.get(self.url, **self.auth)
+        self.scan([(2, 0), (1, 0)])
+        new_cells = ScannedCell.objects.insert_new(self.world, self.airplane, [(0, 1)])
+        # Scanning only bumps the coverage version, the bitmap catches up on read
+        with self.assertNumQueries(1):
+            CoverageStatistics.objects.record_progress(self.world, new_cells=1, cells=new_cells)
+
+        response = self.client.get(self.url, **self.auth)
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual((data['width'], data['height']), (5, 2))
+        bitmap = unpack_grid(base64.b64decode(data['data']), 5, 2)
+        self.assertTrue(np.array_equal(bitmap, self.expected()))
+
+        raw = self.client.get(self.url + '?encoding=raw', **self.auth)
+        self.assertEqual(raw.content, pack_grid(self.expected()))
+        self.assertEqual((raw['X-Width'], raw['X-Height']), ('5', '2'))
+
+        # Cells 1, 2, 5 and 9 of the row-major bitset are scanned
+        rle = self.client.get(self.url + '?encoding=rle', **self.auth).json()
+        self.assertEqual(rle['runs'], [1, 2, 2, 1, 3, 1])
+
+    def test_bitmap_is_cached(self):
+        self.scan([(1, 0)])
+        self.client.get(self.url, **self.auth)
+        # user, world, coverage version; the bitmap comes from the cache
+        token_cache.clear()
+        with self.assertNumQueries(3):
+            response = self.client.get(self.url + '?encoding=raw', **self.auth)
+        self.assertEqual(response.content, pack_grid(self.expected()))
+
+    def test_etag(self):
+        self.scan([(1, 0)])
+        etag = self.client.get(self.url, **self.auth)['ETag']
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag, **self.auth)
+        self.assertEqual(response.status_code, 304)
+
+        self.scan([(1, 0)])
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag, **self.auth).status_code, 304)
+        self.scan([(3, 1)])
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag, **self.auth)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_bitmap_advances_incrementally(self):
+        self.scan([(1, 0), (4, 1)])
+        self.client.get(self.url, **self.auth)
+        self.scan([(2, 0)])
+        with CaptureQueriesContext(connection) as queries:
+            raw = self.client.get(self.url + '?encoding=raw', **self.auth)
+        self.assertEqual(raw.content, pack_grid(self.expected()))
+        cell_queries = [query['sql'] for query in queries if 'api_scannedcell' in query['sql']]
+        self.assertEqual(len(cell_queries), 1)
+        self.assertIn('"id" >', cell_queries[0])
+
+    def test_full_rebuild_picks_up_late_cells(self):
+        self.addCleanup(setattr, coverage_cache, 'rebuild_every', coverage_cache.rebuild_every)
+        coverage_cache.rebuild_every = 1
+        self.scan([(1, 0), (3, 0)])
+        # A cell committed after a higher id was already included
+        late_id = ScannedCell.objects.get(world=self.world, pos_x=1).id
+        ScannedCell.objects.filter(id=late_id).delete()
+        self.client.get(self.url, **self.auth)
+        ScannedCell.objects.create(id=late_id, world=self.world, airplane=self.airplane, pos_x=1, pos_y=0)
+        CoverageStatistics.objects.record_progress(self.world, new_cells=1, cells=[(1, 0)])
+
+        raw = self.client.get(self.url + '?encoding=raw', **self.auth)
+        self.assertNotEqual(raw.content, pack_grid(self.expected()))
+        self.scan([(0, 1)])
+        raw = self.client.get(self.url + '?encoding=raw', **self.auth)
+        self.assertEqual(raw.content, pack_grid(self.expected()))
+
+    def test_reconcile_rebuilds_bitmap(self):
+        self.scan([(1, 0), (2, 0)])
+        ScannedCell.objects.filter(pos_x=2).delete()
+        CoverageStatistics.objects.get(world=self.world).reconcile()
+        raw = self.client.get(self.url + '?encoding=raw', **self.auth)
+        self.assertEqual(raw.content, pack_grid(self.expected()))
+
+
+class TestWorldConditionalGet(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            id=str(uuid.uuid4()),
+            username='testuser'
+        )
+        grid, (row, col) = generate_world(60, 60, seed=3)
+        self.world = World.objects.create(name='testworld_etag', owner=self.user, grid=grid, start_x=col, start_y=row)
+        self.url = f'/services/api/worlds/{self.world.id}/'
+        self.auth = {'HTTP_AUTHORIZATION': f'Bearer {generate_token_from_user(self.user)}'}
+
+    def test_not_modified(self):
+        response = self.client.get(self.url, **self.auth)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+
+        # Only updated_at is read, the user comes from the token cache
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag, **self.auth)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+
+        self.world.name = 'renamed'
+        self.world.save()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag, **self.auth)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['name'], 'renamed')
+
+    def test_gzip(self):
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip', **self.auth)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        # A compressed response keeps a (weak) ETag that still validates
+        etag = response['ETag']
+        self.assertTrue(etag.startswith('W/'))
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag, **self.auth)
+        self.assertEqual(response.status_code, 304)
+
+
+class TestWorldList(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            id=str(uuid.uuid4()),
+            username='testuser'
+        )
+        for i in range(3):
+            world = World.objects.create(name=f'testworld_list_{i}', owner=self.user,
+                                         grid=np.ones((4, 6), dtype=bool), start_x=0, start_y=0)
+            CoverageStatistics.objects.create(world=world, total_cells=24, scanned_cells=6, coverage_percentage=25.0)
+        self.auth = {'HTTP_AUTHORIZATION': f'Bearer {generate_token_from_user(self.user)}'}
+
+    def test_list_omits_basemap(self):
+        # user, count and one page of worlds with their statistics
+        with self.assertNumQueries(3):
+            response = self.client.get('/services/api/worlds/', **self.auth)
+        world = response.json()['results'][0]
+        self.assertNotIn('basemap', world)
+        self.assertEqual((world['width'], world['height'], world['owner']), (6, 4, str(self.user.id)))
+        self.assertEqual(world['coverage'], {'total_cells': 24, 'scanned_cells': 6,
+                                             'coverage_percentage': 25.0, 'path_length': 0})
+
+    def test_fields_and_include(self):
+        response = self.client.get('/services/api/worlds/?fields=id,name', **self.auth)
+        self.assertEqual(set(response.json()['results'][0]), {'id', 'name'})
+
+        response = self.client.get('/services/api/worlds/?include=basemap', **self.auth)
+        self.assertEqual(len(response.json()['results'][0]['basemap']), 4)
+
+
+class TestTokenCache(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            id=str(uuid.uuid4()),
+            username='testuser'
+        )
+        self.token = generate_token_from_user(self.user)
+        token_cache.clear()
+
+    def test_cached_token_skips_the_database(self):
+        auth = CustomOAuthAuthentication()
+        self.assertEqual(auth.validate_token(self.token), self.user)
+        with self.assertNumQueries(0):
+            self.assertEqual(auth.validate_token(self.token), self.user)
+
+    def test_deactivation_invalidates(self):
+        auth = CustomOAuthAuthentication()
+        auth.validate_token(self.token)
+        self.user.is_active = False
+        self.user.save()
+        with self.assertRaises(AuthenticationFailed):
+            auth.validate_token(self.token)
+
+    def test_entries_expire_with_the_token(self):
+        cache = TokenCache(ttl=60)
+        cache.set('expiring', self.user, exp=time.time() + 0.05)
+        cache.set('expired', self.user, exp=time.time() - 1)
+        self.assertEqual(cache.get('expiring'), self.user)
+        self.assertIsNone(cache.get('expired'))
+        time.sleep(0.1)
+        self.assertIsNone(cache.get('expiring'))
+
+    def test_lru_bound(self):
+        cache = TokenCache(max_size=2)
+        for token in ('a', 'b', 'c'):
+            cache.set(token, self.user)
+        self.assertEqual(len(cache), 2)
+        self.assertIsNone(cache.get('a'))
+
+    def test_shared_backend(self):
+        cache = TokenCache(backend='default')
+        other = TokenCache(backend='default')
+        cache.set(self.token, self.user)
+        self.assertEqual(other.get(self.token), self.user)
+        other.invalidate_user(self.user.pk)
+        self.assertIsNone(cache.get(self.token))
+
+
+@override_settings(METRICS_TOKEN='metrics-secret')
+class TestMetrics(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            id=str(uuid.uuid4()),
+            username='testuser'
+        )
+        self.world = World.objects.create(
+            name='testworld_metrics',
+            owner=self.user,
+            grid=np.ones((3, 3), dtype=bool),
+            start_x=1,
+            start_y=1,
+        )
+        self.airplane = self.world.airplanes.create(name='metrics', owner=self.user, pos_x=1, pos_y=2)
+        self.auth = {'HTTP_AUTHORIZATION': f'Bearer {generate_token_from_user(self.user)}'}
+
+    def sample(self, name, labels=None):
+        return REGISTRY.get_sample_value(name, labels or {}) or 0
+
+    def test_move_is_counted(self):
+        moves = {'action': 'move', 'result': 'applied'}
+        latency = {'method': 'POST', 'endpoint': 'airplane-move', 'status': '200'}
+        before = (self.sample('capstone2_airplane_actions_total', moves),
+                  self.sample('capstone2_request_duration_seconds_count', latency),
+                  self.sample('capstone2_scanned_cells_total'))
+
+        response = self.client.post(f'/services/api/airplanes/{self.airplane.id}/move/', **self.auth)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['path_length'], 1)
+
+        after = (self.sample('capstone2_airplane_actions_total', moves),
+                 self.sample('capstone2_request_duration_seconds_count', latency),
+                 self.sample('capstone2_scanned_cells_total'))
+        self.assertEqual(after[0] - before[0], 1)
+        self.assertEqual(after[1] - before[1], 1)
+        self.assertEqual(after[2] - before[2], ScannedCell.objects.filter(world=self.world).count())
+
+    def test_endpoint(self):
+        self.assertEqual(self.client.get('/services/metrics').status_code, 401)
+        response = self.client.get('/services/metrics', HTTP_AUTHORIZATION='Bearer metrics-secret')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'capstone2_request_duration_seconds_bucket', response.content)
+
+    def test_path_length_buckets(self):
+        self.assertEqual([metrics.path_length_bucket(n) for n in (0, 10, 999, 5000, 20000)],
+                         ['0-9', '10-99', '100-999', '1000-9999', '10000+'])
+
+
+class TestTracing(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            id=str(uuid.uuid4()),
+            username='testuser'
+        )
+        self.world = World.objects.create(
+            name='testworld_tracing',
+            owner=self.user,
+            grid=np.ones((3, 3), dtype=bool),
+            start_x=1,
+            start_y=1,
+        )
+        self.airplane = self.world.airplanes.create(name='tracing', owner=self.user, pos_x=1, pos_y=1)
+        self.auth = {'HTTP_AUTHORIZATION': f'Bearer {generate_token_from_user(self.user)}'}
+
+    def post(self, action):
+        return self.client.post(f'/services/api/airplanes/{self.airplane.id}/{action}/', **self.auth)
+
+    def test_move_phases(self):
+        with tracing.capture() as exporter:
+            self.assertEqual(self.post('move').status_code, 200)
+
+        self.assertEqual(exporter.names(), [
+            'airplane.load', 'world.decode', 'move.validate', 'airplane.save',
+            'world.decode', 'scan.insert', 'stats.update', 'scan.record', 'airplane.move',
+        ])
+        root = exporter.spans[-1]
+        self.assertIsNone(root.parent_id)
+        self.assertEqual(root.attributes['status'], 200)
+        self.assertEqual({span.trace_id for span in exporter.spans}, {root.trace_id})
+        scan = exporter.spans[-2]
+        self.assertEqual(scan.parent_id, root.span_id)
+        self.assertEqual(exporter.spans[-3].parent_id, scan.span_id)
+        self.assertEqual(scan.attributes['new_cells'], ScannedCell.objects.filter(world=self.world).count())
+
+    def test_rejected_move_stops_at_validation(self):
+        self.airplane.rotation = 'UP'
+        self.airplane.pos_y = 0
+        self.airplane.save()
+        with tracing.capture() as exporter:
+            self.assertEqual(self.post('move').status_code, 400)
+
+        self.assertEqual(exporter.names(), ['airplane.load', 'world.decode', 'move.validate', 'airplane.move'])
+        self.assertEqual(exporter.spans[2].attributes['result'], 'out_of_bounds')
+
+    def test_rotate_phases(self):
+        with tracing.capture() as exporter:
+            self.assertEqual(self.post('rotate_left').status_code, 200)
+
+        self.assertEqual(exporter.names()[:2], ['airplane.load', 'airplane.save'])
+        self.assertEqual(exporter.names()[-2:], ['scan.record', 'airplane.rotate_left'])
+
+    def test_off_by_default(self):
+        with tracing.span('unused') as span:
+            span.set_attribute('ignored', True)
+        self.assertIs(span, tracing.NOOP_SPAN)
+
+    def test_failed_span(self):
+        with tracing.capture() as exporter:
+            with self.assertRaises(ValueError):
+                with tracing.span('outer'):
+                    with tracing.span('inner'):
+                        raise ValueError('boom')
+        self.assertEqual(exporter.names(), ['inner', 'outer'])
+        self.assertIn('boom', exporter.spans[0].error)
+
+
+class TestProfiling(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            id=str(uuid.uuid4()),
+            username='testuser'
+        )
+        self.world = World.objects.create(
+            name='testworld_profiling',
+            owner=self.user,
+            grid=np.ones((3, 3), dtype=bool),
+            start_x=1,
+            start_y=1,
+        )
+        self.airplane = self.world.airplanes.create(name='profiling', owner=self.user, pos_x=1, pos_y=1)
+        self.auth = {'HTTP_AUTHORIZATION': f'Bearer {generate_token_from_user(self.user)}'}
+        self.directory = tempfile.mkdtemp()
+        self.profile_dir = override_settings(PROFILE_DIR=self.directory)
+        self.profile_dir.enable()
+        self.addCleanup(self.profile_dir.disable)
+
+    def move(self, **extra):
+        return self.client.post(f'/services/api/airplanes/{self.airplane.id}/move/', **self.auth, **extra)
+
+    def test_staff_only(self):
+        response = self.move(HTTP_X_PROFILE='1')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('X-Profile', response)
+
+        self.user.is_staff = True
+        self.user.save()
+        response = self.client.post(f'/services/api/airplanes/{self.airplane.id}/rotate_left/', **self.auth,
+                                    HTTP_X_PROFILE='1')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['id'], self.airplane.id)
+        self.assertIn('airplane-rotate-left', response['X-Profile'])
+        self.assertTrue((Path(self.directory) / response['X-Profile']).exists())
+
+    def test_text_report(self):
+        self.user.is_staff = True
+        self.user.save()
+        response = self.client.get(f'/services/api/worlds/{self.world.id}/?profile=text', **self.auth)
+        self.assertEqual(response['Content-Type'], 'text/plain')
+        self.assertEqual(response['X-Profile-Status'], '200')
+        self.assertIn(b'function calls', response.content)
+
+    def test_sampled_endpoints(self):
+        with override_settings(PROFILE_SAMPLE_RATE=1.0):
+            self.assertIn('X-Profile', self.move())
+            response = self.client.get(f'/services/api/worlds/{self.world.id}/', **self.auth)
+            self.assertNotIn('X-Profile', response)
+        self.assertEqual(len(list(Path(self.directory).iterdir())), 1)
+
+
+# Most queries (and seconds, on a BUDGET_WORLD_SIZE world) each request may
+# take, measured with empty token and decoded-world caches. Lower a budget
+# when an optimization lands; raising one needs a reason. Wall time depends
+# on the machine, it is only checked with CHECK_TIME_BUDGETS=true.
+BUDGET_WORLD_SIZE = 100
+CHECK_TIME_BUDGETS = os.environ.get("CHECK_TIME_BUDGETS", "false").lower() == "true"
+QUERY_BUDGETS = {
+    # user, world, coverage statistics
+    'create_world':      (3, 2.0),
+    'create_airplane':   (9, 0.5),
+    # user, savepoint, airplane, update, path point, occupancy, scanned cells,
+    # statistics, release
+    'move':              (9, 0.5),
+    'rotate_left':       (9, 0.5),
+    'rotate_right':      (9, 0.5),
+    'end_flight':        (3, 0.5),
+    'scanned_cell_list': (3, 0.5),
+    'coverage_stats':    (4, 0.5),
+}
+
+
+class TestQueryBudgets(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            id=str(uuid.uuid4()),
+            username='testuser'
+        )
+        size = BUDGET_WORLD_SIZE
+        self.world = World.objects.create(
+            name='testworld_budget',
+            owner=self.user,
+            grid=np.ones((size, size), dtype=bool),
+            start_x=size // 2,
+            start_y=size // 2,
+        )
+        self.airplane = self.world.airplanes.create(name='budget', owner=self.user, pos_x=size // 2, pos_y=size // 2,
+                                                    path_length=1)
+        self.auth = {'HTTP_AUTHORIZATION': f'Bearer {generate_token_from_user(self.user)}'}
+        # Some history for the list endpoints to page through
+        for _ in range(20):
+            self.post(f'airplanes/{self.airplane.id}/move/')
+
+    def post(self, path, data=None):
+        return self.client.post(f'/services/api/{path}', data, content_type='application/json', **self.auth)
+
+    def get(self, path):
+        return self.client.get(f'/services/api/{path}', **self.auth)
+
+    def assertWithinBudget(self, name, request):
+        max_queries, max_seconds = QUERY_BUDGETS[name]
+        token_cache.clear()
+        world_cache.clear()
+        started = time.perf_counter()
+        with track_queries() as stats:
+            response = request()
+        duration = time.perf_counter() - started
+
+        self.assertLess(response.status_code, 400, response.content[:200])
+        self.assertLessEqual(stats['count'], max_queries, f"{name} ran {stats['count']} queries")
+        if CHECK_TIME_BUDGETS:
+            self.assertLessEqual(duration, max_seconds, f"{name} took {duration:.3f}s")
+        return response
+
+    def test_create_world(self):
+        size = BUDGET_WORLD_SIZE
+        self.assertWithinBudget('create_world', lambda: self.post(
+            'worlds/', {'name': 'budget_world', 'width': size, 'height': size, 'seed': 1}))
+
+    def test_create_airplane(self):
+        self.assertWithinBudget('create_airplane', lambda: self.post(
+            'airplanes/', {'name': 'budget_airplane', 'world': self.world.id}))
+
+    def test_move(self):
+        self.assertWithinBudget('move', lambda: self.post(f'airplanes/{self.airplane.id}/move/'))
+
+    def test_rotate(self):
+        self.assertWithinBudget('rotate_left', lambda: self.post(f'airplanes/{self.airplane.id}/rotate_left/'))
+        self.assertWithinBudget('rotate_right', lambda: self.post(f'airplanes/{self.airplane.id}/rotate_right/'))
+
+    def test_end_flight(self):
+        self.assertWithinBudget('end_flight', lambda: self.post(f'airplanes/{self.airplane.id}/end_flight/'))
+
+    def test_scanned_cell_list(self):
+        response = self.assertWithinBudget('scanned_cell_list', lambda: self.get(f'scanned-cell/?world={self.world.id}'))
+        self.assertEqual(len(response.json()['results']), ScannedCell.objects.filter(world=self.world).count())
+
+    def test_coverage_stats(self):
+        self.assertWithinBudget('coverage_stats', lambda: self.get(f'coverage-statistics/?world={self.world.id}'))
@@ -0,0 +1,174 @@
+import contextvars
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+# Opt-in tracing of the phases of a request. Code marks a phase with
+#
+#     with tracing.span("world.decode", world=world.id):
+#         ...
+#
+# and spans opened inside it become its children. The TRACING setting picks
+# where finished traces go:
+#
+#   "off"            spans cost one attribute lookup
+#   "log"            one line per trace on the api.tracing logger
+#   "opentelemetry"  spans are created with the OpenTelemetry API, exported
+#                    by whatever SDK the process configured
+#
+# Tests record spans in memory with `tracing.capture()`.
+
+logger = logging.getLogger(__name__)
+
+
+class Span:
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "attributes", "start", "end", "error")
+
+    def __init__(self, name, trace_id, parent_id, attributes):
+        self.name = name
+        self.trace_id = trace_id or os.urandom(16).hex()
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.attributes = attributes
+        self.start = time.perf_counter()
+        self.end = None
+        self.error = None
+
+    @property
+    def duration(self):
+        return (self.end if self.end is not None else time.perf_counter()) - self.start
+
+    def set_attribute(self, key, value):
+        self.attributes[key] = value
+
+    def __repr__(self):
+        return f"<Span {self.name} {self.duration * 1000:.2f}ms>"
+
+
+class _NoopSpan:
+
+    def set_attribute(self, key, value):
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class InMemoryExporter:
+    """
+    Keeps every finished span, in the order they finished.
+    """
+
+    def __init__(self):
+        self.spans = []
+        self._lock = threading.Lock()
+
+    def export(self, spans):
+        with self._lock:
+            self.spans.extend(spans)
+
+    def names(self):
+        return [span.name for span in self.spans]
+
+    def clear(self):
+        with self._lock:
+            self.spans.clear()
+
+
+class LoggingExporter:
+    """
+    Logs each trace on one line: the root span and the duration of each of
+    its descendants.
+    """
+
+    def export(self, spans):
+        root = spans[-1]
+        phases = ", ".join(f"{span.name} {span.duration * 1000:.2f}ms" for span in spans[:-1])
+        logger.info(f"trace {root.trace_id} {root.name} {root.duration * 1000:.2f}ms [{phases}]")
+
+
+class _Trace:
+    """
+    Spans of one trace, exported together when the root span ends.
+    """
+    __slots__ = ("spans",)
+
+    def __init__(self):
+        self.spans = []
+
+
+_current = contextvars.ContextVar("capstone2_span", default=None)
+_exporter = None
+_opentelemetry = None
+
+
+def configure(mode):
+    global _exporter, _opentelemetry
+    _exporter, _opentelemetry = None, None
+    if mode == "log":
+        _exporter = LoggingExporter()
+    elif mode == "opentelemetry":
+        try:
+            from opentelemetry import trace
+        except ImportError:
+            raise ImproperlyConfigured("TRACING=opentelemetry requires the opentelemetry-api package")
+        _opentelemetry = trace.get_tracer("capstone2")
+    elif mode != "off":
+        raise ImproperlyConfigured(f"Unknown TRACING mode {mode!r}, expected off, log or opentelemetry")
+
+
+configure(getattr(settings, "TRACING", "off"))
+
+
+@contextmanager
+def span(name, **attributes):
+    """
+    Records the enclosed block as a span named `name`. Yields an object with
+    `set_attribute(key, value)`.
+    """
+    if _opentelemetry is not None:
+        with _opentelemetry.start_as_current_span(name, attributes=attributes) as otel_span:
+            yield otel_span
+        return
+    if _exporter is None:
+        yield NOOP_SPAN
+        return
+
+    parent = _current.get()
+    if parent is None:
+        trace, current = _Trace(), Span(name, None, None, attributes)
+    else:
+        trace, parent_span = parent
+        current = Span(name, parent_span.trace_id, parent_span.span_id, attributes)
+    token = _current.set((trace, current))
+    try:
+        yield current
+    except BaseException as e:
+        current.error = repr(e)
+        raise
+    finally:
+        current.end = time.perf_counter()
+        _current.reset(token)
+        trace.spans.append(current)
+        if parent is None:
+            _exporter.export(trace.spans)
+
+
+@contextmanager
+def capture():
+    """
+    Records spans in memory for the duration of the block, whatever the
+    TRACING setting. Yields the InMemoryExporter.
+    """
+    global _exporter, _opentelemetry
+    saved = _exporter, _opentelemetry
+    _exporter, _opentelemetry = InMemoryExporter(), None
+    try:
+        yield _exporter
+    finally:
+        _exporter, _opentelemetry = saved
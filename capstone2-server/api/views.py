@@ -1,21 +1,53 @@
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
-from .map_generator import generate_map
-from .serializers import AirplaneSerializer, PathPointSerializer, ScannedCellSerializer, CoverageStatisticsSerializer, WorldSerializer
+from .map_generator import generate_map, generate_world, resolve_params
+from .occupancy import OBSTACLE_RGB, run_lengths
+from .world_cache import coverage_cache, get_decoded_world
+from . import metrics, realtime, simulator, tracing
+from .serializers import AirplaneSerializer, PathPointSerializer, ScannedCellSerializer, CoverageStatisticsSerializer, WorldSerializer, WorldListSerializer, GENERATION_PARAMS
 from django_filters.rest_framework import DjangoFilterBackend
+import base64
+import functools
 import logging
+import time
 import os
 from datetime import datetime, timedelta
 import jwt
 from rest_framework.decorators import action
+from rest_framework.reverse import reverse
+from rest_framework.utils.urls import replace_query_param
 from .models import World, Airplane, PathPoint, ScannedCell, CoverageStatistics
-from django.db import transaction, IntegrityError
+from django.db import transaction
+from django.conf import settings
+from django.http import Http404, HttpResponse
+from django.utils.crypto import constant_time_compare
+from rest_framework.generics import get_object_or_404
 from django.db.models import Count
+from django.utils.dateparse import parse_datetime
 import random
+import numpy as np
 
 JWT_SECRET = os.environ["JWT_SECRET"]
 logger = logging.getLogger(__name__)
 
+# Upper bound on the number of actions accepted by one execute request
+MAX_EXECUTE_ACTIONS = 2000
+
+def metrics_view(request):
+    """
+    Prometheus metrics in the text exposition format. Scrapers authenticate
+    with `Authorization: Bearer <METRICS_TOKEN>`; without a METRICS_TOKEN the
+    endpoint is only served in DEBUG.
+    """
+    token = getattr(settings, "METRICS_TOKEN", None)
+    if token:
+        if not constant_time_compare(request.headers.get("Authorization", ""), f"Bearer {token}"):
+            return HttpResponse("Unauthorized", status=401, content_type="text/plain")
+    elif not settings.DEBUG:
+        raise Http404()
+    content, content_type = metrics.render()
+    return HttpResponse(content, content_type=content_type)
+
 @api_view(["GET"])
 def generate_map_view(request):
     """
@@ -23,7 +55,24 @@ def generate_map_view(request):
     """
     return Response({"map": generate_map()})
 
-from rest_framework import viewsets, permissions, pagination, filters
+from rest_framework import viewsets, permissions, pagination, filters, serializers
+
+def _random_traversable_cell(grid):
+    """
+    Returns the (row, col) of a random traversable cell in the grid.
+    """
+    cells = np.flatnonzero(grid)
+    if cells.size == 0:
+        raise serializers.ValidationError("World has no traversable cells")
+    row, col = np.unravel_index(int(random.choice(cells)), grid.shape)
+    return int(row), int(col)
+
+def _if_none_match(request):
+    """
+    The entity tags listed in the request's If-None-Match header. Weak tags
+    match too: GZipMiddleware marks the ETag of compressed responses weak.
+    """
+    return [tag.strip().removeprefix("W/") for tag in request.headers.get("If-None-Match", "").split(",")]
 
 class WorldPagination(pagination.PageNumberPagination):
     page_size = 10
@@ -31,35 +80,83 @@ class WorldPagination(pagination.PageNumberPagination):
     max_page_size = 100
 
 class WorldViewSet(viewsets.ModelViewSet):
+    """
+    Worlds are listed without their map; pass `?include=basemap` to get it.
+    `?fields=id,name` limits the list to the given fields.
+    """
     serializer_class = WorldSerializer
     permission_classes = [permissions.IsAuthenticated]
     pagination_class = WorldPagination
     filter_backends = [filters.SearchFilter]
     search_fields = ['name', 'owner__username']
 
+    def _query_list(self, param):
+        value = self.request.query_params.get(param)
+        return [name.strip() for name in value.split(",") if name.strip()] if value else None
+
+    def _list_includes_basemap(self):
+        return "basemap" in (self._query_list("include") or []) + (self._query_list("fields") or [])
+
     def get_queryset(self):
-        return World.objects.all()
+        queryset = World.objects.all()
+        if self.action == 'list':
+            queryset = queryset.select_related('coverage_stats')
+            if not self._list_includes_basemap():
+                queryset = queryset.defer('occupancy')
+        return queryset
 
-    def perform_create(self, serializer):
-        basemap, _ = generate_map()
+    def get_serializer_class(self):
+        if self.action == 'list' and not self._list_includes_basemap():
+            return WorldListSerializer
+        return WorldSerializer
+
+    def get_serializer(self, *args, **kwargs):
+        if self.action == 'list':
+            kwargs.setdefault('fields', self._query_list("fields"))
+        elif self.action == 'create':
+            # The map of a large world is tens of MB, the response points to
+            # the world's URL instead, see get_success_headers
+            kwargs.setdefault('fields', [field for field in WorldSerializer.Meta.fields if field != 'basemap'])
+        return super().get_serializer(*args, **kwargs)
+
+    def get_success_headers(self, data):
+        return {"Location": reverse("world-detail", args=[data["id"]], request=self.request)}
+
+    def retrieve(self, request, *args, **kwargs):
+        """
+        A world's map never changes after creation and any other change bumps
+        `updated_at`, so it identifies the response. Clients that send the
+        ETag back in If-None-Match get a 304 without the map being decoded.
+        """
+        world = get_object_or_404(self.get_queryset().only('updated_at'), pk=kwargs['pk'])
+        etag = f'"{world.pk}-{int(world.updated_at.timestamp() * 1_000_000)}"'
+        headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+        if etag in _if_none_match(request):
+            return Response(status=304, headers=headers)
 
-        # generate random points until empty cell is found
-        pos_x, pos_y = None, None
-        while True:
-            pos_x = random.randint(0, len(basemap[0]) - 1)
-            pos_y = random.randint(0, len(basemap) - 1)
-            if basemap[pos_y][pos_x] != [255, 255, 255]:
-                break
+        response = super().retrieve(request, *args, **kwargs)
+        for header, value in headers.items():
+            response[header] = value
+        return response
+
+    def perform_create(self, serializer):
+        data = serializer.validated_data
+        params = resolve_params(**{field: data.get(field) for field in GENERATION_PARAMS})
+        try:
+            grid, (pos_y, pos_x) = generate_world(data['width'], data['height'], **params)
+        except ValueError as e:
+            raise serializers.ValidationError({"threshold": f"{e}, raise the obstacle threshold"})
 
         world = serializer.save(
             owner=self.request.user,
-            basemap=basemap,
+            grid=grid,
             start_y=pos_y,
             start_x=pos_x,
+            **params,
         )
         
-        # Count total traversable cells (cells with value 0)
-        total_traversable = sum(row.count(0) for row in basemap)
+        # Count total traversable cells
+        total_traversable = int(grid.sum())
         
         # Create initial coverage statistics
         CoverageStatistics.objects.create(
@@ -67,9 +164,68 @@ class WorldViewSet(viewsets.ModelViewSet):
             total_cells=total_traversable,
             scanned_cells=0,
             coverage_percentage=0.0,
-            path_length=0
+            path_length=0,
         )
 
+    @action(detail=True, methods=["GET"], url_path="coverage-bitmap")
+    def coverage_bitmap(self, request, pk=None):
+        """
+        The world's scanned cells as a packed, row-major bitset (1 = scanned,
+        see api.occupancy). `encoding` selects the representation:
+
+        - `base64` (default): JSON with the bitset in `data`
+        - `rle`: JSON with run lengths in `runs`, alternating unscanned and
+          scanned cells and starting with unscanned
+        - `raw`: the bitset as application/octet-stream, with the size in the
+          X-Width and X-Height headers
+
+        Responses carry an ETag; send it back in If-None-Match to get a 304
+        when no cell was scanned since.
+        """
+        encoding = request.query_params.get("encoding", "base64")
+        if encoding not in ("base64", "rle", "raw"):
+            return Response({"error": "encoding must be one of base64, rle, raw"}, status=400)
+        world = get_object_or_404(self.get_queryset().only('width', 'height'), pk=pk)
+
+        version = CoverageStatistics.objects.filter(world=world).values_list('coverage_version', flat=True).first()
+        if version is None:
+            stats, _ = CoverageStatistics.objects.get_or_create(world=world)
+            version = stats.reconcile().coverage_version
+        headers = {"ETag": f'"{world.id}-{version}-{encoding}"'}
+        if headers["ETag"] in _if_none_match(request):
+            return Response(status=304, headers=headers)
+
+        coverage = coverage_cache.get(world.id, version, functools.partial(ScannedCell.objects.coverage_bitmap, world))
+
+        if encoding == "raw":
+            response = HttpResponse(coverage, content_type="application/octet-stream", headers=headers)
+            response["X-Width"], response["X-Height"] = world.width, world.height
+            return response
+        data = {"width": world.width, "height": world.height, "encoding": encoding}
+        if encoding == "rle":
+            data["runs"] = run_lengths(coverage, world.width, world.height)
+        else:
+            data["data"] = base64.b64encode(coverage).decode()
+        return Response(data, headers=headers)
+
+def _instrument_action(view):
+    """
+    Counts an airplane action as applied or rejected and records its latency
+    by the airplane's flight length, see api.metrics. The action runs in an
+    "airplane.<action>" tracing span, the root of its phases' spans.
+    """
+    @functools.wraps(view)
+    def wrapper(self, request, *args, **kwargs):
+        started = time.perf_counter()
+        self.airplane = None
+        with tracing.span(f"airplane.{self.action}", airplane=kwargs.get("pk")) as span:
+            response = view(self, request, *args, **kwargs)
+            span.set_attribute("status", response.status_code)
+        path_length = self.airplane.path_length if self.airplane is not None else 0
+        metrics.record_action(self.action, response.status_code < 400, time.perf_counter() - started, path_length)
+        return response
+    return wrapper
+
 class AirplaneViewSet(viewsets.ModelViewSet):
     serializer_class = AirplaneSerializer
     permission_classes = [permissions.IsAuthenticated]
@@ -81,19 +237,19 @@ class AirplaneViewSet(viewsets.ModelViewSet):
         max_page_size = 100
     
     def get_queryset(self):
-        return Airplane.objects.all()
+        # The world's occupancy blob is served from the decoded-world cache
+        return Airplane.objects.select_related('world').defer('world__occupancy')
+
+    def get_object(self):
+        # Kept for _instrument_action
+        self.airplane = super().get_object()
+        return self.airplane
 
     def perform_create(self, serializer):
         world_id = self.request.data.get('world')
         name = self.request.data.get('name')
-        world = World.objects.get(id=world_id)
-        basemap = world.basemap
-        pos_x, pos_y = None, None
-        while True:
-            pos_x = random.randint(0, len(basemap[0]) - 1)
-            pos_y = random.randint(0, len(basemap) - 1)
-            if basemap[pos_y][pos_x] == [ 255, 255, 255 ]:
-                break
+        world = World.objects.defer('occupancy').get(id=world_id)
+        pos_y, pos_x = _random_traversable_cell(get_decoded_world(world).grid)
 
         airplane = serializer.save(
             owner=self.request.user,
@@ -101,6 +257,7 @@ class AirplaneViewSet(viewsets.ModelViewSet):
             name=name,
             pos_y=pos_y,
             pos_x=pos_x,
+            path_length=1,
         )
         
         # Record initial position in path
@@ -112,327 +269,231 @@ class AirplaneViewSet(viewsets.ModelViewSet):
         )
         
         # Record initial scanned cells
-        self._record_scanned_cells(airplane)
+        new_cells = self._record_scanned_cells(airplane)
+        self._publish(airplane, new_cells)
+
+    def perform_destroy(self, instance):
+        world_id, airplane_id = instance.world_id, instance.id
+        super().perform_destroy(instance)
+        realtime.publish_on_commit(world_id, [{"type": "airplane_deleted", "id": airplane_id}])
 
-    def _record_scanned_cells(self, airplane):
+    def _publish(self, airplane, new_cells=()):
         """
-        Records the cells scanned by the airplane's sensor.
+        Sends the airplane's state and the cells it newly scanned to the
+        world's viewers once the transaction commits.
         """
-        world = airplane.world
-        x, y = airplane.pos_x, airplane.pos_y
-        rotation = airplane.rotation
-        
-        # Define the scanner coverage (2x3 rectangle ahead of aircraft)
-        scan_cells = []
-        
-        if rotation == "UP":
-            # Scanning area is above the aircraft
-            for i in range(-1, 1):  # 2 rows (up)
-                for j in range(-1, 2):  # 3 columns (left to right)
-                    scan_cells.append((x + j, y - 1 - i))
-        elif rotation == "DOWN":
-            # Scanning area is below the aircraft
-            for i in range(-1, 1):  # 2 rows (down)
-                for j in range(-1, 2):  # 3 columns (left to right)
-                    scan_cells.append((x + j, y + 1 + i))
-        elif rotation == "LEFT":
-            # Scanning area is to the left of the aircraft
-            for i in range(-1, 2):  # 3 rows (top to bottom)
-                for j in range(-1, 1):  # 2 columns (left)
-                    scan_cells.append((x - 1 - j, y + i))
-        elif rotation == "RIGHT":
-            # Scanning area is to the right of the aircraft
-            for i in range(-1, 2):  # 3 rows (top to bottom)
-                for j in range(-1, 1):  # 2 columns (right)
-                    scan_cells.append((x + 1 + j, y + i))
-        
-        # Create ScannedCell records for each cell in the scan area
-        basemap = world.basemap
-        height = len(basemap)
-        width = len(basemap[0]) if height > 0 else 0
-        
-        cells_added = False  # Flag to track if any new cells were added
-        
-        for scan_x, scan_y in scan_cells:
-            # Skip if out of bounds
-            if scan_x < 0 or scan_x >= width or scan_y < 0 or scan_y >= height:
-                continue
-                
-            # Check if cell is traversable
-            cell_value = basemap[scan_y][scan_x]
-            is_traversable = False
-            
-            if isinstance(cell_value, int):
-                # Integer representation
-                is_traversable = (cell_value == 255)
-            elif isinstance(cell_value, list):
-                # List/array representation - check if it's clear space [0, 0, 0]
-                is_traversable = (cell_value == [255,255, 255])
-            
-            if not is_traversable:
-                continue
-                
-            # Record scanned cell, tracking if it was created or already existed
-            # Wrap in try-except to handle potential race conditions / duplicate entries gracefully
-            # This can happen if multiple actions trigger scans on the same cell within tests or rapid succession
-            created = False
-            try:
-                _, created = ScannedCell.objects.get_or_create(
-                    world=world,
-                    # Note: If multiple airplanes scanning the same cell is intended to create only ONE ScannedCell record
-                    # per (world, x, y), then the 'airplane=airplane' field here might be incorrect or the unique constraint
-                    # should only be on (world, x, y). For now, we keep the airplane link but handle the IntegrityError.
-                    airplane=airplane,
-                    pos_x=scan_x,
-                    pos_y=scan_y,
-                    # Optionally add defaults if needed, though not strictly necessary for get_or_create
-                    # defaults={'timestamp': timezone.now()} # Requires importing timezone
-                )
-            except IntegrityError:
-                # Cell likely already exists due to race condition or previous scan, ignore the error
-                logger.warning(f"IntegrityError ignored for ScannedCell ({world.id}, {scan_x}, {scan_y}). Cell likely already exists.")
-                pass # Continue processing other cells
-            
-            if created:
-                cells_added = True
-                logger.info(f"New cell scanned at ({scan_x}, {scan_y})")
-        
-        # Update coverage statistics if new cells were added
-        if cells_added:
-            self._update_coverage_stats(world)
-    
-    def _update_coverage_stats(self, world):
+        data = self.get_serializer(airplane).data
+        realtime.publish_on_commit(airplane.world_id, realtime.airplane_events(data, new_cells))
+        return data
+
+    def _record_scanned_cells(self, airplane, new_points=1):
         """
-        Updates the coverage statistics for the world.
+        Records the cells scanned by the airplane's sensor and returns the
+        list of cells that were newly covered. The world's coverage statistics
+        are advanced by the new cells and by `new_points`, the number of path
+        points the caller recorded for this step.
         """
-        try:
-            # Get or create statistics object for this world
-            stats, created = CoverageStatistics.objects.get_or_create(
-                world=world,
-                defaults={
-                    'total_cells': 0,
-                    'scanned_cells': 0,
-                    'coverage_percentage': 0.0,
-                    'path_length': 0
-                }
-            )
-            
-            logger.info(f"Updating coverage statistics for world {world.id}")
-            
-            # Count traversable cells in the basemap if total_cells is 0
-            if stats.total_cells == 0:
-                basemap = world.basemap
-                # Count cells that are traversable (value 0 or list representation)
-                total_traversable = 0
-                for y, row in enumerate(basemap):
-                    for x, cell in enumerate(row):
-                        if isinstance(cell, int) and cell == 0:
-                            total_traversable += 1
-                        elif isinstance(cell, list):
-                            # Consider list values as traversable for visualization purposes
-                            total_traversable += 1
-                
-                stats.total_cells = total_traversable
-                logger.info(f"Counted {total_traversable} traversable cells in world")
-            
-            # Count unique scanned cells
-            scanned_count = ScannedCell.objects.filter(world=world).values('pos_x', 'pos_y').distinct().count()
-            logger.info(f"Scanned cells count: {scanned_count}")
-            
-            # Count total path length (number of path points across all airplanes)
-            path_length = PathPoint.objects.filter(airplane__world=world).count()
-            logger.info(f"Path length: {path_length}")
-            
-            # Update statistics
-            stats.scanned_cells = scanned_count
-            stats.path_length = path_length
-            
-            # Calculate coverage percentage
-            if stats.total_cells > 0:
-                stats.coverage_percentage = (stats.scanned_cells / stats.total_cells) * 100
-                logger.info(f"Coverage percentage: {stats.coverage_percentage:.2f}%")
-            else:
-                stats.coverage_percentage = 0
+        world = airplane.world
+        with tracing.span("scan.record", world=world.id) as span:
+            with tracing.span("world.decode", world=world.id):
+                decoded = get_decoded_world(world)
             
-            stats.save()
-            logger.info("Statistics saved successfully")
+            # Scanner coverage (2x3 rectangle ahead of aircraft), keeping only
+            # traversable cells inside the map
+            scan_cells = [
+                cell for cell in simulator.sensor_footprint(airplane.pos_x, airplane.pos_y, airplane.rotation)
+                if decoded.is_traversable(*cell)
+            ]
             
-        except Exception as e:
-            logger.error(f"Error updating coverage statistics: {str(e)}")
-            # Create statistics if they don't exist
-            try:
-                basemap = world.basemap
-                # Count traversable cells in a similar way as above
-                total_traversable = 0
-                for y, row in enumerate(basemap):
-                    for x, cell in enumerate(row):
-                        if isinstance(cell, int) and cell == 0:
-                            total_traversable += 1
-                        elif isinstance(cell, list):
-                            total_traversable += 1
-                
-                scanned_count = ScannedCell.objects.filter(world=world).values('pos_x', 'pos_y').distinct().count()
-                path_length = PathPoint.objects.filter(airplane__world=world).count()
-                
-                coverage_percentage = 0
-                if total_traversable > 0:
-                    coverage_percentage = (scanned_count / total_traversable) * 100
-                
-                CoverageStatistics.objects.create(
-                    world=world,
-                    total_cells=total_traversable,
-                    scanned_cells=scanned_count,
-                    coverage_percentage=coverage_percentage,
-                    path_length=path_length
-                )
-                logger.info("Created new coverage statistics")
-            except Exception as nested_e:
-                logger.error(f"Failed to create coverage statistics: {str(nested_e)}")
+            # One INSERT ... ON CONFLICT DO NOTHING for the whole footprint
+            with tracing.span("scan.insert", cells=len(scan_cells)):
+                new_cells = ScannedCell.objects.insert_new(world, airplane, scan_cells)
+            span.set_attribute("new_cells", len(new_cells))
+            if new_cells:
+                logger.debug(f"New cells scanned: {new_cells}")
+                metrics.SCANNED_CELLS.inc(len(new_cells))
 
+            # Incrementally update coverage statistics
+            with tracing.span("stats.update"):
+                CoverageStatistics.objects.record_progress(world, new_cells=len(new_cells), new_points=new_points,
+                                                          cells=new_cells)
+        return new_cells
+    
     @action(detail=True, methods=["POST"])
+    @_instrument_action
     @transaction.atomic
     def move(self, request, pk=None):
-        airplane = self.get_object()
+        with tracing.span("airplane.load"):
+            airplane = self.get_object()
         
-        # Debug logging
-        logger.info(f"Move request for airplane {airplane.id} ({airplane.name})")
-        logger.info(f"Initial position: ({airplane.pos_x}, {airplane.pos_y}), rotation: {airplane.rotation}")
+        logger.debug(f"Move request for airplane {airplane.id} ({airplane.name}) "
+                     f"at ({airplane.pos_x}, {airplane.pos_y}), rotation: {airplane.rotation}")
         
         # Store original position for validation
         orig_x, orig_y = airplane.pos_x, airplane.pos_y
         
         # Update position based on rotation
-        if airplane.rotation == "UP":
-            airplane.pos_y -= 1
-            logger.info(f"Moving UP to ({airplane.pos_x}, {airplane.pos_y})")
-        elif airplane.rotation == "DOWN":
-            airplane.pos_y += 1
-            logger.info(f"Moving DOWN to ({airplane.pos_x}, {airplane.pos_y})")
-        elif airplane.rotation == "LEFT":
-            airplane.pos_x -= 1
-            logger.info(f"Moving LEFT to ({airplane.pos_x}, {airplane.pos_y})")
-        elif airplane.rotation == "RIGHT":
-            airplane.pos_x += 1
-            logger.info(f"Moving RIGHT to ({airplane.pos_x}, {airplane.pos_y})")
+        airplane.pos_x, airplane.pos_y = simulator.forward(airplane.pos_x, airplane.pos_y, airplane.rotation)
             
-        # Validate new position (ensure it's within map bounds and on a traversable cell)
-        world = airplane.world
-        basemap = world.basemap
-        height = len(basemap)
-        width = len(basemap[0]) if height > 0 else 0
-        
-        logger.info(f"Map dimensions: {width}x{height}")
-        
-        # Check bounds
-        if airplane.pos_x < 0 or airplane.pos_x >= width or airplane.pos_y < 0 or airplane.pos_y >= height:
-            # Revert position if invalid
-            logger.warning(f"Out of bounds: ({airplane.pos_x}, {airplane.pos_y})")
-            airplane.pos_x, airplane.pos_y = orig_x, orig_y
-            return Response({"error": "Cannot move outside map boundaries"}, status=400)
-        
-        # Check if cell is traversable
-        try:
-            cell_value = basemap[airplane.pos_y][airplane.pos_x]
-            logger.info(f"Target cell value: {cell_value}")
+        with tracing.span("world.decode", world=airplane.world_id):
+            decoded = get_decoded_world(airplane.world)
+        width, height = decoded.width, decoded.height
         
-            is_traversable = False
-            if isinstance(cell_value, int):
-                # Integer representation
-                is_traversable = (cell_value == 255)
-            elif isinstance(cell_value, list):
-                # Check if the list represents clear space [0, 0, 0]
-                is_traversable = (cell_value == [ 255, 255, 255 ])
-            
-            if not is_traversable:
+        # Validate new position (ensure it's within map bounds and on a traversable cell)
+        with tracing.span("move.validate") as span:
+            # Check bounds
+            if airplane.pos_x < 0 or airplane.pos_x >= width or airplane.pos_y < 0 or airplane.pos_y >= height:
                 # Revert position if invalid
-                logger.warning(f"Non-traversable cell: ({airplane.pos_x}, {airplane.pos_y}) with value {cell_value}")
+                logger.warning(f"Out of bounds: ({airplane.pos_x}, {airplane.pos_y})")
+                span.set_attribute("result", "out_of_bounds")
                 airplane.pos_x, airplane.pos_y = orig_x, orig_y
-                return Response({"error": f"Cannot move to non-traversable cell with value {cell_value}"}, status=400)
-            
-            logger.info(f"Target cell is traversable")
+                return Response({"error": "Cannot move outside map boundaries"}, status=400)
             
-        except Exception as e:
-            logger.error(f"Error checking traversability: {str(e)}")
-            airplane.pos_x, airplane.pos_y = orig_x, orig_y
-            return Response({"error": f"Error validating move: {str(e)}"}, status=400)
-        
-        # Save the airplane's new position
-        try:
-            airplane.save()
-            logger.info(f"Successfully moved to ({airplane.pos_x}, {airplane.pos_y})")
-        except Exception as e:
-            logger.error(f"Error saving airplane: {str(e)}")
-            airplane.pos_x, airplane.pos_y = orig_x, orig_y
-            return Response({"error": f"Error saving move: {str(e)}"}, status=400)
+            # Check if cell is traversable
+            try:
+                if not decoded.is_traversable(airplane.pos_x, airplane.pos_y):
+                    # Revert position if invalid
+                    logger.warning(f"Non-traversable cell: ({airplane.pos_x}, {airplane.pos_y}) with value {OBSTACLE_RGB}")
+                    span.set_attribute("result", "obstacle")
+                    airplane.pos_x, airplane.pos_y = orig_x, orig_y
+                    return Response({"error": f"Cannot move to non-traversable cell with value {OBSTACLE_RGB}"}, status=400)
+            except Exception as e:
+                logger.error(f"Error checking traversability: {str(e)}")
+                airplane.pos_x, airplane.pos_y = orig_x, orig_y
+                return Response({"error": f"Error validating move: {str(e)}"}, status=400)
         
-        # Record this position in the path
-        try:
-            PathPoint.objects.create(
-                airplane=airplane,
-                pos_x=airplane.pos_x,
-                pos_y=airplane.pos_y,
-                rotation=airplane.rotation
-            )
-            logger.info("Recorded path point")
-        except Exception as e:
-            logger.error(f"Error recording path point: {str(e)}")
-            # Continue even if path recording fails
+        with tracing.span("airplane.save"):
+            # Save the airplane's new position
+            try:
+                airplane.path_length += 1
+                airplane.save()
+            except Exception as e:
+                logger.error(f"Error saving airplane: {str(e)}")
+                airplane.pos_x, airplane.pos_y = orig_x, orig_y
+                return Response({"error": f"Error saving move: {str(e)}"}, status=400)
+            
+            # Record this position in the path
+            new_points = 0
+            try:
+                PathPoint.objects.create(
+                    airplane=airplane,
+                    pos_x=airplane.pos_x,
+                    pos_y=airplane.pos_y,
+                    rotation=airplane.rotation
+                )
+                new_points = 1
+            except Exception as e:
+                logger.error(f"Error recording path point: {str(e)}")
+                # Continue even if path recording fails
+        logger.debug(f"Moved to ({airplane.pos_x}, {airplane.pos_y})")
         
         # Record scanned cells
+        new_cells = []
         try:
-            self._record_scanned_cells(airplane)
-            logger.info("Recorded scanned cells")
+            new_cells = self._record_scanned_cells(airplane, new_points=new_points)
         except Exception as e:
             logger.error(f"Error recording scanned cells: {str(e)}")
             # Continue even if cell recording fails
     
-        return Response(self.get_serializer(airplane).data)
+        return Response(self._publish(airplane, new_cells))
     
     @action(detail=True, methods=["POST"])
+    @_instrument_action
     @transaction.atomic
     def rotate_left(self, request, pk=None):
-        airplane = self.get_object()
-        rotations = ["UP", "LEFT", "DOWN", "RIGHT"]
-        current_rotation_index = rotations.index(airplane.rotation)
-        new_rotation_index = (current_rotation_index - 1) % 4
-        airplane.rotation = rotations[new_rotation_index]
-        airplane.save()
+        with tracing.span("airplane.load"):
+            airplane = self.get_object()
+        airplane.rotation = simulator.rotate_left(airplane.rotation)
         
-        # Record this position with new rotation in the path
-        PathPoint.objects.create(
-            airplane=airplane,
-            pos_x=airplane.pos_x,
-            pos_y=airplane.pos_y,
-            rotation=airplane.rotation
-        )
+        with tracing.span("airplane.save"):
+            airplane.path_length += 1
+            airplane.save()
+            
+            # Record this position with new rotation in the path
+            PathPoint.objects.create(
+                airplane=airplane,
+                pos_x=airplane.pos_x,
+                pos_y=airplane.pos_y,
+                rotation=airplane.rotation
+            )
         
         # Record scanned cells with new rotation
-        self._record_scanned_cells(airplane)
+        new_cells = self._record_scanned_cells(airplane)
         
-        return Response(self.get_serializer(airplane).data)
+        return Response(self._publish(airplane, new_cells))
         
     @action(detail=True, methods=["POST"])
+    @_instrument_action
     @transaction.atomic
     def rotate_right(self, request, pk=None):
-        airplane = self.get_object()
-        rotations = ["UP", "LEFT", "DOWN", "RIGHT"]
-        current_rotation_index = rotations.index(airplane.rotation)
-        new_rotation_index = (current_rotation_index + 1) % 4
-        airplane.rotation = rotations[new_rotation_index]
-        airplane.save()
+        with tracing.span("airplane.load"):
+            airplane = self.get_object()
+        airplane.rotation = simulator.rotate_right(airplane.rotation)
         
-        # Record this position with new rotation in the path
-        PathPoint.objects.create(
-            airplane=airplane,
-            pos_x=airplane.pos_x,
-            pos_y=airplane.pos_y,
-            rotation=airplane.rotation
-        )
+        with tracing.span("airplane.save"):
+            airplane.path_length += 1
+            airplane.save()
+            
+            # Record this position with new rotation in the path
+            PathPoint.objects.create(
+                airplane=airplane,
+                pos_x=airplane.pos_x,
+                pos_y=airplane.pos_y,
+                rotation=airplane.rotation
+            )
         
         # Record scanned cells with new rotation
-        self._record_scanned_cells(airplane)
+        new_cells = self._record_scanned_cells(airplane)
         
-        return Response(self.get_serializer(airplane).data)
+        return Response(self._publish(airplane, new_cells))
+
+    @action(detail=True, methods=["POST"])
+    @_instrument_action
+    @transaction.atomic
+    def execute(self, request, pk=None):
+        """
+        Apply a sequence of actions in one request. `actions` is either a
+        string of codes ("F" move, "L" rotate_left, "R" rotate_right) or a
+        list of codes or action names. Each step behaves like a call to the
+        matching endpoint: a move that would leave the map or enter an
+        obstacle is rejected and the airplane stays where it is.
+        """
+        airplane = self.get_object()
+
+        try:
+            codes = simulator.parse_actions(request.data.get("actions"), MAX_EXECUTE_ACTIONS)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=400)
+
+        # Replay the batch in memory with the same rules offline planners use
+        world = airplane.world
+        replay = simulator.SimulatedAirplane(get_decoded_world(world).grid, airplane.pos_x, airplane.pos_y,
+                                             airplane.rotation, scan_start=False)
+        result = replay.execute(codes)
+
+        path_points = [
+            PathPoint(airplane=airplane, pos_x=step["pos_x"], pos_y=step["pos_y"], rotation=step["rotation"])
+            for step in result["steps"] if step["ok"]
+        ]
+        if path_points:
+            airplane.pos_x, airplane.pos_y, airplane.rotation = replay.pos_x, replay.pos_y, replay.rotation
+            airplane.path_length += len(path_points)
+            airplane.save()
+            PathPoint.objects.bulk_create(path_points)
+            new_cells = ScannedCell.objects.insert_new(world, airplane, replay.scanned_cells)
+            metrics.SCANNED_CELLS.inc(len(new_cells))
+            CoverageStatistics.objects.record_progress(world, new_cells=len(new_cells), new_points=len(path_points),
+                                                      cells=new_cells)
+            data = self._publish(airplane, new_cells)
+        else:
+            data = self.get_serializer(airplane).data
+
+        return Response({
+            "airplane": data,
+            "applied": result["applied"],
+            "failed": result["failed"],
+            "steps": result["steps"],
+        })
 
     @action(detail=True, methods=["POST"])
     def end_flight(self, request, pk=None):
@@ -442,7 +503,7 @@ class AirplaneViewSet(viewsets.ModelViewSet):
         airplane = self.get_object()
         airplane.flight_ended = True
         airplane.save()
-        return Response(self.get_serializer(airplane).data)
+        return Response(self._publish(airplane))
 
 # Add a new viewset for coverage statistics
 class CoverageStatisticsViewSet(viewsets.ReadOnlyModelViewSet):
@@ -455,21 +516,104 @@ class CoverageStatisticsViewSet(viewsets.ReadOnlyModelViewSet):
         return CoverageStatistics.objects.filter(world__owner=self.request.user)
     
 
+class KeysetPagination(pagination.BasePagination):
+    """
+    Pages through rows in primary key order. `since_id` returns only rows
+    created after that id, and each page reports the id of its last row to
+    pass as the next `since_id`, so polling clients fetch only what changed
+    and deep pages cost one index range scan instead of an OFFSET.
+
+    Ids are assigned when rows are inserted, not when they commit. When
+    several requests write concurrently (e.g. planes sharing a world), a row
+    can become visible after a higher id was already served, and a poller
+    past it never sees it. Pollers that need every row should refetch from
+    the start now and then; a single airplane's cells, written by its own
+    sequential requests, are not affected.
+    """
+    page_size = 100
+    page_size_query_param = 'page_size'
+    max_page_size = 10000
+    cursor_query_param = 'since_id'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.since_id = self.get_since_id(request)
+        if self.since_id is not None:
+            queryset = queryset.filter(pk__gt=self.since_id)
+
+        rows = list(queryset.order_by('pk')[:self.page_size + 1])
+        self.has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if rows:
+            self.since_id = rows[-1].pk
+        return rows
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except ValueError:
+            return self.page_size
+        return min(max(page_size, 1), self.max_page_size)
+
+    def get_since_id(self, request):
+        since_id = request.query_params.get(self.cursor_query_param)
+        if since_id is None:
+            return None
+        try:
+            return int(since_id)
+        except ValueError:
+            raise serializers.ValidationError({self.cursor_query_param: "Must be an integer"})
+
+    def get_next_link(self):
+        if not self.has_more:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.since_id)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'since_id': self.since_id,
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'since_id': {'type': 'integer', 'nullable': True},
+                'results': schema,
+            },
+        }
+
+
 class ScannedCellViewSet(viewsets.ModelViewSet):
+    """
+    Scanned cells, oldest first. Poll with `?world=<id>&since_id=<id>` using
+    the `since_id` of the previous response to receive only new cells, or
+    filter by scan time with `?since=<ISO 8601 timestamp>`.
+    """
     queryset = ScannedCell.objects.all()
     serializer_class = ScannedCellSerializer
-    
-    class pagination_class(pagination.PageNumberPagination):
-        page_size = 100
-        page_size_query_param = 'page_size'
-        max_page_size = 10000
+    pagination_class = KeysetPagination
 
     filter_backends = [DjangoFilterBackend]
     filterset_fields = ['world', 'airplane']
-    # Optional: Override get_queryset if additional filtering is needed
+
     def get_queryset(self):
         queryset = super().get_queryset()
-        # You can add additional filtering logic here if required
+        since = self.request.query_params.get('since')
+        if since is not None:
+            try:
+                timestamp = parse_datetime(since)
+            except ValueError:
+                # Well formed but not a valid date, e.g. month 13
+                timestamp = None
+            if timestamp is None:
+                raise serializers.ValidationError({"since": "Must be an ISO 8601 timestamp"})
+            queryset = queryset.filter(timestamp__gt=timestamp)
         return queryset
 
 
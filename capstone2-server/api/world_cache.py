@@ -0,0 +1,174 @@
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+
+from . import metrics
+from .occupancy import unpack_grid
+
+# A world's map never changes after creation, so the decoded grid is kept in
+# process memory and shared by every airplane action. Entries are keyed by
+# world id and `updated_at`, so a re-saved world is decoded again.
+#
+# Coverage bitmaps are built from a world's scanned cells when they are read.
+# Each is kept with the coverage version it matches and the last scanned cell
+# it includes, so a newer version only reads the cells scanned since.
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+
+class DecodedWorld:
+    """
+    Decoded, read-only view of a world's map.
+    """
+
+    def __init__(self, world_id, updated_at, grid):
+        grid.setflags(write=False)
+        self.world_id = world_id
+        self.updated_at = updated_at
+        self.grid = grid
+        self.height, self.width = grid.shape
+        self.traversable_count = int(grid.sum())
+        self.nbytes = grid.nbytes
+
+    def in_bounds(self, x, y):
+        return 0 <= x < self.width and 0 <= y < self.height
+
+    def is_traversable(self, x, y):
+        return self.in_bounds(x, y) and bool(self.grid[y, x])
+
+
+class WorldCache:
+    """
+    Thread-safe LRU cache of decoded worlds, bounded by the total size of the
+    cached grids.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, world):
+        """
+        Returns the DecodedWorld for a World instance, decoding its occupancy
+        only on a cache miss. The occupancy field may be deferred.
+        """
+        with self._lock:
+            entry = self._entries.get(world.pk)
+            if entry is not None and entry.updated_at == world.updated_at:
+                self._entries.move_to_end(world.pk)
+                self.hits += 1
+                metrics.CACHE_LOOKUPS.labels("world", "hit").inc()
+                return entry
+            self.misses += 1
+        metrics.CACHE_LOOKUPS.labels("world", "miss").inc()
+
+        entry = DecodedWorld(world.pk, world.updated_at, unpack_grid(world.occupancy, world.width, world.height))
+
+        with self._lock:
+            self._remove(world.pk)
+            if entry.nbytes <= self.max_bytes:
+                self._entries[world.pk] = entry
+                self.current_bytes += entry.nbytes
+                while self.current_bytes > self.max_bytes:
+                    self._remove(next(iter(self._entries)))
+        return entry
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+            self.hits = 0
+            self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _remove(self, world_id):
+        entry = self._entries.pop(world_id, None)
+        if entry is not None:
+            self.current_bytes -= entry.nbytes
+
+
+class CoverageCache:
+    """
+    Thread-safe LRU cache of packed coverage bitmaps, one per world, bounded
+    by their total size.
+
+    When a world's coverage version moves on, its bitmap is advanced with the
+    cells whose ids are above the last one it includes. Ids are assigned
+    before commit, so a cell committed late with a lower id is missed by
+    that; the bitmap is therefore rebuilt in full every `rebuild_every`
+    advances, and when it is invalidated.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES, rebuild_every=100):
+        self.max_bytes = max_bytes
+        self.rebuild_every = rebuild_every
+        self.current_bytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, world_id, version, build):
+        """
+        Returns the bitmap of the world at `version`. `build(base, after_id)`
+        returns a bitmap and the last cell id it includes, built from scratch
+        when `after_id` is None and from `base` otherwise. The version must be
+        read before the cells `build` reads, so a bitmap is never older than
+        its version.
+        """
+        with self._lock:
+            entry = self._entries.get(world_id)
+            if entry is not None:
+                self._entries.move_to_end(world_id)
+        if entry is not None and entry[0] == version:
+            metrics.CACHE_LOOKUPS.labels("coverage", "hit").inc()
+            return entry[2]
+        metrics.CACHE_LOOKUPS.labels("coverage", "miss").inc()
+
+        if entry is not None and entry[3] < self.rebuild_every:
+            coverage, last_id = build(entry[2], entry[1])
+            advances = entry[3] + 1
+        else:
+            coverage, last_id = build(b'', None)
+            advances = 0
+
+        with self._lock:
+            self._remove(world_id)
+            if len(coverage) <= self.max_bytes:
+                self._entries[world_id] = (version, last_id, coverage, advances)
+                self.current_bytes += len(coverage)
+                while self.current_bytes > self.max_bytes:
+                    self._remove(next(iter(self._entries)))
+        return coverage
+
+    def invalidate(self, world_id):
+        with self._lock:
+            self._remove(world_id)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _remove(self, world_id):
+        entry = self._entries.pop(world_id, None)
+        if entry is not None:
+            self.current_bytes -= len(entry[2])
+
+
+world_cache = WorldCache(getattr(settings, "WORLD_CACHE_MAX_BYTES", DEFAULT_MAX_BYTES))
+
+
+coverage_cache = CoverageCache(getattr(settings, "WORLD_CACHE_MAX_BYTES", DEFAULT_MAX_BYTES))
+
+
+def get_decoded_world(world):
+    return world_cache.get(world)
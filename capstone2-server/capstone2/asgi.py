@@ -2,6 +2,8 @@
 ASGI config for capstone2 project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+HTTP requests go to Django, websockets to the world event stream in
+api.realtime.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.1/howto/deployment/asgi/
@@ -9,8 +11,22 @@ https://docs.djangoproject.com/en/5.1/howto/deployment/asgi/
 
 import os
 
+from django.conf import settings
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'capstone2.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+if settings.DEBUG:
+    # Serve static files like runserver does
+    from django.contrib.staticfiles.handlers import ASGIStaticFilesHandler
+    django_application = ASGIStaticFilesHandler(django_application)
+
+from api.realtime import websocket_application  # noqa: E402  (needs the app registry)
+
+
+async def application(scope, receive, send):
+    if scope["type"] == "websocket":
+        return await websocket_application(scope, receive, send)
+    return await django_application(scope, receive, send)
@@ -24,7 +24,7 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 SECRET_KEY = 'django-insecure-t!wq!)-^h8e%t4w2mjt&9%x=wp7r*@rk=2gbmeracypk)#ojfo'
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+DEBUG = os.environ.get("DJANGO_DEBUG", "true").lower() == "true"
 
 ALLOWED_HOSTS = [ "0.0.0.0", "127.0.0.1", "localhost", "server", "capstone2.e-itheta.com" ]
 CSRF_TRUSTED_ORIGINS = [
@@ -52,12 +52,17 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware', # Added CORS middleware (place high)
     'django.middleware.security.SecurityMiddleware',
+    # Compresses responses, world maps shrink from megabytes of nested lists
+    'django.middleware.gzip.GZipMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'api.middleware.QueryCountMiddleware',
+    'api.middleware.MetricsMiddleware',
+    'api.middleware.ProfilingMiddleware',
 ]
 
 ROOT_URLCONF = 'capstone2.urls'
@@ -84,16 +89,48 @@ WSGI_APPLICATION = 'capstone2.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.postgresql',
-        'NAME': os.environ["POSTGRES_DB"],      
-        'PASSWORD': os.environ["POSTGRES_PASSWORD"],
-        'USER': os.environ["POSTGRES_USER"],
-        'HOST': "postgres",
-        'PORT': '5432',
+# DB_ENGINE=sqlite runs against a local SQLite file (e.g. for load tests
+# without the compose stack); POSTGRES_HOST/PORT point at a local Postgres.
+if os.environ.get("DB_ENGINE", "postgres") == "sqlite":
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.environ.get("SQLITE_PATH", BASE_DIR / 'db.sqlite3'),
+        }
+    }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ["POSTGRES_DB"],
+            'PASSWORD': os.environ["POSTGRES_PASSWORD"],
+            'USER': os.environ["POSTGRES_USER"],
+            'HOST': os.environ.get("POSTGRES_HOST", "postgres"),
+            'PORT': os.environ.get("POSTGRES_PORT", "5432"),
+            # Seconds to keep connections open between requests, 0 closes them
+            # after each request. The server runs under ASGI, where Django
+            # cannot reuse persistent connections and leaks them, so keep 0
+            # there and use DB_POOL instead; checked before reuse
+            'CONN_MAX_AGE': int(os.environ.get("DB_CONN_MAX_AGE", 0)),
+            'CONN_HEALTH_CHECKS': os.environ.get("DB_CONN_HEALTH_CHECKS", "true").lower() == "true",
+            # Required when connecting through pgbouncer in transaction mode
+            'DISABLE_SERVER_SIDE_CURSORS': os.environ.get("DB_DISABLE_SERVER_SIDE_CURSORS", "false").lower() == "true",
+            'OPTIONS': {},
+        }
     }
-}
+
+    # DB_POOL=true replaces persistent connections with a psycopg connection
+    # pool in each worker process. Sizes are per worker, so the database sees
+    # up to workers * DB_POOL_MAX_SIZE connections; CONN_HEALTH_CHECKS makes
+    # the pool check connections when they are handed out
+    if os.environ.get("DB_POOL", "false").lower() == "true":
+        DATABASES['default']['CONN_MAX_AGE'] = 0
+        DATABASES['default']['OPTIONS']['pool'] = {
+            'min_size': int(os.environ.get("DB_POOL_MIN_SIZE", 2)),
+            'max_size': int(os.environ.get("DB_POOL_MAX_SIZE", 10)),
+            'timeout': float(os.environ.get("DB_POOL_TIMEOUT", 10)),
+            'max_idle': float(os.environ.get("DB_POOL_MAX_IDLE", 600)),
+        }
 
 
 # Password validation
@@ -132,6 +169,9 @@ USE_TZ = True
 
 STATIC_URL = 'services/static/'
 
+# collectstatic target; the production profile shares it with nginx
+STATIC_ROOT = os.environ.get("STATIC_ROOT", BASE_DIR / 'staticfiles')
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
@@ -139,6 +179,47 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 AUTH_USER_MODEL = "accounts.User"
 
+# Upper bound on memory used by each of the in-process decoded world and
+# coverage bitmap caches (api.world_cache)
+WORLD_CACHE_MAX_BYTES = int(os.environ.get("WORLD_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+
+# Largest width or height accepted when creating a world
+MAX_WORLD_SIZE = int(os.environ.get("MAX_WORLD_SIZE", 2000))
+
+# Add X-Query-Count/X-Query-Time-Ms headers to every response (api.middleware)
+QUERY_COUNT_HEADERS = os.environ.get("QUERY_COUNT_HEADERS", "false").lower() == "true"
+
+# Per-endpoint latency and query histograms (api.metrics), served at
+# /services/metrics to requests with "Authorization: Bearer <METRICS_TOKEN>"
+# (without a token only when DEBUG is on)
+METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "true").lower() == "true"
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN")
+
+# Verified tokens are cached with their user (api.auth.TokenCache) for up to
+# AUTH_TOKEN_CACHE_TTL seconds, 0 disables the cache. Set AUTH_TOKEN_CACHE_BACKEND
+# to a CACHES alias to share the cache between workers.
+AUTH_TOKEN_CACHE_SIZE = int(os.environ.get("AUTH_TOKEN_CACHE_SIZE", 1024))
+AUTH_TOKEN_CACHE_TTL = int(os.environ.get("AUTH_TOKEN_CACHE_TTL", 60))
+AUTH_TOKEN_CACHE_BACKEND = os.environ.get("AUTH_TOKEN_CACHE_BACKEND")
+
+# How world events reach the viewer websockets (api.realtime): "local" delivers
+# within the process, "postgres" relays them between workers with LISTEN/NOTIFY.
+# Defaults to "postgres" when the database is Postgres.
+REALTIME_BACKEND = os.environ.get("REALTIME_BACKEND")
+
+# Tracing spans around the phases of airplane actions (api.tracing): "off",
+# "log" (one line per trace on the api.tracing logger) or "opentelemetry"
+# (needs opentelemetry-api and an SDK configured by the process)
+TRACING = os.environ.get("TRACING", "off")
+
+# cProfile reports of requests (api.middleware.ProfilingMiddleware) are written
+# to PROFILE_DIR. Staff request one with "X-Profile: 1" or ?profile=1; a
+# PROFILE_SAMPLE_RATE fraction of the PROFILE_SAMPLED_ENDPOINTS requests is
+# profiled automatically.
+PROFILE_DIR = os.environ.get("PROFILE_DIR")
+PROFILE_SAMPLE_RATE = float(os.environ.get("PROFILE_SAMPLE_RATE", 0))
+PROFILE_SAMPLED_ENDPOINTS = ["airplane-move", "airplane-rotate-left", "airplane-rotate-right"]
+
 
 # Ensure cookies are transmitted only over HTTPS
 SESSION_COOKIE_SECURE = True
@@ -193,6 +274,11 @@ LOGGING = {
             'level': 'INFO',  # Enable DEBUG level for request logger
             'propagate': False,
         },
+        'api.tracing': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
     },
 }
 
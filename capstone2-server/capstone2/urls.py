@@ -16,8 +16,10 @@ Including another URLconf
 """
 from django.contrib import admin
 from django.urls import path, include
+from api.views import metrics_view
 
 urlpatterns = [
+    path('services/metrics', metrics_view),
     path('services/admin/', admin.site.urls),
     path('services/accounts/', include('accounts.urls')),
     path('services/api/', include('api.urls'))
@@ -0,0 +1,40 @@
+# Gunicorn settings for the production profile (docker compose --profile prod).
+# Every value can be overridden from the environment.
+#
+# Send HUP to the master for a graceful reload: new workers are started with
+# the current code and old ones finish their in-flight requests first.
+#
+# To serve the ASGI application instead, set
+#   GUNICORN_APP=capstone2.asgi:application
+#   GUNICORN_WORKER_CLASS=uvicorn.workers.UvicornWorker
+
+import multiprocessing
+import os
+
+wsgi_app = os.environ.get("GUNICORN_APP", "capstone2.wsgi:application")
+bind = os.environ.get("GUNICORN_BIND", "0.0.0.0:8000")
+
+workers = int(os.environ.get("GUNICORN_WORKERS", multiprocessing.cpu_count() * 2 + 1))
+worker_class = os.environ.get("GUNICORN_WORKER_CLASS", "gthread")
+threads = int(os.environ.get("GUNICORN_THREADS", 4))
+
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 30))
+# Time workers get to finish in-flight requests on reload or shutdown
+graceful_timeout = int(os.environ.get("GUNICORN_GRACEFUL_TIMEOUT", 30))
+keepalive = int(os.environ.get("GUNICORN_KEEPALIVE", 5))
+
+# Restart workers after a number of requests to bound memory growth; the
+# jitter keeps them from all restarting at once
+max_requests = int(os.environ.get("GUNICORN_MAX_REQUESTS", 10000))
+max_requests_jitter = int(os.environ.get("GUNICORN_MAX_REQUESTS_JITTER", 1000))
+
+accesslog = "-"
+errorlog = "-"
+loglevel = os.environ.get("GUNICORN_LOG_LEVEL", "info")
+
+
+def child_exit(server, worker):
+    # Drop the live gauges of a stopped worker from the shared metrics directory
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
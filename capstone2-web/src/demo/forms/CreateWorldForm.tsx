@@ -16,8 +16,13 @@ interface WorldFormData {
   description: string;
   width: number;
   height: number;
+  seed: string;
+  threshold: number;
 }
 
+// Fields sent as numbers, seed is optional and sent only when set
+const NUMERIC_FIELDS = ["width", "height", "threshold"];
+
 export default function CreateWorldForm(): React.ReactElement {
   const { me } = useAuth0();
   const [formData, setFormData] = useState<WorldFormData>({
@@ -25,6 +30,8 @@ export default function CreateWorldForm(): React.ReactElement {
     description: "",
     width: 100,
     height: 100,
+    seed: "",
+    threshold: 0.4,
   });
 
   const [error, setError] = useState<string | null>(null);
@@ -36,8 +43,7 @@ export default function CreateWorldForm(): React.ReactElement {
     const { name, value } = e.target;
     setFormData((prev) => ({
       ...prev,
-      [name]:
-        name === "width" || name === "height" ? parseInt(value) || 0 : value,
+      [name]: NUMERIC_FIELDS.includes(name) ? Number(value) || 0 : value,
     }));
   };
 
@@ -57,7 +63,10 @@ export default function CreateWorldForm(): React.ReactElement {
           "Content-Type": "application/json",
           Authorization: `Bearer ${me.token}`,
         },
-        body: JSON.stringify(formData),
+        body: JSON.stringify({
+          ...formData,
+          seed: formData.seed === "" ? null : parseInt(formData.seed),
+        }),
       });
 
       if (!response.ok) {
@@ -70,6 +79,8 @@ export default function CreateWorldForm(): React.ReactElement {
         description: "",
         width: 100,
         height: 100,
+        seed: "",
+        threshold: 0.4,
       });
 
       // navigate to the worlds page so it can load fresh data
@@ -129,6 +140,30 @@ export default function CreateWorldForm(): React.ReactElement {
               inputProps={{ min: 1 }}
             />
           </Grid>
+          <Grid item xs={6}>
+            <TextField
+              fullWidth
+              type="number"
+              label="Seed (optional)"
+              name="seed"
+              value={formData.seed}
+              onChange={handleChange}
+              variant="outlined"
+              inputProps={{ min: 0 }}
+            />
+          </Grid>
+          <Grid item xs={6}>
+            <TextField
+              fullWidth
+              type="number"
+              label="Obstacle Threshold"
+              name="threshold"
+              value={formData.threshold}
+              onChange={handleChange}
+              variant="outlined"
+              inputProps={{ min: 0, max: 1, step: 0.05 }}
+            />
+          </Grid>
           {error && (
             <Grid item xs={12}>
               <Alert severity="error">{error}</Alert>
@@ -1,4 +1,4 @@
-import React, { useCallback, useEffect, useState } from "react";
+import React, { useCallback, useEffect, useRef, useState } from "react";
 import { useParams } from "react-router-dom";
 import {
   IconButton,
@@ -126,131 +126,218 @@ const AirplaneList: React.FC = () => {
     return coverageCells;
   };
 
+  // Latest known state of the world, updated from the event stream
+  const planesRef = useRef<Map<number, Airplane>>(new Map());
+  const scannedRef = useRef<Map<string, [number, number]>>(new Map());
+  // Id of the newest scanned cell fetched, polling only asks for newer ones
+  const sinceIdRef = useRef<number | null>(null);
+
   useEffect(() => {
-    const fetchAirplanes = async () => {
-      // check basemap
-      if (basemap.length === 0) {
-        return;
-      }
-      try {
-        const response = await fetch(`/services/api/airplanes?world=${id}`);
-        const data = await response.json();
+    // check basemap
+    if (basemap.length === 0) {
+      return;
+    }
+
+    // Map dimensions
+    const mapHeight = basemap.length;
+    const mapWidth = basemap[0].length;
+
+    const draw = () => {
+      // deep copy the basemap
+      let newBasemap = JSON.parse(JSON.stringify(basemap));
+      const airplanes = Array.from(planesRef.current.values());
+
+      // First lets draw the scanned cells. We want a light yellow color for scanned cells
+      scannedRef.current.forEach(([x, y]) => {
+        // if the scanned cell is from the base map [255, 255, 255], then we will mark it as grey
+        if (
+          basemap[y][x][0] === 255 &&
+          basemap[y][x][1] === 255 &&
+          basemap[y][x][2] === 255
+        ) {
+          newBasemap[y][x] = [255, 255, 0];
+        } else {
+          newBasemap[y][x] = [255, 0, 0];
+        }
+      });
+
+      airplanes.forEach((airplane) => {
+        // check if airplane is out of bounds
+        if (
+          airplane.pos_x < 0 ||
+          airplane.pos_x >= mapWidth ||
+          airplane.pos_y < 0 ||
+          airplane.pos_y >= mapHeight
+        ) {
+          setMessageSnack(
+            `Airplane ${airplane.name} is out of bounds and will be deleted`,
+            "warning"
+          );
+          return;
+        }
+
+        // Use airplane color from backend
+        const planeColor = [
+          parseInt(airplane.color.slice(1, 3), 16),
+          parseInt(airplane.color.slice(3, 5), 16),
+          parseInt(airplane.color.slice(5, 7), 16),
+        ];
+
+        // Visualize orientation with a slight color variation in the direction of travel
+        const directionColor = [
+          Math.min(255, planeColor[0] * 1.2), // Slightly brighter color
+          Math.min(255, planeColor[1] * 1.2),
+          Math.min(255, planeColor[2] * 1.2),
+        ];
+
+        // Radar/scanner color: complementary color of planeColor
+        const scannerColor = [
+          255 - planeColor[0],
+          255 - planeColor[1],
+          255 - planeColor[2],
+        ];
+
+        // Add orientation indicator (a colored cell in front of the airplane)
+        let orientationX = airplane.pos_x;
+        let orientationY = airplane.pos_y;
 
-        const scannedCellsCall = await axios.get(
-          `/services/api/scanned-cell/?world=${id}&page_size=10000`
+        switch (airplane.rotation) {
+          case "UP":
+            orientationY = Math.max(0, airplane.pos_y - 1);
+            break;
+          case "DOWN":
+            orientationY = Math.min(mapHeight - 1, airplane.pos_y + 1);
+            break;
+          case "LEFT":
+            orientationX = Math.max(0, airplane.pos_x - 1);
+            break;
+          case "RIGHT":
+            orientationX = Math.min(mapWidth - 1, airplane.pos_x + 1);
+            break;
+        }
+
+        // Only set the orientation indicator if it's not the same as the airplane position
+        if (
+          orientationX !== airplane.pos_x ||
+          orientationY !== airplane.pos_y
+        ) {
+          newBasemap[orientationY][orientationX] = directionColor;
+        }
+
+        // Get and set scanner coverage cells
+        const scannerCells = getScannerCoverageCells(
+          airplane.pos_x,
+          airplane.pos_y,
+          airplane.rotation,
+          mapWidth,
+          mapHeight
         );
 
-        // deep copy the basemap
-        let newBasemap = JSON.parse(JSON.stringify(basemap));
-
-        // Map dimensions
-        const mapHeight = basemap.length;
-        const mapWidth = basemap[0].length;
-
-        // First lets draw the scanned cells. We want a light yellow color for scanned cells
-        scannedCellsCall.data.results.forEach((scannedCell: any) => {
-          let color = [0, 0, 0];
-          // if the scanned cell is from the base map [255, 255, 255], then we will mark it as grey
-          if (
-            basemap[scannedCell.pos_y][scannedCell.pos_x][0] === 255 &&
-            basemap[scannedCell.pos_y][scannedCell.pos_x][1] === 255 &&
-            basemap[scannedCell.pos_y][scannedCell.pos_x][2] === 255
-          ) {
-            newBasemap[scannedCell.pos_y][scannedCell.pos_x] = [255, 255, 0];
-          } else {
-            newBasemap[scannedCell.pos_y][scannedCell.pos_x] = [255, 0, 0];
-          }
+        // Apply scanner coverage colors
+        scannerCells.forEach(([x, y]) => {
+          newBasemap[y][x] = scannerColor;
         });
+        // Set airplane position with its unique color
+        newBasemap[airplane.pos_y][airplane.pos_x] = planeColor;
+      });
 
-        data.results.forEach((airplane: Airplane) => {
-          // check if airplane is out of bounds
-          if (
-            airplane.pos_x < 0 ||
-            airplane.pos_x >= mapWidth ||
-            airplane.pos_y < 0 ||
-            airplane.pos_y >= mapHeight
-          ) {
-            setMessageSnack(
-              `Airplane ${airplane.name} is out of bounds and will be deleted`,
-              "warning"
-            );
-            return;
-          }
+      setMap(newBasemap);
+      setAirplanes(airplanes);
+    };
 
-          // Use airplane color from backend
-          const planeColor = [
-            parseInt(airplane.color.slice(1, 3), 16),
-            parseInt(airplane.color.slice(3, 5), 16),
-            parseInt(airplane.color.slice(5, 7), 16),
-          ];
-
-          // Visualize orientation with a slight color variation in the direction of travel
-          const directionColor = [
-            Math.min(255, planeColor[0] * 1.2), // Slightly brighter color
-            Math.min(255, planeColor[1] * 1.2),
-            Math.min(255, planeColor[2] * 1.2),
-          ];
-
-          // Radar/scanner color: complementary color of planeColor
-          const scannerColor = [
-            255 - planeColor[0],
-            255 - planeColor[1],
-            255 - planeColor[2],
-          ];
-
-          // Add orientation indicator (a colored cell in front of the airplane)
-          let orientationX = airplane.pos_x;
-          let orientationY = airplane.pos_y;
-
-          switch (airplane.rotation) {
-            case "UP":
-              orientationY = Math.max(0, airplane.pos_y - 1);
-              break;
-            case "DOWN":
-              orientationY = Math.min(mapHeight - 1, airplane.pos_y + 1);
-              break;
-            case "LEFT":
-              orientationX = Math.max(0, airplane.pos_x - 1);
-              break;
-            case "RIGHT":
-              orientationX = Math.min(mapWidth - 1, airplane.pos_x + 1);
-              break;
-          }
+    const addScannedCells = (cells: [number, number][]) => {
+      cells.forEach(([x, y]) => scannedRef.current.set(`${x},${y}`, [x, y]));
+    };
 
-          // Only set the orientation indicator if it's not the same as the airplane position
-          if (
-            orientationX !== airplane.pos_x ||
-            orientationY !== airplane.pos_y
-          ) {
-            newBasemap[orientationY][orientationX] = directionColor;
-          }
+    // State of the world, reloaded in full on load and after a resync. When
+    // polling only the cells scanned since the previous poll are fetched.
+    // since_id follows insertion order, so a cell committed late by another
+    // plane can fall behind the cursor; the periodic full reloads pick it up.
+    const fetchWorldState = async (full = true) => {
+      try {
+        const response = await fetch(`/services/api/airplanes?world=${id}`);
+        const data = await response.json();
 
-          // Get and set scanner coverage cells
-          const scannerCells = getScannerCoverageCells(
-            airplane.pos_x,
-            airplane.pos_y,
-            airplane.rotation,
-            mapWidth,
-            mapHeight
+        // Follow the cursor until the last page, large worlds have more
+        // cells than fit in one
+        const incremental = !full && sinceIdRef.current !== null;
+        let sinceId = incremental ? sinceIdRef.current : null;
+        const cells: [number, number][] = [];
+        for (;;) {
+          const since = sinceId !== null ? `&since_id=${sinceId}` : "";
+          const scannedCellsCall = await axios.get(
+            `/services/api/scanned-cell/?world=${id}&page_size=10000${since}`
           );
+          for (const scannedCell of scannedCellsCall.data.results) {
+            cells.push([scannedCell.pos_x, scannedCell.pos_y]);
+          }
+          sinceId = scannedCellsCall.data.since_id;
+          if (scannedCellsCall.data.next === null) {
+            break;
+          }
+        }
 
-          // Apply scanner coverage colors
-          scannerCells.forEach(([x, y]) => {
-            newBasemap[y][x] = scannerColor;
-          });
-          // Set airplane position with its unique color
-          newBasemap[airplane.pos_y][airplane.pos_x] = planeColor;
-        });
-
-        setMap(newBasemap);
-        setAirplanes(data.results);
+        planesRef.current = new Map(
+          data.results.map((airplane: Airplane) => [airplane.id, airplane])
+        );
+        if (!incremental) {
+          scannedRef.current = new Map();
+        }
+        sinceIdRef.current = sinceId;
+        addScannedCells(cells);
+        draw();
       } catch (error) {
         console.error("Failed to fetch airplanes:", error);
       }
     };
 
-    const interval = setInterval(fetchAirplanes, 250); // Refresh every 250ms
-    return () => clearInterval(interval);
+    let closed = false;
+    let interval: ReturnType<typeof setInterval> | undefined;
+    // Fall back to polling when the event stream is unavailable, with a full
+    // reload every FULL_RELOAD_POLLS polls
+    const FULL_RELOAD_POLLS = 40;
+    let polls = 0;
+    const startPolling = () => {
+      if (!closed && interval === undefined) {
+        interval = setInterval(
+          () => fetchWorldState(++polls % FULL_RELOAD_POLLS === 0),
+          250 // Refresh every 250ms
+        );
+      }
+    };
+
+    const protocol = window.location.protocol === "https:" ? "wss" : "ws";
+    const socket = new WebSocket(
+      `${protocol}://${window.location.host}/services/ws/worlds/${id}/`
+    );
+    socket.onopen = () => fetchWorldState();
+    socket.onmessage = (message) => {
+      const event = JSON.parse(message.data);
+      switch (event.type) {
+        case "airplane":
+          planesRef.current.set(event.airplane.id, event.airplane);
+          addScannedCells(event.cells);
+          break;
+        case "cells":
+          addScannedCells(event.cells);
+          break;
+        case "airplane_deleted":
+          planesRef.current.delete(event.id);
+          break;
+        case "resync":
+          fetchWorldState();
+          return;
+      }
+      draw();
+    };
+    socket.onclose = startPolling;
+
+    return () => {
+      closed = true;
+      socket.onclose = null;
+      socket.close();
+      clearInterval(interval);
+    };
   }, [id, basemap]);
 
   const handleCopy = useCallback(() => {
@@ -10,7 +10,6 @@ interface World {
   id: number;
   name: string;
   created_at: string;
-  basemap: number[][][]
 }
 
 const WorldList: React.FC = () => {